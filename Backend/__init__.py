@@ -1,13 +1,25 @@
 import os
 import sys
-from flask import Flask
+import time
+
+_import_started = time.perf_counter()
+
+from flask import Flask, Response
 
 from .routes.auth import auth_bp
 from .routes.claims import claims_bp
+from .services.metrics import render as render_metrics, startup_seconds
+
+# The agents SDK and the agent graph are not part of this; they load on
+# first use or from the AGENT_WARM_UP hook
+IMPORT_SECONDS = time.perf_counter() - _import_started
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-def create_app(test_config=None):
+def create_app(test_config=None, asgi=False):
+    """Build the Flask app, or with `asgi` the ASGI app that serves it with
+    async claim endpoints (e.g. `uvicorn --factory "backend:create_asgi"`)"""
+    started = time.perf_counter()
     # create and configure the app
     app = Flask(__name__, instance_relative_config=True)
     app.config.from_mapping(
@@ -32,8 +44,24 @@ def create_app(test_config=None):
     @app.route('/hello')
     def hello():
         return 'Hello, World!'
+
+    # Prometheus scrape target
+    @app.route('/metrics')
+    def metrics():
+        body, content_type = render_metrics()
+        return Response(body, content_type=content_type)
         
     app.register_blueprint(auth_bp)
     app.register_blueprint(claims_bp)
-        
-    return app
\ No newline at end of file
+
+    startup_seconds.labels('import').set(IMPORT_SECONDS)
+    if asgi:
+        # Starlette is only imported by ASGI deployments
+        from .asgi import create_asgi_app
+        app = create_asgi_app(app)
+    startup_seconds.labels('create_app').set(time.perf_counter() - started)
+    return app
+
+def create_asgi(test_config=None):
+    """ASGI app factory for uvicorn --factory"""
+    return create_app(test_config, asgi=True)
\ No newline at end of file
@@ -0,0 +1,29 @@
+import anyio
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+
+from .routes.claims import claim_admission
+from .routes.claims_async import assess_claim, chat, submit_claim
+
+
+def create_asgi_app(flask_app):
+    """Serve a Flask app over ASGI with native async claim endpoints.
+
+    Submitting, assessing and chatting about claims are handled by the
+    coroutines in routes.claims_async: while their LLM calls run on the
+    agent runtime, a request holds no thread, so one process can keep as
+    many calls in flight as AGENT_MAX_CONCURRENCY and CLAIM_MAX_IN_FLIGHT
+    allow. Both still default to 16, as under WSGI; raise them together to
+    make use of the extra headroom. Every other route, streamed ones
+    included, is passed through to the Flask app unchanged by a2wsgi.
+    """
+    app = Starlette(routes=[
+        Route('/api/claims', submit_claim, methods=['POST']),
+        Route('/api/claims/chat', chat, methods=['POST']),
+        Route('/api/claims/{claim_id:int}/assess', assess_claim, methods=['POST']),
+        Mount('/', app=WSGIMiddleware(flask_app)),
+    ])
+    app.state.flask_app = flask_app
+    app.state.admission_limiter = anyio.CapacityLimiter(claim_admission.max_waiting + 1)
+    return app
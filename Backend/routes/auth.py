@@ -1,9 +1,53 @@
-from flask import Blueprint, request, jsonify
-from ..services.auth_service import auth_service, user_store
+from flask import Blueprint, current_app, request, jsonify
+from ..services.auth_service import auth_service, user_store, USER_ROLES, DEFAULT_ROLE
+from ..services.password_hasher import PasswordHasherBusy, calibrate_rounds
+from ..services.token_cache import TokenCache
+from ..services.user_store import sqlite_user_store
+from ..services.metrics import register_cache
 from functools import wraps
+import click
+import os
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
+# Verified tokens, so polling clients skip JWT checks
+token_cache = TokenCache(maxsize=int(os.getenv('AUTH_TOKEN_CACHE_SIZE', '4096')))
+register_cache('auth_tokens', token_cache.stats)
+
+@auth_bp.record_once
+def _init_auth(state):
+    # Sets the bcrypt cost from BCRYPT_ROUNDS, shared by every worker
+    auth_service.hasher.init_app(state.app)
+    # Users live next to the claims when the app has a DATABASE, in memory otherwise
+    if state.app.config.get('DATABASE'):
+        sqlite_user_store.init_app(state.app)
+
+def _users():
+    return current_app.extensions.get('user_store', user_store)
+
+def _busy():
+    response = jsonify({'message': 'Too many sign-ins in progress, try again shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
+def authenticate(token):
+    """Resolve a bearer token to its user, returning (user, error message)"""
+    payload = token_cache.get(token)
+    if payload is None:
+        payload = auth_service.verify_token(token)
+        if not payload:
+            return None, 'Token is invalid or expired'
+        token_cache.set(token, payload)
+    
+    # Revocation and user come from the store in one query every time, so a
+    # logout or a role change in any worker process applies at once
+    current_user, revoked = _users().get_token_user(payload['user_id'], token_cache.digest(token))
+    if revoked:
+        return None, 'Token is invalid or expired'
+    if not current_user:
+        return None, 'User not found'
+    return current_user, None
+
 def token_required(f):
     """Decorator to require authentication for routes"""
     @wraps(f)
@@ -17,20 +61,59 @@ def token_required(f):
         if not token:
             return jsonify({'message': 'Token is missing'}), 401
         
-        payload = auth_service.verify_token(token)
-        if not payload:
-            return jsonify({'message': 'Token is invalid or expired'}), 401
-        
-        # Add user info to request context
-        current_user = user_store.get_user_by_id(payload['user_id'])
+        current_user, error = authenticate(token)
         if not current_user:
-            return jsonify({'message': 'User not found'}), 401
+            return jsonify({'message': error}), 401
         
+        # Add user info to request context
         request.current_user = current_user
+        request.token = token
         return f(*args, **kwargs)
     
     return decorated
 
+def token_optional(f):
+    """Decorator that attaches the user when a token is sent, None otherwise"""
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        request.current_user = None
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return f(*args, **kwargs)
+
+        token = auth_service.extract_token_from_header(auth_header)
+        if not token:
+            return jsonify({'message': 'Token is invalid or expired'}), 401
+
+        current_user, error = authenticate(token)
+        if not current_user:
+            return jsonify({'message': error}), 401
+
+        request.current_user = current_user
+        request.token = token
+        return f(*args, **kwargs)
+
+    return decorated
+
+@auth_bp.cli.command('set-role')
+@click.argument('email')
+@click.argument('role', type=click.Choice(USER_ROLES))
+def set_role(email, role):
+    """Give an existing user a role, e.g. investigator for claims staff"""
+    user = _users().get_user_by_email(email.lower().strip())
+    if not user:
+        raise click.ClickException(f'No user with email {email}')
+    _users().update_user(user['id'], role=role)
+    click.echo(f'{email} is now {role}')
+
+@auth_bp.cli.command('calibrate-rounds')
+@click.option('--target', type=float, default=0.25, show_default=True,
+              help='Longest a single hash may take, in seconds')
+def calibrate_rounds_command(target):
+    """Suggest BCRYPT_ROUNDS for this machine; set it for every worker"""
+    rounds = calibrate_rounds(target)
+    click.echo(f'BCRYPT_ROUNDS={rounds}')
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     """Register a new user"""
@@ -43,18 +126,29 @@ def register():
         email = data['email'].lower().strip()
         password = data['password']
         
+        role = data.get('role', DEFAULT_ROLE)
+        
         # Basic validation
         if len(password) < 6:
             return jsonify({'message': 'Password must be at least 6 characters'}), 400
         
+        if role not in USER_ROLES:
+            return jsonify({'message': f"Role must be one of: {', '.join(USER_ROLES)}"}), 400
+        
+        # Roles decide which agents a user reaches, so only customers sign
+        # themselves up; other roles are granted with `flask auth set-role`
+        if role != DEFAULT_ROLE:
+            return jsonify({'message': f"Only {DEFAULT_ROLE} accounts can be registered"}), 403
+        
         # Hash password
         password_hash = auth_service.hash_password(password)
         
         # Create user
-        user = user_store.create_user(
+        user = _users().create_user(
             email=email,
             password_hash=password_hash,
-            name=data.get('name', '')
+            name=data.get('name', ''),
+            role=role
         )
         
         # Generate token
@@ -68,6 +162,8 @@ def register():
         
     except ValueError as e:
         return jsonify({'message': str(e)}), 409
+    except PasswordHasherBusy:
+        return _busy()
     except Exception as e:
         return jsonify({'message': 'Registration failed'}), 500
 
@@ -84,7 +180,7 @@ def login():
         password = data['password']
         
         # Get user
-        user = user_store.get_user_by_email(email)
+        user = _users().get_user_by_email(email)
         if not user:
             return jsonify({'message': 'Invalid credentials'}), 401
         
@@ -92,6 +188,13 @@ def login():
         if not auth_service.verify_password(password, user['password_hash']):
             return jsonify({'message': 'Invalid credentials'}), 401
         
+        # Upgrade hashes made at an older cost while we have the plain password
+        if auth_service.needs_rehash(user['password_hash']):
+            try:
+                _users().update_user(user['id'], password_hash=auth_service.hash_password(password))
+            except PasswordHasherBusy:
+                pass  # Retried on the next login
+        
         # Generate token
         user_response = user.copy()
         del user_response['password_hash']
@@ -103,6 +206,8 @@ def login():
             'token': token
         }), 200
         
+    except PasswordHasherBusy:
+        return _busy()
     except Exception as e:
         return jsonify({'message': 'Login failed'}), 500
 
@@ -115,6 +220,15 @@ def get_current_user():
         del user['password_hash']
     return jsonify({'user': user}), 200
 
+@auth_bp.route('/logout', methods=['POST'])
+@token_required
+def logout():
+    """Revoke the token used for this request"""
+    payload = auth_service.verify_token(request.token)
+    _users().revoke_token(token_cache.digest(request.token), payload['exp'] if payload else 0)
+    token_cache.discard(request.token)
+    return jsonify({'message': 'Logout successful'}), 200
+
 @auth_bp.route('/verify', methods=['POST'])
 def verify_token():
     """Verify token validity"""
@@ -129,7 +243,7 @@ def verify_token():
             return jsonify({'valid': False, 'message': 'Token missing'}), 400
         
         payload = auth_service.verify_token(token)
-        if not payload:
+        if not payload or _users().is_token_revoked(token_cache.digest(token)):
             return jsonify({'valid': False, 'message': 'Invalid token'}), 401
         
         return jsonify({'valid': True, 'payload': payload}), 200
@@ -1,67 +1,439 @@
-from flask import Flask, Blueprint, request, jsonify
-from backend.services.agents import run_agent
+from flask import Flask, Blueprint, Response, request, jsonify, current_app, stream_with_context
 from backend.prompt_templates import get_claim_structuring_prompt, get_claim_assessment_prompt
-from backend.services.curacel_client import submit_claim_to_curacel
-from werkzeug.utils import secure_filename
+from backend.services.curacel_outbox import curacel_outbox, outbox_dispatcher
+from backend.services.job_queue import JobQueue, QueueFullError
+from backend.services.agent_runtime import agent_runtime
+from backend.services.claim_store import claim_store
+from backend.services.upload_store import upload_store
+from backend.services.maintenance import PeriodicTask
+from backend.services.claim_service import (
+    assessment_input, assessment_run, curacel_status, load_agents, local_assessment, prescore_claims,
+    process_claim, record_assessment, run_claim_job, save_submission, settled_assessment, stored_assessment
+)
+from backend.services.metrics import startup_seconds
+from backend.services.admission import AdmissionController, AdmissionRejected
+from backend.services.auth_service import auth_service
+from backend.routes.auth import token_optional, token_required
+from functools import wraps
+from datetime import datetime, timedelta
+import json
 import os
+import threading
+import time
 
 claims_bp = Blueprint('claims', __name__, url_prefix='/api/claims')
 
-# In-memory store for demo (replace with DB in production)
-claims_store = []
+@claims_bp.record_once
+def _init_claim_store(state):
+    # Claims, upload references and job status live in the SQLite database configured as DATABASE
+    claim_store.init_app(state.app)
+    upload_store.init_app(state.app)
+    curacel_outbox.init_app(state.app)
+    claim_jobs.init_app(state.app)
+    # Set CURACEL_OUTBOX_DISPATCH to False when a separate process drains the outbox
+    if state.app.config.get('CURACEL_OUTBOX_DISPATCH', True):
+        outbox_dispatcher.start()
+    # Deletes uploads no stored claim references, e.g. from failed submissions
+    if state.app.config.get('UPLOAD_GC', True):
+        upload_gc.start()
+    # The agent graph loads on the first request that needs it unless warmed up here
+    warm_up = state.app.config.get('AGENT_WARM_UP', os.getenv('AGENT_WARM_UP'))
+    if warm_up == 'eager':
+        warm_up_agents()
+    elif warm_up == 'background':
+        threading.Thread(target=warm_up_agents, name='agent-warm-up', daemon=True).start()
+
+def warm_up_agents():
+    """Build the agent graph and start the agent runtime ahead of the first request"""
+    started = time.perf_counter()
+    load_agents()
+    agent_runtime.start()
+    startup_seconds.labels('agents_warm_up').set(time.perf_counter() - started)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Unreferenced uploads are kept for a grace period, so submissions whose
+# claim is still being structured don't lose their files
+UPLOAD_GC_GRACE = float(os.getenv('UPLOAD_GC_GRACE', '3600'))
+upload_gc = PeriodicTask(
+    'upload-gc', lambda: upload_store.collect_garbage(older_than=UPLOAD_GC_GRACE),
+    interval=float(os.getenv('UPLOAD_GC_INTERVAL', '600'))
+)
+
+# Background workers for asynchronous claim submission
+claim_jobs = JobQueue(
+    max_workers=int(os.getenv('CLAIM_JOB_WORKERS', '4')),
+    max_pending=int(os.getenv('CLAIM_JOB_MAX_PENDING', '100'))
+)
+
+# Requests that end up waiting on agents are admitted here first, so a bulk
+# submitter is throttled instead of queueing everyone behind OpenAI
+claim_admission = AdmissionController(
+    'claims',
+    max_in_flight=int(os.getenv('CLAIM_MAX_IN_FLIGHT', os.getenv('AGENT_MAX_CONCURRENCY', '16'))),
+    max_waiting=int(os.getenv('CLAIM_MAX_WAITING', '32')),
+    wait_timeout=float(os.getenv('CLAIM_ADMISSION_WAIT', '10')),
+    rate=float(os.getenv('CLAIM_USER_RATE_PER_MINUTE', '30')) / 60,
+    burst=float(os.getenv('CLAIM_USER_BURST', '10'))
+)
+
+def client_key_for(user, authorization, remote_addr):
+    """Who a request is rate limited as: the JWT user, else the client address"""
+    if user is None:
+        token = auth_service.extract_token_from_header(authorization or '')
+        payload = auth_service.verify_token(token) if token else None
+        if payload and payload.get('user_id') is not None:
+            return f"user:{payload['user_id']}"
+        return f'addr:{remote_addr}'
+    return f"user:{user['id']}"
+
+def _client_key():
+    return client_key_for(
+        getattr(request, 'current_user', None), request.headers.get('Authorization'), request.remote_addr
+    )
+
+def admitted(f=None, cost=None):
+    """Decorator that holds an admission slot for the whole request, streamed
+    bodies included, and answers 429 with Retry-After when shed.
+
+    `cost(*args, **kwargs)` is how many rate limit tokens a call takes, one
+    when not given.
+    """
+    if f is None:
+        return lambda f: admitted(f, cost)
+
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        try:
+            ticket = claim_admission.admit(_client_key(), cost(*args, **kwargs) if cost else 1)
+        except AdmissionRejected as e:
+            response = jsonify({'error': 'Too many requests, try again later', 'details': str(e)})
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+        except Exception:
+            ticket.release()
+            raise
+        if response.is_streamed:
+            response.call_on_close(ticket.release)
+        else:
+            ticket.release()
+        return response
+
+    return decorated
+
+@claims_bp.route('/admission', methods=['GET'])
+def get_admission():
+    """In-flight, waiting and shed request counts of this worker"""
+    return jsonify(claim_admission.stats()), 200
+
+def truthy(flag):
+    return flag.lower() in ('1', 'true', 'yes')
+
+def _wants_async():
+    """Whether this submission should be queued instead of processed inline"""
+    flag = request.args.get('async', request.form.get('async'))
+    if flag is not None:
+        return truthy(flag)
+    return bool(current_app.config.get('ASYNC_CLAIM_SUBMISSION', False))
+
+def _force_requested():
+    """Whether the caller asked to bypass cached agent results"""
+    return truthy(request.args.get('force', request.form.get('force', '')))
+
+def _agent_timeout():
+    """Seconds a view waits on an agent run, None to wait indefinitely"""
+    return current_app.config.get('AGENT_RUN_TIMEOUT')
+
+def _current_user_id():
+    user = getattr(request, 'current_user', None)
+    return user['id'] if user else None
+
+def _current_role():
+    user = getattr(request, 'current_user', None)
+    return user.get('role') if user else None
 
 @claims_bp.route('', methods=['POST'])
+@token_optional
+@admitted
 def submit_claim():
     """User submits a new claim"""
-    data = request.form.to_dict()
-    files = request.files.getlist('files')
-    claim_text = data.get('claim_text', '')
-    incident_date = data.get('incident_date')
-    policy_number = data.get('policy_number')
-    file_urls = []
-    upload_dir = 'uploads/'
-    os.makedirs(upload_dir, exist_ok=True)
-    for file in files:
-        filename = secure_filename(file.filename)
-        filepath = os.path.join(upload_dir, filename)
-        file.save(filepath)
-        file_urls.append(filepath)
+    local_claim, agent_input, uploads = save_submission(
+        request.form.to_dict(), [(file.stream, file.filename) for file in request.files.getlist('files')]
+    )
+    policy_number = local_claim['policy_number']
+    if _wants_async():
+        # Queue structuring, answer immediately
+        try:
+            job = claim_jobs.submit(
+                'submit_claim', run_claim_job, agent_input,
+                policy_number, _current_user_id(), uploads, _agent_timeout(), _force_requested(),
+                local_claim
+            )
+        except QueueFullError as e:
+            return jsonify({'error': 'Claim queue is full, try again later', 'details': str(e)}), 503
+        return jsonify({
+            'message': 'Claim accepted',
+            'job_id': job.id,
+            'status_url': f"{claims_bp.url_prefix}/jobs/{job.id}"
+        }), 202
     # Structure claim using OpenAI agent
     # Use your agent runner for structuring
     try:
-        agent_input = f"Claim: {claim_text}\nIncident Date: {incident_date}\nPolicy Number: {policy_number}\nFiles: {file_urls}"
-        structured_claim = run_agent(agent_input)
-        # If run_agent is async, use asyncio.run(run_agent(...))
-        if hasattr(structured_claim, '__await__'):
-            import asyncio
-            structured_claim = asyncio.run(structured_claim)
+        structured_claim, curacel = process_claim(
+            agent_input, policy_number, _current_user_id(), uploads,
+            timeout=_agent_timeout(), force=_force_requested(), local_claim=local_claim
+        )
     except Exception as e:
         return jsonify({'error': 'Failed to structure claim', 'details': str(e)}), 500
-    # Store claim (simulate DB auto-increment id)
-    claim_id = len(claims_store) + 1
-    structured_claim['id'] = claim_id
-    claims_store.append(structured_claim)
-    # Send to Curacel API
-    curacel_response, status = submit_claim_to_curacel(structured_claim)
-    return jsonify({'message': 'Claim submitted', 'claim': structured_claim, 'curacel': curacel_response}), status
+    return jsonify({'message': 'Claim submitted', 'claim': structured_claim, 'curacel': curacel}), 201
+
+@claims_bp.route('/chat', methods=['POST'])
+@token_optional
+@admitted
+def chat():
+    """Free-form chat, answered by the agent for the caller's role"""
+    data = request.get_json(silent=True) or {}
+    message = data.get('message')
+    if not isinstance(message, str) or not message.strip():
+        return jsonify({'message': 'message is required'}), 400
+    # Only callers without a known role leave the choice to the orchestration agent
+    agents = load_agents()
+    agent = agents.route_agent('chat', _current_role())
+    try:
+        # Replies depend on who asks, so chat never shares cached results
+        reply = agent_runtime.run(
+            agents.run_agent(message, agent=agent, cache=False), timeout=_agent_timeout()
+        )
+    except Exception as e:
+        return jsonify({'error': 'Chat failed', 'details': str(e)}), 500
+    return jsonify({'reply': reply, 'agent': agent.name}), 200
+
+@claims_bp.route('/<int:claim_id>/curacel', methods=['GET'])
+def get_curacel_delivery(claim_id):
+    """Report whether a claim has been delivered to Curacel"""
+    entries = curacel_outbox.get_entries_for_claim(claim_id)
+    if not entries:
+        return jsonify({'message': 'No Curacel submission for this claim'}), 404
+    deliveries = [{
+        **curacel_status(entry),
+        'attempts': entry['attempts'],
+        'last_error': entry['last_error'],
+        'response': entry['response']
+    } for entry in entries]
+    return jsonify({'claim_id': claim_id, 'deliveries': deliveries}), 200
+
+@claims_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_claim_job(job_id):
+    """Report progress and results of a queued claim submission"""
+    job = claim_jobs.get(job_id)
+    if not job:
+        return jsonify({'message': 'Job not found'}), 404
+    return jsonify({'job': job.to_dict()}), 200
+
+def _parse_list_args(args):
+    """Turn listing query parameters into ClaimStore filters, raising ValueError on bad input"""
+    def number(name, cast):
+        value = args.get(name)
+        if value in (None, ''):
+            return None
+        try:
+            return cast(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be a number")
+
+    def timestamp(name):
+        value = args.get(name)
+        if not value:
+            return None
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"'{name}' must be an ISO date or datetime")
+
+    limit = number('limit', int)
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"'limit' must be between 1 and {MAX_PAGE_SIZE}")
+
+    created_from = timestamp('created_from')
+    created_to = timestamp('created_to')
+    created_before = None
+    if created_to is not None:
+        # created_to is inclusive: a bare date covers that whole day
+        step = timedelta(days=1) if len(args['created_to']) == 10 else timedelta(microseconds=1)
+        created_before = (created_to + step).isoformat()
+
+    return {
+        'after': number('after', int),
+        'limit': limit,
+        'policy_number': args.get('policy_number') or None,
+        'created_from': created_from.isoformat() if created_from else None,
+        'created_before': created_before,
+        'min_risk': number('min_risk', float),
+        'max_risk': number('max_risk', float),
+    }
 
 @claims_bp.route('', methods=['GET'])
 def list_claims():
-    """Agent fetches all claims"""
-    return jsonify({'claims': claims_store}), 200
+    """Agent fetches a page of claims, oldest first"""
+    try:
+        filters = _parse_list_args(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    page = claim_store.list_claims_page(**filters)
+    # Unchanged pages are answered from the ETag alone, without serializing claims
+    if request.if_none_match.contains(page.etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify({'claims': page.claims, 'next_cursor': page.next_cursor})
+    response.set_etag(page.etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+@claims_bp.route('/<int:claim_id>', methods=['PATCH'])
+@token_required
+def update_claim(claim_id):
+    """Investigator corrects a claim, starting a new version of it"""
+    if _current_role() != 'investigator':
+        return jsonify({'message': 'Only investigators can edit claims'}), 403
+    changes = request.get_json(silent=True)
+    if not isinstance(changes, dict) or not changes:
+        return jsonify({'message': 'Send the fields to change as a JSON object'}), 400
+    # The new version has no assessment yet, so the next one is made afresh
+    claim = claim_store.update_claim(claim_id, changes)
+    if not claim:
+        return jsonify({'message': 'Claim not found'}), 404
+    return jsonify({'message': 'Claim updated', 'claim': claim}), 200
 
 @claims_bp.route('/<int:claim_id>/assess', methods=['POST'])
+@admitted
 def assess_claim(claim_id):
     """Agent triggers GPT assessment for a claim"""
-    claim = next((c for c in claims_store if c['id'] == claim_id), None)
+    claim = claim_store.get_claim(claim_id)
     if not claim:
         return jsonify({'message': 'Claim not found'}), 404
+    force = _force_requested()
+    settled, prescore = settled_assessment(claim, force)
+    if settled is not None:
+        return jsonify(settled), 200
     try:
-        agent_input = f"Assess this claim: {claim}"
-        assessment = run_agent(agent_input)
-        if hasattr(assessment, '__await__'):
-            import asyncio
-            assessment = asyncio.run(assessment)
+        assessment = agent_runtime.run(
+            assessment_run(claim, prescore, force),
+            timeout=_agent_timeout()
+        )
     except Exception as e:
         return jsonify({'error': 'Failed to assess claim', 'details': str(e)}), 500
-    return jsonify({'assessment': assessment}), 200
+    return jsonify(record_assessment(claim, assessment)), 200
+
+def _sse(event, payload):
+    return f"event: {event}\ndata: {json.dumps(payload)}\n\n"
+
+@claims_bp.route('/<int:claim_id>/assess/stream', methods=['GET'])
+@admitted
+def stream_assessment(claim_id):
+    """Agent assessment streamed as Server-Sent Events while the agents work"""
+    claim = claim_store.get_claim(claim_id)
+    if not claim:
+        return jsonify({'message': 'Claim not found'}), 404
+    force = _force_requested()
+    timeout = _agent_timeout()
+
+    def generate():
+        yield _sse('started', {'claim_id': claim_id, 'version': claim['version']})
+        stored = None if force else stored_assessment(claim)
+        if stored is not None:
+            yield _sse('done', stored)
+            return
+        prescore = prescore_claims([claim])[0]
+        if not prescore['escalate']:
+            yield _sse('done', local_assessment(claim, prescore))
+            return
+        yield _sse('prescore', prescore)
+        events = load_agents().stream_assessment_pipeline(assessment_input(claim, prescore), bypass_cache=force)
+        try:
+            # timeout bounds the silence between events rather than the whole run
+            for event in agent_runtime.iter_async(events, timeout):
+                if event['event'] == 'done':
+                    yield _sse('done', record_assessment(claim, event['assessment']))
+                else:
+                    yield _sse(event['event'], event)
+        except Exception as e:
+            yield _sse('error', {'error': 'Failed to assess claim', 'details': str(e)})
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Keep reverse proxies from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@claims_bp.route('/assess-batch', methods=['POST'])
+def assess_batch():
+    """Agent assesses many claims at once, results stream back as NDJSON"""
+    data = request.get_json(silent=True) or {}
+    claim_ids = data.get('claim_ids')
+    if not isinstance(claim_ids, list) or not claim_ids:
+        return jsonify({'message': 'claim_ids must be a non-empty list'}), 400
+    if not all(isinstance(claim_id, int) for claim_id in claim_ids):
+        return jsonify({'message': 'claim_ids must be integers'}), 400
+    claim_ids = list(dict.fromkeys(claim_ids))
+    # Each claim is charged against the caller's rate limit, so a batch
+    # can't be larger than the burst one caller is allowed
+    max_batch = min(current_app.config.get('ASSESS_BATCH_MAX_SIZE', 500), int(claim_admission.burst))
+    if len(claim_ids) > max_batch:
+        return jsonify({'message': f'At most {max_batch} claims per batch'}), 413
+    return _assess_batch(claim_ids, bool(data.get('force', False)))
+
+@admitted(cost=lambda claim_ids, force: len(claim_ids))
+def _assess_batch(claim_ids, force):
+    concurrency = current_app.config.get('ASSESS_BATCH_CONCURRENCY', 8)
+    timeout = _agent_timeout()
+
+    def line(payload):
+        return json.dumps(payload) + '\n'
+
+    def generate():
+        claims = {}
+        # Unknown and already-assessed claims are answered right away
+        for claim_id in claim_ids:
+            claim = claim_store.get_claim(claim_id)
+            if not claim:
+                yield line({'claim_id': claim_id, 'error': 'Claim not found'})
+                continue
+            stored = None if force else stored_assessment(claim)
+            if stored is not None:
+                yield line({'claim_id': claim_id, **stored})
+                continue
+            claims[claim_id] = claim
+
+        # Score the rest as one batch; only suspicious claims go to the agent
+        prescores = dict(zip(claims, prescore_claims(list(claims.values()))))
+        for claim_id, prescore in prescores.items():
+            if not prescore['escalate']:
+                yield line({'claim_id': claim_id, **local_assessment(claims[claim_id], prescore)})
+
+        coros = {
+            claim_id: assessment_run(claims[claim_id], prescore, force)
+            for claim_id, prescore in prescores.items() if prescore['escalate']
+        }
+        # The rest run concurrently and are written out as each one finishes
+        unfinished = dict.fromkeys(coros)
+        try:
+            for claim_id, future in agent_runtime.iter_completed(coros, concurrency, timeout):
+                del unfinished[claim_id]
+                try:
+                    assessment = future.result()
+                except Exception as e:
+                    yield line({'claim_id': claim_id, 'error': 'Failed to assess claim', 'details': str(e)})
+                    continue
+                yield line({'claim_id': claim_id, **record_assessment(claims[claim_id], assessment)})
+        except Exception as e:
+            # Every claim still gets its line, even when the batch itself fails
+            for claim_id in unfinished:
+                yield line({'claim_id': claim_id, 'error': 'Failed to assess claim', 'details': str(e)})
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
@@ -0,0 +1,201 @@
+from functools import wraps
+
+import anyio
+from starlette.responses import Response
+
+from backend.services.agent_runtime import agent_runtime
+from backend.services.admission import AdmissionRejected
+from backend.services.auth_service import auth_service
+from backend.services.claim_store import claim_store
+from backend.services.claim_service import (
+    assessment_run, finish_structuring, load_agents, needs_agent, record_assessment, run_claim_job,
+    save_submission, settled_assessment, store_claim, structuring_run
+)
+from backend.services.job_queue import QueueFullError
+from backend.routes.auth import authenticate
+from backend.routes.claims import claims_bp, claim_admission, claim_jobs, client_key_for, truthy
+
+FORM_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
+def _flask_app(request):
+    return request.app.state.flask_app
+
+
+def _json(request, payload, status=200, headers=None):
+    """A JSON response serialized the way the Flask app's jsonify does it"""
+    body = _flask_app(request).json.dumps(payload)
+    return Response(body, status_code=status, headers=headers, media_type='application/json')
+
+
+async def _in_app(request, func, *args):
+    """Run blocking work in a worker thread inside the Flask app context"""
+    flask_app = _flask_app(request)
+
+    def call():
+        with flask_app.app_context():
+            return func(*args)
+
+    return await anyio.to_thread.run_sync(call)
+
+
+async def _load_agents():
+    # The first call imports the SDKs and builds the agent graph
+    return await anyio.to_thread.run_sync(load_agents)
+
+
+def _agent_timeout(request):
+    return _flask_app(request).config.get('AGENT_RUN_TIMEOUT')
+
+
+def _wants_async(request, data):
+    """Whether this submission should be queued instead of processed inline"""
+    flag = request.query_params.get('async', data.get('async'))
+    if flag is not None:
+        return truthy(flag)
+    return bool(_flask_app(request).config.get('ASYNC_CLAIM_SUBMISSION', False))
+
+
+async def _flag(request, name):
+    """A flag from the query string or a form body, None when not sent"""
+    flag = request.query_params.get(name)
+    if flag is None and request.headers.get('content-type', '').startswith(FORM_TYPES):
+        value = (await request.form()).get(name)
+        flag = value if isinstance(value, str) else None
+    return flag
+
+
+def token_optional(handler):
+    """Attach the user when a token is sent, None otherwise"""
+    @wraps(handler)
+    async def decorated(request):
+        request.state.current_user = None
+        auth_header = request.headers.get('Authorization')
+        if not auth_header:
+            return await handler(request)
+
+        token = auth_service.extract_token_from_header(auth_header)
+        if not token:
+            return _json(request, {'message': 'Token is invalid or expired'}, 401)
+
+        current_user, error = await _in_app(request, authenticate, token)
+        if not current_user:
+            return _json(request, {'message': error}, 401)
+
+        request.state.current_user = current_user
+        request.state.token = token
+        return await handler(request)
+
+    return decorated
+
+
+def admitted(handler):
+    """Hold a claim admission slot for the whole request, 429 with Retry-After when shed"""
+    @wraps(handler)
+    async def decorated(request):
+        key = client_key_for(
+            getattr(request.state, 'current_user', None), request.headers.get('Authorization'),
+            request.client.host if request.client else None
+        )
+        try:
+            # Callers queued for a slot wait on their own limiter, so a
+            # backlog can't take the threads everything else runs in
+            ticket = await anyio.to_thread.run_sync(
+                claim_admission.admit, key, limiter=request.app.state.admission_limiter
+            )
+        except AdmissionRejected as e:
+            return _json(request, {'error': 'Too many requests, try again later', 'details': str(e)}, 429,
+                         headers={'Retry-After': str(e.retry_after)})
+        with ticket:
+            return await handler(request)
+
+    return decorated
+
+
+@token_optional
+@admitted
+async def submit_claim(request):
+    """User submits a new claim"""
+    async with request.form() as form:
+        data = {}
+        for key, value in form.multi_items():
+            if isinstance(value, str):
+                data.setdefault(key, value)
+        files = [(upload.file, upload.filename) for upload in form.getlist('files') if not isinstance(upload, str)]
+        local_claim, agent_input, uploads = await _in_app(request, save_submission, data, files)
+    policy_number = local_claim['policy_number']
+    user = request.state.current_user
+    user_id = user['id'] if user else None
+    timeout = _agent_timeout(request)
+    force = truthy(request.query_params.get('force', data.get('force', '')))
+    if _wants_async(request, data):
+        # Queue structuring, answer immediately
+        try:
+            job = claim_jobs.submit(
+                'submit_claim', run_claim_job, agent_input,
+                policy_number, user_id, uploads, timeout, force, local_claim
+            )
+        except QueueFullError as e:
+            return _json(request, {'error': 'Claim queue is full, try again later', 'details': str(e)}, 503)
+        return _json(request, {
+            'message': 'Claim accepted',
+            'job_id': job.id,
+            'status_url': f"{claims_bp.url_prefix}/jobs/{job.id}"
+        }, 202)
+    try:
+        if needs_agent(local_claim):
+            await _load_agents()
+            output = await agent_runtime.run_async(structuring_run(agent_input, force), timeout=timeout)
+            structured_claim = finish_structuring(output, local_claim)
+        else:
+            structured_claim = dict(local_claim)
+        structured_claim, curacel = await _in_app(
+            request, store_claim, structured_claim, policy_number, user_id, uploads
+        )
+    except Exception as e:
+        return _json(request, {'error': 'Failed to structure claim', 'details': str(e)}, 500)
+    return _json(request, {'message': 'Claim submitted', 'claim': structured_claim, 'curacel': curacel}, 201)
+
+
+@token_optional
+@admitted
+async def chat(request):
+    """Free-form chat, answered by the agent for the caller's role"""
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    message = data.get('message') if isinstance(data, dict) else None
+    if not isinstance(message, str) or not message.strip():
+        return _json(request, {'message': 'message is required'}, 400)
+    user = request.state.current_user
+    # Only callers without a known role leave the choice to the orchestration agent
+    agents = await _load_agents()
+    agent = agents.route_agent('chat', user.get('role') if user else None)
+    try:
+        reply = await agent_runtime.run_async(
+            agents.run_agent(message, agent=agent, cache=False), timeout=_agent_timeout(request)
+        )
+    except Exception as e:
+        return _json(request, {'error': 'Chat failed', 'details': str(e)}, 500)
+    return _json(request, {'reply': reply, 'agent': agent.name}, 200)
+
+
+@admitted
+async def assess_claim(request):
+    """Agent triggers GPT assessment for a claim"""
+    claim = await _in_app(request, claim_store.get_claim, request.path_params['claim_id'])
+    if not claim:
+        return _json(request, {'message': 'Claim not found'}, 404)
+    force = truthy(await _flag(request, 'force') or '')
+    settled, prescore = await _in_app(request, settled_assessment, claim, force)
+    if settled is not None:
+        return _json(request, settled, 200)
+    try:
+        await _load_agents()
+        assessment = await agent_runtime.run_async(
+            assessment_run(claim, prescore, force), timeout=_agent_timeout(request)
+        )
+    except Exception as e:
+        return _json(request, {'error': 'Failed to assess claim', 'details': str(e)}, 500)
+    return _json(request, await _in_app(request, record_assessment, claim, assessment), 200)
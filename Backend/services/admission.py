@@ -0,0 +1,163 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+from .metrics import admission_in_flight, admission_shed, admission_waiting
+
+RATE_LIMITED = 'rate_limited'
+QUEUE_FULL = 'queue_full'
+TIMED_OUT = 'timed_out'
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; `retry_after` is a hint in whole seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f'{reason}, retry after {math.ceil(retry_after)}s')
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class TokenBucket:
+    """Allows `burst` requests at once, refilled at `rate` per second"""
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float, cost: float = 1) -> float:
+        """Take `cost` tokens, returning 0 on success or the seconds until they are available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def refund(self, cost: float = 1):
+        self.tokens = min(self.burst, self.tokens + cost)
+
+
+class Ticket:
+    """An admitted request's in-flight slot; release it exactly once when done"""
+
+    def __init__(self, controller: 'AdmissionController'):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._controller._release(time.monotonic() - self._started)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    """Admission control for requests that end up waiting on agent runs.
+
+    Each caller key gets a token bucket of `rate` requests per second with
+    room for `burst`; a request for several units of work (e.g. a batch)
+    takes one token per unit. Admitted requests then take one of `max_in_flight`
+    slots; up to `max_waiting` more wait at most `wait_timeout` seconds for
+    one, and everything past that is shed. Limits are per process.
+    """
+
+    def __init__(self, name: str, max_in_flight: int = 16, max_waiting: int = 32,
+                 wait_timeout: float = 10.0, rate: float = 1.0, burst: float = 10,
+                 max_keys: int = 10000):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = {RATE_LIMITED: 0, QUEUE_FULL: 0, TIMED_OUT: 0}
+        # Moving average of how long a slot is held, for Retry-After hints
+        self._hold_seconds = 1.0
+        self._buckets: OrderedDict = OrderedDict()
+        self._cond = threading.Condition()
+
+    def _bucket(self, key: Hashable, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.burst, now)
+            # Idle callers' buckets would be full again anyway
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    def _shed(self, reason: str, retry_after: float) -> AdmissionRejected:
+        self.shed[reason] += 1
+        admission_shed.labels(controller=self.name, reason=reason).inc()
+        return AdmissionRejected(reason, retry_after)
+
+    def _busy_for(self) -> float:
+        return self._hold_seconds * (self.waiting + 1) / self.max_in_flight
+
+    def admit(self, key: Hashable, cost: int = 1) -> Ticket:
+        """Take `cost` tokens and a slot for `key`, waiting for the slot if
+        needed, or raise AdmissionRejected"""
+        if cost > self.burst:
+            raise ValueError(f'A request can take at most {self.burst} tokens')
+        with self._cond:
+            now = time.monotonic()
+            bucket = self._bucket(key, now)
+            wait = bucket.take(now, cost)
+            if wait > 0:
+                raise self._shed(RATE_LIMITED, wait)
+            if self.in_flight >= self.max_in_flight:
+                if self.waiting >= self.max_waiting:
+                    bucket.refund(cost)
+                    raise self._shed(QUEUE_FULL, self._busy_for())
+                deadline = now + self.wait_timeout
+                self.waiting += 1
+                admission_waiting.labels(controller=self.name).inc()
+                try:
+                    while self.in_flight >= self.max_in_flight:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            bucket.refund(cost)
+                            raise self._shed(TIMED_OUT, self._busy_for())
+                        self._cond.wait(remaining)
+                finally:
+                    self.waiting -= 1
+                    admission_waiting.labels(controller=self.name).dec()
+            self.in_flight += 1
+            self.admitted += 1
+        admission_in_flight.labels(controller=self.name).inc()
+        return Ticket(self)
+
+    def _release(self, held: float):
+        with self._cond:
+            self.in_flight -= 1
+            self._hold_seconds = 0.9 * self._hold_seconds + 0.1 * held
+            self._cond.notify()
+        admission_in_flight.labels(controller=self.name).dec()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                'in_flight': self.in_flight,
+                'waiting': self.waiting,
+                'admitted': self.admitted,
+                'shed': dict(self.shed),
+            }
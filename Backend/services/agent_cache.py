@@ -0,0 +1,147 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .database import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agent_results (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_agent_results_expires_at ON agent_results (expires_at);
+"""
+
+
+def normalize_input(text: str) -> str:
+    """Normalize claim text so trivially different resubmissions share a key"""
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+class AgentResultCache:
+    """Two-tier cache of agent outputs with TTL eviction.
+
+    An in-process LRU answers repeats within one worker; the optional SQLite
+    tier (`db_path`) shares results between workers and survives restarts.
+    Values must be JSON serializable. Writes purge expired entries at most
+    once every `purge_interval` seconds.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, db_path: Optional[str] = None,
+                 purge_interval: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._next_purge = time.time() + purge_interval
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.db = SQLiteDatabase(db_path, self._create_schema) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+
+    @staticmethod
+    def make_key(agent_input: str, graph_version: str, model: str) -> str:
+        """Hash the normalized input together with what produced the output"""
+        payload = json.dumps([normalize_input(agent_input), graph_version, model])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (True, value) on a hit and (False, None) on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return True, value
+                del self._entries[key]
+
+        if self.db is not None:
+            row = self.db.connection().execute(
+                'SELECT value, expires_at FROM agent_results WHERE key = ? AND expires_at > ?',
+                (key, now)
+            ).fetchone()
+            if row is not None:
+                value = json.loads(row['value'])
+                self._remember(key, value, row['expires_at'])
+                with self._lock:
+                    self.hits += 1
+                    self.disk_hits += 1
+                return True, value
+
+        with self._lock:
+            self.misses += 1
+        return False, None
+
+    def set(self, key: str, value: Any):
+        """Store a value in both tiers"""
+        now = time.time()
+        expires_at = now + self.ttl
+        self._remember(key, value, expires_at)
+        if self.db is not None:
+            conn = self.db.connection()
+            with conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO agent_results (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(value), expires_at)
+                )
+        if self._purge_due(now):
+            self.purge_expired()
+
+    def _purge_due(self, now: float) -> bool:
+        with self._lock:
+            if now < self._next_purge:
+                return False
+            self._next_purge = now + self.purge_interval
+            return True
+
+    def _remember(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def purge_expired(self) -> int:
+        """Drop expired entries from both tiers, returning how many disk rows went"""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+        if self.db is None:
+            return 0
+        conn = self.db.connection()
+        with conn:
+            return conn.execute('DELETE FROM agent_results WHERE expires_at <= ?', (now,)).rowcount
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.db is not None:
+            conn = self.db.connection()
+            with conn:
+                conn.execute('DELETE FROM agent_results')
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
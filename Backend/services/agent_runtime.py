@@ -0,0 +1,213 @@
+import asyncio
+import atexit
+import os
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError, as_completed
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Hashable, Iterator, Optional, Tuple
+
+
+def _default_openai_client():
+    """Build the shared async OpenAI client and make the agents SDK use it.
+
+    Returns None when AGENT_CASSETTE_MODE replays a cassette, since replayed
+    runs never reach OpenAI and may run without an API key.
+    """
+    if os.getenv('AGENT_CASSETTE_MODE') == 'replay':
+        return None
+    from openai import AsyncOpenAI
+    from agents import set_default_openai_client
+
+    client = AsyncOpenAI()
+    set_default_openai_client(client, use_for_tracing=False)
+    return client
+
+
+class AgentRuntime:
+    """Owns one persistent event loop in a dedicated thread for agent runs.
+
+    Sync Flask views hand coroutines to `run`/`submit` and async views await
+    `run_async`; they all execute on the same loop, so the async OpenAI client
+    (and its keep-alive connections) is reused across requests and at most
+    `max_concurrency` runs are in flight.
+    """
+
+    def __init__(self, max_concurrency: int = 16,
+                 client_factory: Optional[Callable[[], Any]] = None):
+        self.max_concurrency = max_concurrency
+        self.client_factory = client_factory
+        self.client = None
+        self._loop = None
+        self._thread = None
+        self._semaphore = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        self.start()
+        return self._loop
+
+    def start(self):
+        """Start the loop thread and build the shared client (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def serve():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+                # Cancel whatever was still in flight when we were stopped
+                pending = asyncio.all_tasks(loop)
+                for task in pending:
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+                loop.close()
+
+            thread = threading.Thread(target=serve, name='agent-runtime', daemon=True)
+            thread.start()
+            ready.wait()
+            self._loop, self._thread = loop, thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._bootstrap(), loop).result()
+            except Exception:
+                self._stop_locked()
+                raise
+
+    async def _bootstrap(self):
+        # Created on the loop thread so the semaphore and the client's
+        # connection pool are bound to the loop that will use them
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.client_factory is not None:
+            self.client = self.client_factory()
+
+    async def _guarded(self, coro: Coroutine):
+        async with self._semaphore:
+            return await coro
+
+    def submit(self, coro: Coroutine) -> Future:
+        """Schedule a coroutine on the shared loop and return a concurrent Future"""
+        try:
+            loop = self.loop
+        except Exception:
+            coro.close()
+            raise
+        return asyncio.run_coroutine_threadsafe(self._guarded(coro), loop)
+
+    def run(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and block until it finishes"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    async def run_async(self, coro: Coroutine, timeout: Optional[float] = None) -> Any:
+        """Run a coroutine on the shared loop and await it from another event loop.
+
+        Async views use this so a request waiting on an agent holds no thread.
+        Cancelling the caller, or hitting `timeout`, cancels the run.
+        """
+        future = asyncio.wrap_future(self.submit(coro))
+        try:
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise FutureTimeoutError()
+
+    def iter_completed(self, coros: Dict[Hashable, Coroutine], limit: int,
+                       timeout: Optional[float] = None) -> Iterator[Tuple[Hashable, Future]]:
+        """Run keyed coroutines with at most `limit` at a time, yielding
+        (key, finished future) pairs as each completes.
+
+        Closing the generator early cancels whatever hasn't finished yet.
+        """
+        if not coros:
+            return
+
+        async def make_semaphore():
+            return asyncio.Semaphore(limit)
+
+        try:
+            loop = self.loop
+            semaphore = asyncio.run_coroutine_threadsafe(make_semaphore(), loop).result()
+        except Exception:
+            for coro in coros.values():
+                coro.close()
+            raise
+
+        async def limited(coro):
+            # Wait for a batch slot before taking one of the runtime's slots,
+            # so a large batch never parks on global capacity
+            async with semaphore:
+                guarded = self._guarded(coro)
+                if timeout is None:
+                    return await guarded
+                return await asyncio.wait_for(guarded, timeout)
+
+        keys = {}
+        try:
+            for key, coro in coros.items():
+                keys[asyncio.run_coroutine_threadsafe(limited(coro), loop)] = key
+            for future in as_completed(keys):
+                yield keys[future], future
+        finally:
+            for future in keys:
+                future.cancel()
+
+    def iter_async(self, iterator: AsyncIterator, timeout: Optional[float] = None) -> Iterator[Any]:
+        """Consume an async iterator on the shared loop, yielding its items to
+        a sync caller as soon as each is produced.
+
+        `timeout` bounds the wait for each item. Closing the generator early
+        cancels the iteration.
+        """
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in iterator:
+                    items.put((False, item))
+            except Exception as e:
+                items.put((True, e))
+            else:
+                items.put((True, None))
+
+        future = self.submit(pump())
+        try:
+            while True:
+                try:
+                    finished, value = items.get(timeout=timeout)
+                except queue.Empty:
+                    raise FutureTimeoutError()
+                if finished:
+                    if value is not None:
+                        raise value
+                    return
+                yield value
+        finally:
+            future.cancel()
+
+    def _stop_locked(self):
+        loop, thread = self._loop, self._thread
+        self._loop = self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def shutdown(self):
+        """Stop the loop thread"""
+        with self._lock:
+            self._stop_locked()
+
+
+# Shared runtime for the whole process
+agent_runtime = AgentRuntime(
+    max_concurrency=int(os.getenv('AGENT_MAX_CONCURRENCY', '16')),
+    client_factory=_default_openai_client
+)
+atexit.register(agent_runtime.shutdown)
@@ -1,18 +1,106 @@
 import os
-from openai import OpenAI
+from openai import AsyncOpenAI
 import asyncio
-from agents import Agent, Runner, function_tool
+import functools
+import time
+from agents import Agent, ModelProvider, RunConfig, RunHooks, Runner, function_tool
+from agents import AgentUpdatedStreamEvent, RawResponsesStreamEvent, RunItemStreamEvent
+from agents.models.openai_provider import DEFAULT_MODEL
+from typing import AsyncIterator, Callable, Optional
 from backend.routes.auth import get_current_user
+from backend.prompt_templates import get_claim_structuring_prompt, get_claim_assessment_prompt
+from backend.services.agent_cache import AgentResultCache
+from backend.services.agent_runtime import agent_runtime
+from backend.services.moderation import ModerationService
+from backend.services.model_replay import RecordReplayProvider, provider_from_env
+from backend.services.metrics import (
+    agent_active_seconds, agent_errors, agent_run_seconds, agent_tokens, register_cache, tool_call_seconds
+)
+
+# Bump whenever agent instructions, tools or wiring change so cached results
+# produced by the old graph are no longer served
+AGENT_GRAPH_VERSION = "5"
+
+agent_cache = AgentResultCache(
+    maxsize=int(os.getenv('AGENT_CACHE_SIZE', '1024')),
+    ttl=float(os.getenv('AGENT_CACHE_TTL', '3600')),
+    db_path=os.getenv('AGENT_CACHE_DB'),
+    purge_interval=float(os.getenv('AGENT_CACHE_PURGE_INTERVAL', '300'))
+)
+
+def _openai_client():
+    # Share the agent runtime's client (and its connection pool) when it's up
+    return agent_runtime.client or AsyncOpenAI()
+
+def _moderation_client():
+    provider = run_config.model_provider
+    if isinstance(provider, RecordReplayProvider):
+        # Verdicts are recorded to and replayed from the cassette as well
+        return provider.moderation_client(_openai_client)
+    return _openai_client()
+
+moderation_service = ModerationService(
+    client_factory=_moderation_client,
+    window=float(os.getenv('MODERATION_BATCH_WINDOW', '0.01')),
+    max_batch=int(os.getenv('MODERATION_MAX_BATCH', '32')),
+    cache_size=int(os.getenv('MODERATION_CACHE_SIZE', '4096'))
+)
+
+register_cache('agent_results', agent_cache.stats)
+register_cache('moderation', moderation_service.stats)
+
+# Agent runs resolve models through this config; AGENT_CASSETTE_MODE swaps
+# in the record/replay provider so the graph can run offline
+run_config = RunConfig()
+
+def configure_model_provider(provider : Optional[ModelProvider] = None):
+    """Resolve agent models through `provider`, or the default OpenAI provider when None"""
+    global run_config
+    run_config = RunConfig(model_provider=provider) if provider is not None else RunConfig()
+    # Moderation follows the provider, so drop the client built for the old one
+    moderation_service.reset()
+
+configure_model_provider(provider_from_env())
+
+class MetricsHooks(RunHooks):
+    """Times the agents and tool calls of one run"""
+
+    def __init__(self):
+        self._started = {}
+
+    def _start(self, key):
+        self._started.setdefault(key, []).append(time.perf_counter())
+
+    def _elapsed(self, key):
+        starts = self._started.get(key)
+        return time.perf_counter() - starts.pop() if starts else None
+
+    async def on_agent_start(self, context, agent):
+        self._start(('agent', agent.name))
+
+    async def on_agent_end(self, context, agent, output):
+        elapsed = self._elapsed(('agent', agent.name))
+        if elapsed is not None:
+            agent_active_seconds.labels(agent.name).observe(elapsed)
+
+    async def on_tool_start(self, context, agent, tool):
+        self._start(('tool', tool.name))
+
+    async def on_tool_end(self, context, agent, tool, result):
+        elapsed = self._elapsed(('tool', tool.name))
+        if elapsed is not None:
+            tool_call_seconds.labels(tool.name).observe(elapsed)
+
+def _record_run(agent, result, started):
+    agent_run_seconds.labels(agent.name).observe(time.perf_counter() - started)
+    usage = result.context_wrapper.usage
+    agent_tokens.labels(agent.name, 'input').inc(usage.input_tokens)
+    agent_tokens.labels(agent.name, 'output').inc(usage.output_tokens)
 
 @function_tool
-def moderation_tool(input : str) -> bool:
+async def moderation_tool(input : str) -> bool:
     """Moderation tool to check if input is flagged by OpenAI's moderation API."""
-    client = OpenAI()
-    responses = client.moderations.create(
-        model="omni-moderation-latest",
-        input=input, 
-    )
-    return responses["results"][0]["flagged"] # type: ignore
+    return await moderation_service.is_flagged(input)
 
 
 @function_tool
@@ -48,6 +136,7 @@ claim_feature_extraction_agent = Agent(
 
         Additional Information:
         1. Ask for details only if you don't understand the claim. Prompt the user for key feature information if needed.
+        2. Dates, amounts, policy numbers and evidence under "Extracted Features" were parsed from the claim already. Reuse them rather than extracting them again.
     """
 )
 
@@ -101,6 +190,8 @@ fraud_analysis_agent = Agent(
         - explanation: why this indicates potential fraud
 
         Format as JSON with categories as keys.
+
+        If the input includes rule-based fraud indicators, confirm or correct them rather than starting over.
     """,
     tools=[
 
@@ -126,12 +217,27 @@ internal_agent = Agent(
     ] 
 )
 
-user_agent = Agent(
-    name="Claim Ticket Agent",
+verdict_agent = Agent(
+    name="Assessment Verdict Agent",
     instructions=
     """
+        You are a senior insurance fraud analyst.
+        You are given a claim together with the results of a moderation check, a feature extraction and a fraud analysis that were already run on it.
+        Weigh them against each other and decide on a verdict. Do not repeat the analyses.
+        Be strict, consistent, and return only structured output.
 
+        Format your response in JSON with the key verdict as well as the keys below.
+    """ + get_claim_assessment_prompt()
+)
+
+user_agent = Agent(
+    name="Claim Ticket Agent",
+    instructions=
     """
+        You help customers file and follow up on their insurance claims.
+        When chatting, answer briefly and ask for any claim details that are missing.
+        When given a claim submission, respond only with the structured claim below.
+    """ + get_claim_structuring_prompt()
 )
 
 orchestration_agent = Agent(
@@ -148,6 +254,145 @@ orchestration_agent = Agent(
     ]
 )
 
-async def run_agent(input : str):
-    runner =  await Runner.run(orchestration_agent, input)
-    return runner.final_output
\ No newline at end of file
+# Endpoints whose agent doesn't depend on who calls them; assessment
+# runs run_assessment_pipeline instead of a single agent
+ENDPOINT_AGENTS = {
+    'submit': user_agent,
+}
+
+# Agent for free-form chat, by the caller's role
+ROLE_AGENTS = {
+    'customer': user_agent,
+    'investigator': internal_agent,
+}
+
+def route_agent(endpoint : str, role : Optional[str] = None) -> Agent:
+    """Pick the agent for a request from the endpoint and the caller's role.
+
+    This replaces the orchestration agent's model call for every request
+    except chat from a caller without a known role.
+    """
+    agent = ENDPOINT_AGENTS.get(endpoint)
+    if agent is None:
+        agent = ROLE_AGENTS.get(role, orchestration_agent)
+    return agent
+
+def _cache_key(agent : Agent, input : str) -> str:
+    return agent_cache.make_key(
+        input, f"{AGENT_GRAPH_VERSION}:{agent.name}", agent.model or DEFAULT_MODEL
+    )
+
+async def run_agent(input : str, bypass_cache : bool = False, agent : Optional[Agent] = None,
+                    cache : bool = True):
+    """Run an agent (the orchestration agent by default), serving repeated inputs from the result cache.
+
+    `bypass_cache` skips the lookup but stores the fresh output; with `cache`
+    False the result cache isn't used at all.
+    """
+    agent = agent or orchestration_agent
+    key = _cache_key(agent, input)
+    if cache and not bypass_cache:
+        hit, output = agent_cache.get(key)
+        if hit:
+            return output
+    started = time.perf_counter()
+    try:
+        runner =  await Runner.run(agent, input, hooks=MetricsHooks(), run_config=run_config)
+    except Exception:
+        agent_errors.labels(agent.name).inc()
+        raise
+    _record_run(agent, runner, started)
+    if cache:
+        agent_cache.set(key, runner.final_output)
+    return runner.final_output
+
+def _stream_event(agent : Agent, event) -> Optional[dict]:
+    """Progress event for an SDK stream event, None for ones clients don't need"""
+    if isinstance(event, RawResponsesStreamEvent):
+        if getattr(event.data, 'type', None) == 'response.output_text.delta':
+            return {'event': 'delta', 'agent': agent.name, 'text': event.data.delta}
+        return None
+    if isinstance(event, RunItemStreamEvent):
+        return {'event': 'step', 'agent': agent.name, 'step': event.name}
+    if isinstance(event, AgentUpdatedStreamEvent):
+        return {'event': 'agent_updated', 'agent': event.new_agent.name}
+    return None
+
+async def run_agent_streamed(input : str, emit : Callable[[dict], None], bypass_cache : bool = False,
+                             agent : Optional[Agent] = None):
+    """Like run_agent, passing progress events (including output tokens) to `emit` as they arrive"""
+    agent = agent or orchestration_agent
+    key = _cache_key(agent, input)
+    if not bypass_cache:
+        hit, output = agent_cache.get(key)
+        if hit:
+            emit({'event': 'agent_completed', 'agent': agent.name, 'output': output, 'cached': True})
+            return output
+    emit({'event': 'agent_started', 'agent': agent.name})
+    started = time.perf_counter()
+    result = Runner.run_streamed(agent, input, hooks=MetricsHooks(), run_config=run_config)
+    try:
+        async for event in result.stream_events():
+            payload = _stream_event(agent, event)
+            if payload is not None:
+                emit(payload)
+    except Exception:
+        agent_errors.labels(agent.name).inc()
+        raise
+    _record_run(agent, result, started)
+    agent_cache.set(key, result.final_output)
+    emit({'event': 'agent_completed', 'agent': agent.name, 'output': result.final_output, 'cached': False})
+    return result.final_output
+
+async def _assess(input : str, bypass_cache : bool, emit : Optional[Callable[[dict], None]] = None):
+    if emit is None:
+        run = run_agent
+    else:
+        run = functools.partial(run_agent_streamed, emit=emit)
+    moderation, features, fraud = await asyncio.gather(
+        moderation_service.is_flagged(input),
+        run(input, bypass_cache=bypass_cache, agent=claim_feature_extraction_agent),
+        run(input, bypass_cache=bypass_cache, agent=fraud_analysis_agent),
+        return_exceptions=True
+    )
+    # Extraction and fraud analysis are required, moderation is advisory
+    for branch in (features, fraud):
+        if isinstance(branch, BaseException):
+            raise branch
+    if isinstance(moderation, BaseException):
+        moderation = None
+    if emit is not None:
+        emit({'event': 'moderation', 'flagged': moderation})
+    merge_input = (
+        f"{input}\n"
+        f"Moderation flagged: {'unavailable' if moderation is None else moderation}\n"
+        f"Extracted features: {features}\n"
+        f"Fraud analysis: {fraud}"
+    )
+    return await run(merge_input, bypass_cache=bypass_cache, agent=verdict_agent)
+
+async def run_assessment_pipeline(input : str, bypass_cache : bool = False):
+    """Assess a claim, running moderation, extraction and fraud analysis side by side.
+
+    The three branches run concurrently and verdict_agent merges their
+    results, so latency is the slowest branch plus the merge rather than
+    the sum of internal_agent's sequential tool calls.
+    """
+    return await _assess(input, bypass_cache)
+
+async def stream_assessment_pipeline(input : str, bypass_cache : bool = False) -> AsyncIterator[dict]:
+    """Run the assessment pipeline, yielding progress events as they happen.
+
+    Yields agent_started/agent_completed, step and delta (output token)
+    events from every agent, then a final done event with the assessment.
+    """
+    events = asyncio.Queue()
+    task = asyncio.ensure_future(_assess(input, bypass_cache, events.put_nowait))
+    # Queued after everything the pipeline emitted, however it finishes
+    task.add_done_callback(lambda _: events.put_nowait(None))
+    try:
+        while (event := await events.get()) is not None:
+            yield event
+        yield {'event': 'done', 'assessment': task.result()}
+    finally:
+        task.cancel()
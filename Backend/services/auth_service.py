@@ -1,30 +1,41 @@
 import jwt
-import bcrypt
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 import secrets
+import threading
+import time
+
+from .password_hasher import PasswordHasher, password_hasher
+
+# Roles a user can register with, as offered by the frontend
+USER_ROLES = ('customer', 'investigator')
+DEFAULT_ROLE = 'customer'
 
 class AuthService:
-    def __init__(self, secret_key: str = None):
+    def __init__(self, secret_key: str = None, hasher: PasswordHasher = None):
         self.secret_key = secret_key or secrets.token_urlsafe(32)
         self.algorithm = "HS256"
         self.token_expiry_hours = 24
+        self.hasher = hasher or password_hasher
     
     def hash_password(self, password: str) -> str:
-        """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
-        hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-        return hashed.decode('utf-8')
+        """Hash a password using bcrypt at the hasher's current cost"""
+        return self.hasher.hash(password)
     
     def verify_password(self, password: str, hashed_password: str) -> bool:
         """Verify a password against its hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+        return self.hasher.verify(password, hashed_password)
+    
+    def needs_rehash(self, hashed_password: str) -> bool:
+        """Whether a hash was made with a lower cost than the current setting"""
+        return self.hasher.needs_rehash(hashed_password)
     
     def generate_token(self, user_data: Dict[str, Any]) -> str:
         """Generate a JWT token for authenticated user"""
         payload = {
             "user_id": user_data.get("id"),
             "email": user_data.get("email"),
+            "role": user_data.get("role"),
             "exp": datetime.utcnow() + timedelta(hours=self.token_expiry_hours),
             "iat": datetime.utcnow()
         }
@@ -53,29 +64,33 @@ class AuthService:
         except ValueError:
             return None
 
-# Simple in-memory user store (replace with database in production)
+# In-memory user store, used when the app has no DATABASE (see user_store.SQLiteUserStore)
 class UserStore:
     def __init__(self):
         self.users = {}
         self.users_by_email = {}
         self.next_id = 1
+        # Token digest -> when the token would have expired anyway
+        self.revoked_tokens = {}
+        self._lock = threading.Lock()
     
     def create_user(self, email: str, password_hash: str, **kwargs) -> Dict[str, Any]:
         """Create a new user"""
-        if email in self.users_by_email:
-            raise ValueError("User already exists")
+        with self._lock:
+            if email in self.users_by_email:
+                raise ValueError("User already exists")
         
-        user = {
-            "id": self.next_id,
-            "email": email,
-            "password_hash": password_hash,
-            "created_at": datetime.utcnow().isoformat(),
-            **kwargs
-        }
+            user = {
+                "id": self.next_id,
+                "email": email,
+                "password_hash": password_hash,
+                "created_at": datetime.utcnow().isoformat(),
+                **kwargs
+            }
         
-        self.users[self.next_id] = user
-        self.users_by_email[email] = user
-        self.next_id += 1
+            self.users[self.next_id] = user
+            self.users_by_email[email] = user
+            self.next_id += 1
         
         # Return user without password hash
         user_response = user.copy()
@@ -89,6 +104,47 @@ class UserStore:
     def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
         """Get user by ID"""
         return self.users.get(user_id)
+    
+    def update_user(self, user_id: int, **changes) -> Optional[Dict[str, Any]]:
+        """Update a user's fields, returning the user without password hash"""
+        with self._lock:
+            user = self.users.get(user_id)
+            if not user:
+                return None
+        
+            changes.pop("id", None)
+            email = changes.get("email")
+            if email and email != user["email"]:
+                if email in self.users_by_email:
+                    raise ValueError("User already exists")
+                del self.users_by_email[user["email"]]
+                self.users_by_email[email] = user
+        
+            user.update(changes)
+        
+        user_response = user.copy()
+        del user_response["password_hash"]
+        return user_response
+    
+    def revoke_token(self, token_digest: str, expires_at: float):
+        """Reject a token from now until `expires_at`, e.g. on logout"""
+        now = time.time()
+        with self._lock:
+            # Forget revocations of tokens that have expired anyway
+            for digest, until in list(self.revoked_tokens.items()):
+                if until <= now:
+                    del self.revoked_tokens[digest]
+            if expires_at > now:
+                self.revoked_tokens[token_digest] = expires_at
+    
+    def is_token_revoked(self, token_digest: str) -> bool:
+        with self._lock:
+            until = self.revoked_tokens.get(token_digest)
+        return until is not None and until > time.time()
+    
+    def get_token_user(self, user_id: int, token_digest: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """The user a token was issued to and whether the token is revoked"""
+        return self.get_user_by_id(user_id), self.is_token_revoked(token_digest)
 
 # Initialize services
 auth_service = AuthService()
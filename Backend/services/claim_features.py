@@ -0,0 +1,145 @@
+import re
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+# Fields of the claim structuring schema (see get_claim_structuring_prompt)
+STRUCTURED_FIELDS = ('incident_date', 'policy_number', 'claim_text', 'attached_files')
+
+_MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'),
+        ('may',), ('jun', 'june'), ('jul', 'july'), ('aug', 'august'),
+        ('sep', 'sept', 'september'), ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ), start=1)
+    for name in names
+}
+_MONTH = r'(?P<month>' + '|'.join(sorted(_MONTHS, key=len, reverse=True)) + r')\.?'
+
+ISO_DATE = re.compile(r'\b(?P<year>\d{4})-(?P<month>\d{1,2})-(?P<day>\d{1,2})\b')
+NUMERIC_DATE = re.compile(r'\b(?P<day>\d{1,2})[/.](?P<month>\d{1,2})[/.](?P<year>\d{4})\b')
+DAY_MONTH_DATE = re.compile(r'\b(?P<day>\d{1,2})(?:st|nd|rd|th)?(?: of)? ' + _MONTH + r',? (?P<year>\d{4})\b', re.I)
+MONTH_DAY_DATE = re.compile(r'\b' + _MONTH + r' (?P<day>\d{1,2})(?:st|nd|rd|th)?,? (?P<year>\d{4})\b', re.I)
+
+CURRENCY_SYMBOLS = {'$': 'USD', '£': 'GBP', '€': 'EUR', '₦': 'NGN', '₵': 'GHS'}
+AMOUNT = re.compile(
+    r'(?:(?P<symbol>[$£€₦₵])\s?|\b(?P<code>USD|NGN|EUR|GBP|GHS|KES|ZAR)\s?)'
+    r'(?P<value>\d{1,3}(?:,\d{3})+|\d+)(?P<fraction>\.\d{1,2})?'
+    r'(?:\s?(?P<scale>k|m|thousand|million)\b)?',
+    re.I
+)
+
+# Policy references such as "policy no. POL-2023-0042" or a bare "POL-12345"
+POLICY_NUMBER = re.compile(
+    r'\bpolicy\s*(?:number|no\.?|num|#|id)?\s*[:#]?\s*(?P<number>[A-Z0-9]*\d[A-Z0-9]*(?:[-/][A-Z0-9]+)*)\b'
+    r'|\b(?P<prefixed>(?:POL|PLC|PN|INS)[-/]?\d[A-Z0-9]*(?:[-/][A-Z0-9]+)*)\b',
+    re.I
+)
+
+EVIDENCE_KEYWORDS = {
+    'photo': r'photo(?:graph)?s?|pictures?|images?',
+    'video': r'videos?|footage|dash ?cam|cctv',
+    'police_report': r'police (?:report|statement)|incident report|case number',
+    'witness': r'witness(?:es)?|eyewitness(?:es)?',
+    'receipt': r'receipts?|invoices?|proof of purchase',
+    'estimate': r'estimates?|quotes?|quotation|assessor',
+    'medical_report': r'medical (?:report|records?)|hospital|doctor',
+}
+EVIDENCE = {kind: re.compile(r'\b(?:' + pattern + r')\b', re.I) for kind, pattern in EVIDENCE_KEYWORDS.items()}
+
+_SCALES = {'k': 1_000, 'thousand': 1_000, 'm': 1_000_000, 'million': 1_000_000}
+
+
+def _to_date(match: re.Match) -> Optional[date]:
+    month = match.group('month')
+    month = _MONTHS[month.lower()] if not month.isdigit() else int(month)
+    try:
+        return date(int(match.group('year')), month, int(match.group('day')))
+    except ValueError:
+        return None
+
+
+def extract_dates(text: str) -> List[str]:
+    """ISO dates mentioned in the text, in order of appearance"""
+    found = []
+    for pattern in (ISO_DATE, NUMERIC_DATE, DAY_MONTH_DATE, MONTH_DAY_DATE):
+        for match in pattern.finditer(text):
+            parsed = _to_date(match)
+            if parsed is not None:
+                found.append((match.start(), parsed.isoformat()))
+    return list(dict.fromkeys(value for _, value in sorted(found)))
+
+
+def extract_amounts(text: str) -> List[Dict[str, Any]]:
+    """Monetary amounts with their currency, in order of appearance"""
+    amounts = []
+    for match in AMOUNT.finditer(text):
+        value = float(match.group('value').replace(',', '') + (match.group('fraction') or ''))
+        scale = match.group('scale')
+        if scale:
+            value *= _SCALES[scale.lower()]
+        currency = CURRENCY_SYMBOLS.get(match.group('symbol')) or match.group('code').upper()
+        amounts.append({'amount': value, 'currency': currency, 'text': match.group(0).strip()})
+    return amounts
+
+
+def extract_policy_numbers(text: str) -> List[str]:
+    numbers = []
+    for match in POLICY_NUMBER.finditer(text):
+        numbers.append((match.group('number') or match.group('prefixed')).upper())
+    return list(dict.fromkeys(numbers))
+
+
+def extract_evidence(text: str) -> List[str]:
+    """Kinds of supporting evidence the text refers to"""
+    return [kind for kind, pattern in EVIDENCE.items() if pattern.search(text)]
+
+
+def normalize_date(value: Optional[str]) -> Optional[str]:
+    """An ISO date for a submitted date string, None if it can't be read"""
+    if not value or not value.strip():
+        return None
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value).date().isoformat()
+    except ValueError:
+        dates = extract_dates(value)
+        return dates[0] if dates else None
+
+
+def extract_claim_features(claim_text: str, incident_date: Optional[str] = None,
+                           policy_number: Optional[str] = None,
+                           attached_files: Iterable[str] = ()) -> Dict[str, Any]:
+    """Structure a claim submission without the LLM.
+
+    Returns the structuring schema fields, filled from the submitted form
+    first and the claim text second, plus the raw `features` found in the
+    text. Fields that can't be determined are None, as the prompt asks.
+    """
+    claim_text = (claim_text or '').strip()
+    features = {
+        'dates': extract_dates(claim_text),
+        'amounts': extract_amounts(claim_text),
+        'policy_numbers': extract_policy_numbers(claim_text),
+        'evidence': extract_evidence(claim_text),
+    }
+    policy_number = (policy_number or '').strip() or None
+    return {
+        'incident_date': normalize_date(incident_date) or (features['dates'][0] if features['dates'] else None),
+        'policy_number': policy_number or (features['policy_numbers'][0] if features['policy_numbers'] else None),
+        'claim_text': claim_text or None,
+        'attached_files': list(attached_files),
+        'features': features,
+    }
+
+
+def is_fully_structured(claim: Dict[str, Any]) -> bool:
+    """Whether every field of the structuring schema is populated.
+
+    `attached_files` only has to be a list: the uploads are all the files
+    there are, so the model could not add any.
+    """
+    return (
+        all(claim.get(field) for field in ('incident_date', 'policy_number', 'claim_text'))
+        and isinstance(claim.get('attached_files'), list)
+    )
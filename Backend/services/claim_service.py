@@ -0,0 +1,226 @@
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from werkzeug.utils import secure_filename
+
+from .agent_runtime import agent_runtime
+from .claim_features import extract_claim_features, is_fully_structured
+from .claim_store import claim_store
+from .curacel_outbox import curacel_outbox, outbox_dispatcher
+from .upload_store import upload_store
+
+# Claim submission and assessment, shared by the Flask views and the async
+# views. Everything here blocks on SQLite or the upload folder except the
+# agent runs, which are returned as coroutines for the caller to await or
+# run on the agent runtime.
+
+
+def load_agents():
+    """The agent graph module; the SDKs are imported and the agents built on first use"""
+    from . import agents
+    return agents
+
+
+def prescorer():
+    """The rule-based fraud pre-scorer; numpy is imported when a claim is first assessed"""
+    from .fraud_scoring import fraud_prescorer
+    return fraud_prescorer
+
+
+def _parse_json_output(output: Any) -> Optional[Dict[str, Any]]:
+    """Parse an agent's final output as a JSON object, None if it isn't one"""
+    if isinstance(output, dict):
+        return output
+    if isinstance(output, str):
+        try:
+            parsed = json.loads(output)
+        except ValueError:
+            return None
+        if isinstance(parsed, dict):
+            return parsed
+    return None
+
+
+def _as_assessment(output: Any) -> Dict[str, Any]:
+    """Coerce an assessment, whether the agents' JSON text or a dict, into a dict"""
+    assessment = _parse_json_output(output)
+    return assessment if assessment is not None else {'assessment_text': output}
+
+
+def _as_claim(output: Any) -> Dict[str, Any]:
+    """Coerce the agent's final output into a claim dict"""
+    claim = _parse_json_output(output)
+    return claim if claim is not None else {'structured_claim': output}
+
+
+def _structuring_input(local_claim: Dict[str, Any], file_urls: List[Dict[str, str]]) -> str:
+    """Agent input for a claim, carrying what local parsing already found"""
+    return (
+        f"Claim: {local_claim['claim_text']}\nIncident Date: {local_claim['incident_date']}\n"
+        f"Policy Number: {local_claim['policy_number']}\nFiles: {file_urls}\n"
+        f"Extracted Features: {json.dumps(local_claim['features'])}"
+    )
+
+
+def save_submission(data: Dict[str, Any], files: Iterable[Tuple[Any, str]]):
+    """Store a submission's uploads and parse what it can locally.
+
+    `files` are (stream, filename) pairs. Returns the locally parsed claim,
+    the agent input for structuring it and the stored uploads.
+    """
+    # Files are stored by content hash, so repeated evidence is kept once
+    uploads = [upload_store.save(stream, secure_filename(filename)) for stream, filename in files]
+    file_urls = [{'filename': upload['filename'], 'path': upload['path']} for upload in uploads]
+    # Dates, amounts, policy numbers and evidence are parsed locally; the
+    # agent is only called when that leaves part of the claim unstructured
+    local_claim = extract_claim_features(
+        data.get('claim_text', ''), data.get('incident_date'), data.get('policy_number'),
+        [upload['filename'] for upload in uploads]
+    )
+    return local_claim, _structuring_input(local_claim, file_urls), uploads
+
+
+def needs_agent(local_claim: Optional[Dict[str, Any]]) -> bool:
+    return local_claim is None or not is_fully_structured(local_claim)
+
+
+def structuring_run(agent_input: str, force: bool = False):
+    """The agent run that structures a claim, as a coroutine"""
+    agents = load_agents()
+    return agents.run_agent(agent_input, bypass_cache=force, agent=agents.route_agent('submit'))
+
+
+def finish_structuring(output: Any, local_claim: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Turn the structuring agent's output into the claim to store"""
+    structured_claim = _as_claim(output)
+    if local_claim is not None:
+        structured_claim.setdefault('features', local_claim['features'])
+    return structured_claim
+
+
+def structure_claim(agent_input: str, local_claim: Optional[Dict[str, Any]] = None,
+                    timeout: Optional[float] = None, force: bool = False) -> Dict[str, Any]:
+    """Structure a claim, asking the agent only when parsing left fields empty"""
+    if not needs_agent(local_claim):
+        return dict(local_claim)
+    # Runs on the shared agent loop so the OpenAI client is reused
+    output = agent_runtime.run(structuring_run(agent_input, force), timeout=timeout)
+    return finish_structuring(output, local_claim)
+
+
+def curacel_status(entry: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'status': entry['status'],
+        'outbox_id': entry['id'],
+        'idempotency_key': entry['idempotency_key']
+    }
+
+
+def store_claim(structured_claim: Dict[str, Any], policy_number: Optional[str] = None,
+                user_id: Optional[int] = None, uploads=()):
+    """Store a structured claim and queue it for Curacel, returning the
+    stored claim and its Curacel delivery status"""
+    # Store claim and its Curacel outbox entry in one transaction,
+    # the database assigns the id
+    outbox = {}
+    def enqueue_for_curacel(conn, claim):
+        outbox.update(curacel_outbox.enqueue(claim['id'], claim, conn=conn))
+    structured_claim = claim_store.create_claim(
+        structured_claim, policy_number=policy_number, user_id=user_id,
+        after_insert=enqueue_for_curacel
+    )
+    upload_store.add_references(structured_claim['id'], uploads)
+    # The dispatcher delivers it to Curacel, we don't wait on the round trip
+    outbox_dispatcher.wake()
+    return structured_claim, curacel_status(outbox)
+
+
+def process_claim(agent_input: str, policy_number: Optional[str] = None, user_id: Optional[int] = None,
+                  uploads=(), job=None, timeout: Optional[float] = None, force: bool = False,
+                  local_claim: Optional[Dict[str, Any]] = None):
+    """Structure a claim, store it and queue it for Curacel"""
+    if job:
+        job.update(stage='structuring')
+    structured_claim = structure_claim(agent_input, local_claim, timeout, force)
+    return store_claim(structured_claim, policy_number, user_id, uploads)
+
+
+def run_claim_job(job, agent_input, policy_number, user_id, uploads, timeout, force, local_claim):
+    """process_claim as a JobQueue task"""
+    structured_claim, curacel = process_claim(
+        agent_input, policy_number, user_id, uploads, job, timeout, force, local_claim
+    )
+    return {'claim': structured_claim, 'curacel': curacel}
+
+
+def assessment_input(claim: Dict[str, Any], prescore: Optional[Dict[str, Any]] = None) -> str:
+    text = f"Assess this claim: {claim}"
+    if prescore is not None:
+        text += f"\nRule-based fraud indicators: {json.dumps(prescore['indicators'])}"
+    return text
+
+
+def _recent_claim_count(claim: Dict[str, Any]) -> int:
+    """Other claims filed against the same policy in the pre-scorer's recent window"""
+    if not claim.get('policy_number') or not claim.get('created_at'):
+        return 0
+    created_at = datetime.fromisoformat(claim['created_at'])
+    since = created_at - timedelta(days=prescorer().recent_days)
+    return claim_store.count_claims(claim['policy_number'], since.isoformat(), claim['created_at'])
+
+
+def prescore_claims(claims: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Rule-based fraud scores for a batch of claims, computed together"""
+    return prescorer().score(claims, [_recent_claim_count(claim) for claim in claims])
+
+
+def stored_assessment(claim: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """The assessment already made for this version of the claim, if any"""
+    stored = claim_store.get_assessment(claim['id'], claim['version'])
+    if stored is None:
+        return None
+    return {
+        'assessment': _as_assessment(stored['assessment']),
+        'version': stored['version'],
+        'assessed_at': stored['assessed_at'],
+        'cached': True
+    }
+
+
+def record_assessment(claim: Dict[str, Any], assessment: Any) -> Dict[str, Any]:
+    """Store a fresh assessment against the claim version it was made for"""
+    assessment = _as_assessment(assessment)
+    claim_store.save_assessment(claim['id'], claim['version'], assessment)
+    # Keep the latest risk score on the claim so listings can filter by it
+    if assessment.get('risk_score') is not None:
+        claim_store.set_risk_score(claim['id'], assessment['risk_score'])
+    return {'assessment': assessment, 'version': claim['version'], 'cached': False}
+
+
+def local_assessment(claim: Dict[str, Any], prescore: Dict[str, Any]) -> Dict[str, Any]:
+    """Record the pre-scorer's assessment of a claim it didn't escalate"""
+    return record_assessment(claim, prescorer().assessment(claim, prescore))
+
+
+def settled_assessment(claim: Dict[str, Any], force: bool = False):
+    """Answer an assessment without the agent where possible.
+
+    Returns (assessment response, None) when the claim needs no agent run,
+    else (None, prescore) for the run.
+    """
+    # Unchanged claims keep the assessment made for their current version
+    if not force:
+        stored = stored_assessment(claim)
+        if stored is not None:
+            return stored, None
+    # Only claims the rules find suspicious are escalated to the agent
+    prescore = prescore_claims([claim])[0]
+    if not prescore['escalate']:
+        return local_assessment(claim, prescore), None
+    return None, prescore
+
+
+def assessment_run(claim: Dict[str, Any], prescore: Dict[str, Any], force: bool = False):
+    """The agent pipeline run that assesses an escalated claim, as a coroutine"""
+    return load_agents().run_assessment_pipeline(assessment_input(claim, prescore), bypass_cache=force)
@@ -0,0 +1,292 @@
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime
+from typing import Callable, Optional, Dict, Any, List
+
+from .database import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claims (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    policy_number TEXT,
+    user_id INTEGER,
+    created_at TEXT NOT NULL,
+    risk_score REAL,
+    version INTEGER NOT NULL DEFAULT 1,
+    data TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claim_assessments (
+    claim_id INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    assessment TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (claim_id, version)
+);
+"""
+
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_claims_policy_number ON claims (policy_number);
+CREATE INDEX IF NOT EXISTS idx_claims_user_id ON claims (user_id);
+CREATE INDEX IF NOT EXISTS idx_claims_created_at ON claims (created_at);
+CREATE INDEX IF NOT EXISTS idx_claims_risk_score ON claims (risk_score);
+"""
+
+# Columns added after the first release, applied to existing databases
+MIGRATIONS = [
+    ('risk_score', 'REAL'),
+    ('version', 'INTEGER NOT NULL DEFAULT 1'),
+]
+
+
+def _as_risk_score(value) -> Optional[float]:
+    try:
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+class ClaimPage:
+    """One page of claims from a cursor query.
+
+    The ETag is computed from the raw rows and the cursor, so a conditional
+    request can be answered without decoding or re-serializing any claim,
+    and a full last page changes its ETag once a claim is added after it.
+    """
+
+    def __init__(self, rows, query_key: str, next_cursor: Optional[int]):
+        self._rows = rows
+        self.next_cursor = next_cursor
+        digest = hashlib.sha1(query_key.encode('utf-8'))
+        digest.update(b'next:%d;' % (next_cursor or 0))
+        for row in rows:
+            digest.update(b'%d:' % row['id'])
+            digest.update(row['data'].encode('utf-8'))
+        self.etag = digest.hexdigest()
+
+    @property
+    def claims(self) -> List[Dict[str, Any]]:
+        return [ClaimStore._row_to_claim(row) for row in self._rows]
+
+
+class ClaimStore:
+    """SQLite-backed claim repository.
+
+    The database runs in WAL mode so several worker processes can share the
+    file: readers never block the writer and ids come from AUTOINCREMENT
+    rather than a process-local counter. Each thread keeps its own connection.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 30.0):
+        self.db = SQLiteDatabase(path, self._create_schema, timeout)
+
+    @property
+    def path(self) -> Optional[str]:
+        return self.db.path
+
+    def init_app(self, app):
+        """Use the app's DATABASE setting as the claim database"""
+        path = app.config.get('DATABASE') or os.path.join(app.instance_path, 'claims.sqlite')
+        self.configure(path)
+        app.extensions['claim_store'] = self
+
+    def configure(self, path: str):
+        """Point the store at a database file, dropping connections to the old one"""
+        self.db.configure(path)
+
+    def _connect(self) -> sqlite3.Connection:
+        return self.db.connection()
+
+    @classmethod
+    def _create_schema(cls, conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+        cls._migrate(conn)
+        conn.executescript(INDEXES)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection):
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(claims)')}
+        for name, column_type in MIGRATIONS:
+            if name not in columns:
+                conn.execute(f'ALTER TABLE claims ADD COLUMN {name} {column_type}')
+
+    @staticmethod
+    def _row_to_claim(row: sqlite3.Row) -> Dict[str, Any]:
+        claim = json.loads(row['data'])
+        claim['id'] = row['id']
+        # Claims stored before versioning are on their first version
+        claim.setdefault('version', 1)
+        return claim
+
+    def create_claim(self, claim: Dict[str, Any], policy_number: Optional[str] = None,
+                     user_id: Optional[int] = None,
+                     after_insert: Optional[Callable[[sqlite3.Connection, Dict[str, Any]], Any]] = None
+                     ) -> Dict[str, Any]:
+        """Store a new claim and return it with its assigned id.
+
+        `after_insert(conn, claim)` runs inside the insert transaction, so
+        rows it writes on `conn` commit or roll back together with the claim.
+        """
+        record = dict(claim)
+        record.pop('id', None)
+        record.setdefault('created_at', datetime.utcnow().isoformat())
+        record['version'] = 1
+        if policy_number is None:
+            policy_number = record.get('policy_number')
+
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                'INSERT INTO claims (policy_number, user_id, created_at, risk_score, data) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (policy_number, user_id, record['created_at'],
+                 _as_risk_score(record.get('risk_score')), json.dumps(record))
+            )
+            record['id'] = cursor.lastrowid
+            if after_insert is not None:
+                after_insert(conn, record)
+        return record
+
+    def get_claim(self, claim_id: int) -> Optional[Dict[str, Any]]:
+        """Get claim by ID"""
+        row = self._connect().execute(
+            'SELECT id, data FROM claims WHERE id = ?', (claim_id,)
+        ).fetchone()
+        return self._row_to_claim(row) if row else None
+
+    def update_claim(self, claim_id: int, changes: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Apply changes to a claim and bump its content version"""
+        changes = {k: v for k, v in changes.items() if k not in ('id', 'version', 'created_at')}
+        conn = self._connect()
+        with conn:
+            # Take the write lock up front so concurrent updates can't lose a version
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT id, policy_number, version, data FROM claims WHERE id = ?', (claim_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            record = json.loads(row['data'])
+            record.update(changes)
+            record['version'] = row['version'] + 1
+            # A policy number given at creation is only in its column
+            conn.execute(
+                'UPDATE claims SET policy_number = ?, risk_score = ?, version = ?, data = ? WHERE id = ?',
+                (record.get('policy_number', row['policy_number']), _as_risk_score(record.get('risk_score')),
+                 record['version'], json.dumps(record), claim_id)
+            )
+        record['id'] = claim_id
+        return record
+
+    def get_assessment(self, claim_id: int, version: int) -> Optional[Dict[str, Any]]:
+        """Get the stored assessment of one version of a claim"""
+        row = self._connect().execute(
+            'SELECT assessment, created_at FROM claim_assessments WHERE claim_id = ? AND version = ?',
+            (claim_id, version)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'assessment': json.loads(row['assessment']), 'version': version,
+                'assessed_at': row['created_at']}
+
+    def save_assessment(self, claim_id: int, version: int, assessment: Any):
+        """Store the assessment of one version of a claim, replacing older runs"""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO claim_assessments (claim_id, version, assessment, created_at) '
+                'VALUES (?, ?, ?, ?)',
+                (claim_id, version, json.dumps(assessment), datetime.utcnow().isoformat())
+            )
+            # Assessments of superseded versions can never be served again
+            conn.execute(
+                'DELETE FROM claim_assessments WHERE claim_id = ? AND version < ?',
+                (claim_id, version)
+            )
+
+    def list_claims(self) -> List[Dict[str, Any]]:
+        """Get all claims, oldest first"""
+        rows = self._connect().execute('SELECT id, data FROM claims ORDER BY id').fetchall()
+        return [self._row_to_claim(row) for row in rows]
+
+    def list_claims_page(self, after: Optional[int] = None, limit: int = 50,
+                         policy_number: Optional[str] = None,
+                         created_from: Optional[str] = None,
+                         created_before: Optional[str] = None,
+                         min_risk: Optional[float] = None,
+                         max_risk: Optional[float] = None) -> ClaimPage:
+        """Get up to `limit` claims with ids greater than the `after` cursor"""
+        clauses, params = [], []
+        filters = [
+            ('id > ?', after),
+            ('policy_number = ?', policy_number),
+            ('created_at >= ?', created_from),
+            ('created_at < ?', created_before),
+            ('risk_score >= ?', min_risk),
+            ('risk_score <= ?', max_risk),
+        ]
+        for clause, value in filters:
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+
+        # Fetch one extra row to learn whether another page follows
+        rows = self._connect().execute(
+            f'SELECT id, data FROM claims {where} ORDER BY id LIMIT ?', (*params, limit + 1)
+        ).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]['id']
+        query_key = json.dumps([clauses, params, limit])
+        return ClaimPage(rows, query_key, next_cursor)
+
+    def set_risk_score(self, claim_id: int, risk_score) -> bool:
+        """Record the latest risk score for a claim"""
+        score = _as_risk_score(risk_score)
+        conn = self._connect()
+        with conn:
+            cursor = conn.execute(
+                "UPDATE claims SET risk_score = ?, data = json_set(data, '$.risk_score', ?) WHERE id = ?",
+                (score, score, claim_id)
+            )
+        return cursor.rowcount > 0
+
+    def get_claims_by_policy_number(self, policy_number: str) -> List[Dict[str, Any]]:
+        """Get claims filed against a policy"""
+        rows = self._connect().execute(
+            'SELECT id, data FROM claims WHERE policy_number = ? ORDER BY id', (policy_number,)
+        ).fetchall()
+        return [self._row_to_claim(row) for row in rows]
+
+    def count_claims(self, policy_number: str, created_from: Optional[str] = None,
+                     created_before: Optional[str] = None) -> int:
+        """Count claims filed against a policy, optionally within a creation window"""
+        clauses, params = ['policy_number = ?'], [policy_number]
+        if created_from is not None:
+            clauses.append('created_at >= ?')
+            params.append(created_from)
+        if created_before is not None:
+            clauses.append('created_at < ?')
+            params.append(created_before)
+        row = self._connect().execute(
+            f"SELECT COUNT(*) FROM claims WHERE {' AND '.join(clauses)}", params
+        ).fetchone()
+        return row[0]
+
+    def get_claims_by_user(self, user_id: int) -> List[Dict[str, Any]]:
+        """Get claims owned by a user"""
+        rows = self._connect().execute(
+            'SELECT id, data FROM claims WHERE user_id = ? ORDER BY id', (user_id,)
+        ).fetchall()
+        return [self._row_to_claim(row) for row in rows]
+
+    def close(self):
+        """Close this thread's connection"""
+        self.db.close()
+
+
+# Configured with the app's DATABASE path when the claims blueprint is registered
+claim_store = ClaimStore()
@@ -1,19 +1,220 @@
 import os
-import requests
+import asyncio
+import threading
+import time
+import uuid
+
+from .metrics import curacel_errors, curacel_request_seconds
 
 CURACEL_API_URL = os.getenv('CURACEL_API_URL', 'https://api.curacel.co/grow/v1')
 CURACEL_API_KEY = os.getenv('CURACEL_API_KEY')
 
-def submit_claim_to_curacel(structured_claim):
-    """Submit a structured claim to Curacel Grow API."""
-    url = f"{CURACEL_API_URL}/claims"
-    headers = {
-        'Authorization': f'Bearer {CURACEL_API_KEY}',
-        'Content-Type': 'application/json',
+# Responses worth trying again: the request may succeed on another attempt
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def _is_timeout(error):
+    """Whether a requests error was a timeout, including one that exhausted retries"""
+    import requests
+    import urllib3
+    if isinstance(error, requests.exceptions.Timeout):
+        return True
+    # Retried timeouts surface as ConnectionError wrapping urllib3's MaxRetryError
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, urllib3.exceptions.TimeoutError)
+
+
+def _status_outcome(status):
+    return f"{status // 100}xx"
+
+
+def _observe(client, outcome, started):
+    curacel_request_seconds.labels(client, outcome).observe(time.perf_counter() - started)
+    if outcome != 'success':
+        curacel_errors.labels(client, outcome).inc()
+
+
+class CuracelClient:
+    """Client for the Curacel Grow API over a pooled requests.Session.
+
+    Connections are kept alive and reused across claims, every call is bounded
+    by connect/read timeouts, and 5xx responses or connection errors are
+    retried with exponential backoff. Retried submissions always carry an
+    Idempotency-Key, so a retry can't create the claim twice.
+    """
+
+    def __init__(self, base_url: str = CURACEL_API_URL, api_key: str = CURACEL_API_KEY,
+                 pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_factor: float = 0.5):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self) -> 'requests.Session':
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> 'requests.Session':
+        # Imported on first use so app startup doesn't pay for requests
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(['GET', 'POST']),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def max_call_seconds(self) -> float:
+        """Longest a submit_claim call can take: every attempt timing out, plus the backoff between them"""
+        connect_timeout, read_timeout = self.timeout
+        backoff = sum(self.backoff_factor * (2 ** attempt) for attempt in range(self.max_retries))
+        return (self.max_retries + 1) * (connect_timeout + read_timeout) + backoff
+
+    def _headers(self, idempotency_key=None):
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+        }
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        return headers
+
+    def submit_claim(self, structured_claim, idempotency_key=None):
+        """Submit a structured claim, returning (body, status_code)"""
+        started = time.perf_counter()
+        if idempotency_key is None and self.max_retries:
+            idempotency_key = uuid.uuid4().hex
+        body, status, outcome = self._submit(structured_claim, idempotency_key)
+        _observe('sync', outcome, started)
+        return body, status
+
+    def _submit(self, structured_claim, idempotency_key):
+        import requests
+        try:
+            response = self.session.post(
+                f"{self.base_url}/claims",
+                json=structured_claim,
+                headers=self._headers(idempotency_key),
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            if _is_timeout(e):
+                return {'error': 'Curacel request timed out', 'details': str(e)}, 504, 'timeout'
+            return {'error': 'Curacel request failed', 'details': str(e)}, 502, 'connection_error'
+        try:
+            response.raise_for_status()
+            return response.json(), response.status_code, 'success'
+        except Exception as e:
+            return {'error': str(e), 'details': response.text}, response.status_code, _status_outcome(response.status_code)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+
+class AsyncCuracelClient:
+    """Async counterpart of CuracelClient for use on the agent event loop"""
+
+    def __init__(self, base_url: str = CURACEL_API_URL, api_key: str = CURACEL_API_KEY,
+                 pool_size: int = 10, connect_timeout: float = 3.05, read_timeout: float = 30.0,
+                 max_retries: int = 3, backoff_factor: float = 0.5):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self._client = None
+
+    @property
+    def client(self):
+        # Built on first use so it binds to the loop that awaits it
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_size,
+                                    max_keepalive_connections=self.pool_size),
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            )
+        return self._client
+
+    async def submit_claim(self, structured_claim, idempotency_key=None):
+        """Submit a structured claim, returning (body, status_code)"""
+        started = time.perf_counter()
+        # Every attempt sends the same key, so a retry can't create the claim twice
+        if idempotency_key is None and self.max_retries:
+            idempotency_key = uuid.uuid4().hex
+        body, status, outcome = await self._submit(structured_claim, idempotency_key)
+        _observe('async', outcome, started)
+        return body, status
+
+    async def _submit(self, structured_claim, idempotency_key):
+        import httpx
+        headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json',
+        }
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.post(
+                    f"{self.base_url}/claims", json=structured_claim, headers=headers
+                )
+            except httpx.TimeoutException as e:
+                if last_attempt:
+                    return {'error': 'Curacel request timed out', 'details': str(e)}, 504, 'timeout'
+            except httpx.TransportError as e:
+                if last_attempt:
+                    return {'error': 'Curacel request failed', 'details': str(e)}, 502, 'connection_error'
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    if response.is_success:
+                        return response.json(), response.status_code, 'success'
+                    return ({'error': f'{response.status_code} Error', 'details': response.text},
+                            response.status_code, _status_outcome(response.status_code))
+            await asyncio.sleep(self.backoff_factor * (2 ** attempt))
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _client_settings():
+    return {
+        'pool_size': int(os.getenv('CURACEL_POOL_SIZE', '10')),
+        'connect_timeout': float(os.getenv('CURACEL_CONNECT_TIMEOUT', '3.05')),
+        'read_timeout': float(os.getenv('CURACEL_READ_TIMEOUT', '30')),
+        'max_retries': int(os.getenv('CURACEL_MAX_RETRIES', '3')),
+        'backoff_factor': float(os.getenv('CURACEL_BACKOFF_FACTOR', '0.5')),
     }
-    response = requests.post(url, json=structured_claim, headers=headers)
-    try:
-        response.raise_for_status()
-        return response.json(), response.status_code
-    except Exception as e:
-        return {'error': str(e), 'details': response.text}, response.status_code
+
+# Claims reach Curacel through the outbox, which schedules its own retries,
+# so its deliveries make one attempt each; one connection pool per process
+outbox_curacel_client = CuracelClient(**{**_client_settings(), 'max_retries': 0})
@@ -0,0 +1,328 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
+
+from .curacel_client import outbox_curacel_client
+from .database import SQLiteDatabase
+
+PENDING = 'pending'
+IN_FLIGHT = 'in_flight'
+DELIVERED = 'delivered'
+DEAD = 'dead'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS curacel_outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    claim_id INTEGER,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT,
+    response TEXT,
+    lease_token TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_curacel_outbox_due ON curacel_outbox (status, next_attempt_at);
+CREATE INDEX IF NOT EXISTS idx_curacel_outbox_claim_id ON curacel_outbox (claim_id);
+"""
+
+logger = logging.getLogger(__name__)
+
+# Client errors that may succeed later; any other 4xx is dead-lettered at once
+RETRYABLE_CLIENT_ERRORS = (408, 409, 425, 429)
+
+
+class CuracelOutbox:
+    """Durable queue of claims waiting to be delivered to Curacel.
+
+    Rows are leased to a dispatcher while in flight, so several worker
+    processes can drain the same table without delivering a claim twice;
+    a lease that expires (e.g. the process died) makes the row due again
+    and counts as an attempt, so a row that keeps crashing its dispatcher
+    is dead-lettered like any other failure.
+    Each lease carries a token and only its holder can record the outcome,
+    so a dispatcher whose lease ran out can't overwrite the new holder's.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_attempts: int = 8,
+                 base_delay: float = 2.0, max_delay: float = 600.0, lease: float = 120.0):
+        self.db = SQLiteDatabase(db_path, self._create_schema)
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease = lease
+
+    def init_app(self, app):
+        """Keep the outbox in the same DATABASE file as the claims"""
+        db_path = app.config.get('DATABASE') or os.path.join(app.instance_path, 'claims.sqlite')
+        self.db.configure(db_path)
+        # Create the table up front: enqueue may run inside another store's
+        # write transaction, where a schema change would wait on that lock
+        self.db.connection()
+        app.extensions['curacel_outbox'] = self
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(curacel_outbox)')}
+        if 'lease_token' not in columns:
+            conn.execute('ALTER TABLE curacel_outbox ADD COLUMN lease_token TEXT')
+
+    @staticmethod
+    def _row_to_entry(row: sqlite3.Row) -> Dict[str, Any]:
+        entry = dict(row)
+        entry['payload'] = json.loads(entry['payload'])
+        entry['response'] = json.loads(entry['response']) if entry['response'] else None
+        return entry
+
+    def enqueue(self, claim_id: Optional[int], payload: Dict[str, Any],
+                conn: Optional[sqlite3.Connection] = None) -> Dict[str, Any]:
+        """Queue a claim for delivery.
+
+        Pass `conn` to write inside the caller's transaction (it must be a
+        connection to the same, already initialized database) so the claim
+        and its outbox row are committed together.
+        """
+        own_conn = None
+        if conn is None:
+            conn = own_conn = self.db.connection()
+        now = time.time()
+        key = f"claim-{claim_id}-{uuid.uuid4().hex}"
+        cursor = conn.execute(
+            'INSERT INTO curacel_outbox (claim_id, idempotency_key, payload, status, '
+            'next_attempt_at, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (claim_id, key, json.dumps(payload), PENDING, now, now, now)
+        )
+        if conn is own_conn:
+            conn.commit()
+        return {'id': cursor.lastrowid, 'idempotency_key': key, 'status': PENDING}
+
+    def lease_batch(self, limit: int, lease: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Take up to `limit` due entries and lease them to the caller for
+        `lease` seconds (default `self.lease`).
+
+        Each entry's `lease_token` must be passed back to mark_delivered or
+        mark_failed.
+        """
+        now = time.time()
+        lease = self.lease if lease is None else lease
+        token = uuid.uuid4().hex
+        conn = self.db.connection()
+        leased, dead = [], []
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            rows = conn.execute(
+                'SELECT * FROM curacel_outbox WHERE status IN (?, ?) AND next_attempt_at <= ? '
+                'ORDER BY next_attempt_at LIMIT ?',
+                (PENDING, IN_FLIGHT, now, limit)
+            ).fetchall()
+            for row in rows:
+                attempts = row['attempts']
+                if row['status'] == IN_FLIGHT:
+                    # The last holder never recorded an outcome before its lease ran out
+                    attempts += 1
+                    if attempts >= self.max_attempts:
+                        dead.append((DEAD, attempts, now, 'Lease expired before the delivery was recorded',
+                                     now, row['id']))
+                        continue
+                leased.append((row, attempts))
+            conn.executemany(
+                'UPDATE curacel_outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, '
+                'lease_token = NULL, updated_at = ? WHERE id = ?',
+                dead
+            )
+            conn.executemany(
+                'UPDATE curacel_outbox SET status = ?, attempts = ?, next_attempt_at = ?, lease_token = ?, '
+                'updated_at = ? WHERE id = ?',
+                [(IN_FLIGHT, attempts, now + lease, token, now, row['id']) for row, attempts in leased]
+            )
+        return [dict(self._row_to_entry(row), status=IN_FLIGHT, attempts=attempts, lease_token=token)
+                for row, attempts in leased]
+
+    def mark_delivered(self, entry_id: int, lease_token: str, response: Any) -> bool:
+        """Record a delivery, False if the lease was lost to another dispatcher"""
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            cursor = conn.execute(
+                'UPDATE curacel_outbox SET status = ?, attempts = attempts + 1, response = ?, '
+                'last_error = NULL, lease_token = NULL, updated_at = ? WHERE id = ? AND lease_token = ?',
+                (DELIVERED, json.dumps(response), now, entry_id, lease_token)
+            )
+        return cursor.rowcount > 0
+
+    def mark_failed(self, entry_id: int, lease_token: str, error: str,
+                    retryable: bool = True) -> Optional[str]:
+        """Record a failed attempt; reschedule with backoff or dead-letter it.
+
+        Returns the entry's new status, None if the lease was lost to
+        another dispatcher.
+        """
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute(
+                'SELECT attempts FROM curacel_outbox WHERE id = ? AND lease_token = ?',
+                (entry_id, lease_token)
+            ).fetchone()
+            if row is None:
+                return None
+            attempts = row['attempts'] + 1
+            if retryable and attempts < self.max_attempts:
+                status = PENDING
+                next_attempt_at = now + min(self.max_delay, self.base_delay * (2 ** (attempts - 1)))
+            else:
+                status = DEAD
+                next_attempt_at = now
+            conn.execute(
+                'UPDATE curacel_outbox SET status = ?, attempts = ?, next_attempt_at = ?, '
+                'last_error = ?, lease_token = NULL, updated_at = ? WHERE id = ? AND lease_token = ?',
+                (status, attempts, next_attempt_at, error, now, entry_id, lease_token)
+            )
+        return status
+
+    def requeue(self, entry_id: int) -> bool:
+        """Give a dead-lettered entry a fresh set of attempts"""
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            cursor = conn.execute(
+                'UPDATE curacel_outbox SET status = ?, attempts = 0, next_attempt_at = ?, '
+                'updated_at = ? WHERE id = ? AND status = ?',
+                (PENDING, now, now, entry_id, DEAD)
+            )
+        return cursor.rowcount > 0
+
+    def get_entry(self, entry_id: int) -> Optional[Dict[str, Any]]:
+        row = self.db.connection().execute(
+            'SELECT * FROM curacel_outbox WHERE id = ?', (entry_id,)
+        ).fetchone()
+        return self._row_to_entry(row) if row else None
+
+    def get_entries_for_claim(self, claim_id: int) -> List[Dict[str, Any]]:
+        rows = self.db.connection().execute(
+            'SELECT * FROM curacel_outbox WHERE claim_id = ? ORDER BY id', (claim_id,)
+        ).fetchall()
+        return [self._row_to_entry(row) for row in rows]
+
+    def stats(self) -> Dict[str, int]:
+        """Number of entries in each status"""
+        counts = {PENDING: 0, IN_FLIGHT: 0, DELIVERED: 0, DEAD: 0}
+        for row in self.db.connection().execute(
+            'SELECT status, COUNT(*) AS n FROM curacel_outbox GROUP BY status'
+        ):
+            counts[row['status']] = row['n']
+        return counts
+
+
+class OutboxDispatcher:
+    """Background thread that drains the outbox in batches.
+
+    Batches are leased for as long as delivering them can take: the
+    client's worst-case call time for every round of `concurrency`
+    deliveries, plus `lease_margin`. The outbox does the retrying, so
+    `client` should make a single attempt per call.
+    """
+
+    def __init__(self, outbox: CuracelOutbox, client, batch_size: int = 20,
+                 poll_interval: float = 1.0, concurrency: int = 4, lease_margin: float = 30.0):
+        self.outbox = outbox
+        self.client = client
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.concurrency = concurrency
+        rounds = -(-batch_size // concurrency)
+        self.lease = rounds * client.max_call_seconds() + lease_margin
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _deliver(self, entry: Dict[str, Any]) -> str:
+        try:
+            body, status = self.client.submit_claim(
+                entry['payload'], idempotency_key=entry['idempotency_key']
+            )
+        except Exception as e:
+            logger.exception('Delivering outbox entry %s to Curacel failed', entry['id'])
+            return self.outbox.mark_failed(entry['id'], entry['lease_token'], str(e))
+        if 200 <= status < 300:
+            self.outbox.mark_delivered(entry['id'], entry['lease_token'], body)
+            return DELIVERED
+        retryable = status >= 500 or status in RETRYABLE_CLIENT_ERRORS
+        return self.outbox.mark_failed(
+            entry['id'], entry['lease_token'], f"{status}: {json.dumps(body)}", retryable
+        )
+
+    def dispatch_once(self) -> int:
+        """Deliver one batch of due entries, returning how many were attempted"""
+        batch = self.outbox.lease_batch(self.batch_size, self.lease)
+        if not batch:
+            return 0
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.concurrency, thread_name_prefix='curacel-outbox'
+            )
+        list(self._executor.map(self._deliver, batch))
+        return len(batch)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                delivered = self.dispatch_once()
+            except Exception:
+                logger.exception('Curacel outbox dispatch failed')
+                delivered = 0
+            # A full batch means more may be waiting, otherwise sleep until poked
+            if delivered < self.batch_size:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def start(self):
+        """Start the dispatcher thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='curacel-outbox', daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Deliver new entries now instead of at the next poll"""
+        self._wake.set()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            self._stop.set()
+            self._wake.set()
+            if self._thread is not None:
+                self._thread.join(timeout)
+                self._thread = None
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+# Configured with the app's DATABASE path when the claims blueprint is registered
+curacel_outbox = CuracelOutbox(
+    max_attempts=int(os.getenv('CURACEL_OUTBOX_MAX_ATTEMPTS', '8'))
+)
+
+# Delivers queued claims to Curacel in the background, started when the
+# claims blueprint is registered
+outbox_dispatcher = OutboxDispatcher(
+    curacel_outbox, outbox_curacel_client,
+    batch_size=int(os.getenv('CURACEL_OUTBOX_BATCH_SIZE', '20')),
+    poll_interval=float(os.getenv('CURACEL_OUTBOX_POLL_INTERVAL', '1.0'))
+)
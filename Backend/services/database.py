@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import threading
+from typing import Callable, Optional
+
+
+class SQLiteDatabase:
+    """Per-thread, per-process connections to one SQLite file in WAL mode.
+
+    `initialize` runs once per database path on the first connection and is
+    where stores create their tables and indexes.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 initialize: Optional[Callable[[sqlite3.Connection], None]] = None,
+                 timeout: float = 30.0):
+        self.path = path
+        self.initialize = initialize
+        self.timeout = timeout
+        self._local = threading.local()
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    def configure(self, path: str):
+        """Point at a database file, dropping connections to the old one"""
+        with self._init_lock:
+            self.path = path
+            self._initialized = False
+            self._local = threading.local()
+
+    def connection(self) -> sqlite3.Connection:
+        """Get this thread's connection, opening it if needed"""
+        if not self.path:
+            raise RuntimeError("Database path is not configured")
+        local = self._local
+        conn = getattr(local, 'conn', None)
+        # Connections must not be shared with a forked child process
+        if conn is None or local.pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            local.conn = conn
+            local.pid = os.getpid()
+        if not self._initialized:
+            with self._init_lock:
+                if not self._initialized:
+                    if self.initialize is not None:
+                        self.initialize(conn)
+                    self._initialized = True
+        return conn
+
+    def close(self):
+        """Close this thread's connection"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
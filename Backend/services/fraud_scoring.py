@@ -0,0 +1,263 @@
+import os
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .claim_features import extract_amounts, extract_dates, extract_evidence
+
+# Categories of the fraud analysis agent's output, in its order
+CATEGORIES = (
+    'narrative_consistency',
+    'detail_level',
+    'supporting_evidence',
+    'timing_patterns',
+    'language_patterns',
+    'claim_characteristics',
+    'behavioral_flags',
+)
+
+POLICY_CHANGE = re.compile(
+    r'\b(?:(?:just|recently) (?:bought|took out|renewed|upgraded|increased|changed|extended)'
+    r'|new policy|policy (?:was )?(?:upgraded|increased|changed)|added (?:cover|coverage))\b', re.I
+)
+PREVIOUS_CLAIMS = re.compile(r'\b(?:another|previous|prior|last|second|third) claims?\b', re.I)
+MAXIMUM_COVERAGE = re.compile(r'\b(?:maximum|max|full|entire) (?:coverage|cover|payout|amount|limit)\b|\bpolicy limit\b', re.I)
+EVIDENCE_LOSS = re.compile(
+    r"\b(?:lost|misplaced|threw away|thrown away|destroyed|deleted) (?:the |my |all )?"
+    r"(?:receipts?|photos?|pictures?|invoices?|documents?|evidence|footage)\b"
+    r"|\b(?:no|don't have any|can't find the) (?:receipts?|photos?|pictures?|witnesses|evidence)\b", re.I
+)
+DEFENSIVE = re.compile(
+    r"\b(?:honestly|to be honest|i swear|believe me|trust me|i promise|i would never|"
+    r"i'm telling the truth|i am telling the truth|not my fault)\b", re.I
+)
+URGENCY = re.compile(
+    r'\b(?:urgent(?:ly)?|asap|as soon as possible|immediately|right away|need the money|'
+    r'quick(?:ly)? settle(?:ment)?|settle (?:this )?(?:quickly|fast|now))\b', re.I
+)
+POLICY_JARGON = re.compile(
+    r'\b(?:deductible|subrogation|depreciation|actual cash value|replacement cost|'
+    r'exclusion clause|rider|endorsement|indemnity)\b', re.I
+)
+
+# Signals computed for every claim, each scaled to 0..1
+SIGNALS = (
+    'future_incident', 'date_conflict', 'vague', 'verbose', 'no_evidence', 'evidence_loss',
+    'policy_change', 'late_report', 'defensive', 'round_amounts', 'near_coverage_limit',
+    'recent_claims', 'urgency', 'policy_jargon',
+)
+
+# How much each signal contributes to each category's confidence
+WEIGHTS = np.zeros((len(SIGNALS), len(CATEGORIES)))
+for signal, category, weight in (
+    ('future_incident', 'narrative_consistency', 0.9),
+    ('date_conflict', 'narrative_consistency', 0.6),
+    ('vague', 'detail_level', 0.7),
+    ('verbose', 'detail_level', 0.4),
+    ('no_evidence', 'supporting_evidence', 0.4),
+    ('evidence_loss', 'supporting_evidence', 0.8),
+    ('policy_change', 'timing_patterns', 0.7),
+    ('late_report', 'timing_patterns', 0.5),
+    ('defensive', 'language_patterns', 0.7),
+    ('round_amounts', 'claim_characteristics', 0.4),
+    ('near_coverage_limit', 'claim_characteristics', 0.7),
+    ('recent_claims', 'claim_characteristics', 0.8),
+    ('urgency', 'behavioral_flags', 0.6),
+    ('policy_jargon', 'behavioral_flags', 0.4),
+):
+    WEIGHTS[SIGNALS.index(signal), CATEGORIES.index(category)] = weight
+
+EXPLANATIONS = {
+    'future_incident': 'The incident date is after the claim was filed.',
+    'date_conflict': 'The stated incident date does not match any date in the description.',
+    'vague': 'The description is too short to verify what happened.',
+    'verbose': 'The description carries an unusual amount of detail.',
+    'no_evidence': 'No photos, reports, receipts or witnesses are mentioned or attached.',
+    'evidence_loss': 'The claimant reports that evidence was lost or is unavailable.',
+    'policy_change': 'The policy was changed or taken out shortly before the incident.',
+    'late_report': 'The incident was reported long after it happened.',
+    'defensive': 'The language is defensive or over-explains.',
+    'round_amounts': 'The amounts claimed are round numbers.',
+    'near_coverage_limit': 'The amount claimed is at or near the coverage limit.',
+    'recent_claims': 'Other claims were filed against this policy recently.',
+    'urgency': 'The claimant is pressing for a quick settlement.',
+    'policy_jargon': 'The claimant uses unusually specific policy terminology.',
+}
+
+DETECTION_CONFIDENCE = 0.5
+
+
+def _parse_date(value, default: str) -> np.datetime64:
+    try:
+        return np.datetime64(datetime.fromisoformat(str(value)).date(), 'D')
+    except ValueError:
+        return np.datetime64(default, 'D')
+
+
+class FraudPreScorer:
+    """Rule-based fraud indicators scored as arrays over a batch of claims.
+
+    Produces the fraud analysis agent's schema (detected, confidence,
+    evidence, explanation per category) plus an overall `score`. Only
+    claims scoring at or above `threshold` need the LLM agent.
+    """
+
+    def __init__(self, threshold: float = 0.5, coverage_limit: Optional[float] = None,
+                 recent_days: int = 90, late_report_days: int = 30):
+        self.threshold = threshold
+        self.coverage_limit = coverage_limit
+        self.recent_days = recent_days
+        self.late_report_days = late_report_days
+
+    def _text_columns(self, claims: Sequence[Dict[str, Any]]):
+        """Per-claim counts and matches that need the claim text"""
+        columns = {name: [] for name in (
+            'words', 'evidence', 'attachments', 'policy_change', 'previous_claims', 'max_coverage',
+            'evidence_loss', 'defensive', 'urgency', 'policy_jargon', 'date_conflict',
+        )}
+        amounts, matches = [], []
+        for claim in claims:
+            text = claim.get('claim_text') or ''
+            features = claim.get('features') or {
+                'dates': extract_dates(text),
+                'amounts': extract_amounts(text),
+                'evidence': extract_evidence(text),
+            }
+            dates = features.get('dates') or []
+            found = {
+                'policy_change': POLICY_CHANGE.findall(text),
+                'previous_claims': PREVIOUS_CLAIMS.findall(text),
+                'max_coverage': MAXIMUM_COVERAGE.findall(text),
+                'evidence_loss': EVIDENCE_LOSS.findall(text),
+                'defensive': DEFENSIVE.findall(text),
+                'urgency': URGENCY.findall(text),
+                'policy_jargon': POLICY_JARGON.findall(text),
+            }
+            for name, values in found.items():
+                columns[name].append(len(values))
+            incident_date = claim.get('incident_date')
+            columns['words'].append(len(text.split()))
+            columns['evidence'].append(len(features.get('evidence') or []))
+            columns['attachments'].append(len(claim.get('attached_files') or []))
+            columns['date_conflict'].append(bool(dates and incident_date and str(incident_date)[:10] not in dates))
+            amounts.append([a['amount'] for a in features.get('amounts') or []])
+            matches.append(found)
+        return {name: np.array(values, dtype=float) for name, values in columns.items()}, amounts, matches
+
+    def signals(self, claims: Sequence[Dict[str, Any]],
+                recent_claims: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Matrix of signal strengths, one row per claim and one column per SIGNALS entry"""
+        return self._signals(claims, recent_claims)[0]
+
+    def _signals(self, claims, recent_claims):
+        n = len(claims)
+        cols, amounts, matches = self._text_columns(claims)
+
+        # Amounts are ragged, so pad them into an (n, k) array with NaN
+        width = max((len(a) for a in amounts), default=0) or 1
+        padded = np.full((n, width), np.nan)
+        for i, values in enumerate(amounts):
+            padded[i, :len(values)] = values
+        has_amount = ~np.isnan(padded)
+        counted = np.maximum(has_amount.sum(axis=1), 1)
+        round_share = (has_amount & (padded >= 500) & (np.fmod(padded, 500) == 0)).sum(axis=1) / counted
+        largest = np.nanmax(np.where(has_amount, padded, -np.inf), axis=1)
+        if self.coverage_limit:
+            near_limit = np.clip((largest / self.coverage_limit - 0.8) / 0.2, 0, 1)
+        else:
+            near_limit = np.zeros(n)
+        near_limit = np.maximum(near_limit, np.minimum(cols['max_coverage'], 1))
+
+        incident = np.array([_parse_date(c.get('incident_date'), 'NaT') for c in claims], dtype='datetime64[D]')
+        filed = np.array([_parse_date(c.get('created_at'), 'today') for c in claims], dtype='datetime64[D]')
+        delay = (filed - incident).astype(float)
+        delay[np.isnat(incident)] = np.nan
+        late = np.nan_to_num(np.clip((delay - self.late_report_days) / (2 * self.late_report_days), 0, 1))
+        future = np.nan_to_num(delay < 0).astype(float)
+
+        prior = np.zeros(n) if recent_claims is None else np.asarray(recent_claims, dtype=float)
+        prior = prior + np.minimum(cols['previous_claims'], 1)
+
+        values = {
+            'future_incident': future,
+            'date_conflict': cols['date_conflict'],
+            'vague': np.clip((30 - cols['words']) / 25, 0, 1),
+            'verbose': np.clip((cols['words'] - 600) / 600, 0, 1),
+            'no_evidence': ((cols['evidence'] + cols['attachments']) == 0).astype(float),
+            'evidence_loss': np.minimum(cols['evidence_loss'], 1),
+            'policy_change': np.minimum(cols['policy_change'], 1),
+            'late_report': late,
+            'defensive': np.minimum(cols['defensive'] / 2, 1),
+            'round_amounts': round_share,
+            'near_coverage_limit': near_limit,
+            'recent_claims': np.minimum(prior / 2, 1),
+            'urgency': np.minimum(cols['urgency'] / 2, 1),
+            'policy_jargon': np.minimum(cols['policy_jargon'] / 2, 1),
+        }
+        return np.column_stack([values[name] for name in SIGNALS]), matches
+
+    def score(self, claims: Sequence[Dict[str, Any]],
+              recent_claims: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+        """Score claims, `recent_claims` giving the number of other recent claims per policy"""
+        if not claims:
+            return []
+        signals, matches = self._signals(claims, recent_claims)
+        # A category is as strong as its strongest weighted signal
+        confidence = (signals[:, :, None] * WEIGHTS[None, :, :]).max(axis=1)
+        # Independent categories combine like independent probabilities
+        overall = 1 - np.prod(1 - confidence, axis=1)
+
+        results = []
+        for i in range(len(claims)):
+            indicators = {}
+            for j, category in enumerate(CATEGORIES):
+                fired = [SIGNALS[k] for k in np.flatnonzero(WEIGHTS[:, j] * signals[i] > 0)]
+                evidence = [m for name in fired for m in matches[i].get(_MATCH_SOURCE.get(name), [])]
+                indicators[category] = {
+                    'detected': bool(confidence[i, j] >= DETECTION_CONFIDENCE),
+                    'confidence': round(float(confidence[i, j]), 3),
+                    'evidence': '; '.join(dict.fromkeys(evidence)) or None,
+                    'explanation': ' '.join(EXPLANATIONS[name] for name in fired) or None,
+                }
+            results.append({
+                'score': round(float(overall[i]), 3),
+                'escalate': bool(overall[i] >= self.threshold),
+                'indicators': indicators,
+            })
+        return results
+
+    def assessment(self, claim: Dict[str, Any], result: Dict[str, Any]) -> Dict[str, Any]:
+        """Assessment in the format of get_claim_assessment_prompt for a claim that wasn't escalated"""
+        missing = [field for field in ('incident_date', 'policy_number') if not claim.get(field)]
+        if not claim.get('attached_files'):
+            missing.append('supporting documents')
+        return {
+            'risk_score': 1 + int(round(result['score'] * 4)),
+            'missing_info': missing,
+            'recommendation': 'No fraud indicators above the escalation threshold; process as standard.',
+            'fraud_indicators': result['indicators'],
+            'fraud_score': result['score'],
+            'escalated': False,
+        }
+
+
+# Signals whose evidence is the text the corresponding pattern matched
+_MATCH_SOURCE = {
+    'policy_change': 'policy_change',
+    'recent_claims': 'previous_claims',
+    'near_coverage_limit': 'max_coverage',
+    'evidence_loss': 'evidence_loss',
+    'defensive': 'defensive',
+    'urgency': 'urgency',
+    'policy_jargon': 'policy_jargon',
+}
+
+_coverage_limit = os.getenv('FRAUD_COVERAGE_LIMIT')
+
+fraud_prescorer = FraudPreScorer(
+    threshold=float(os.getenv('FRAUD_ESCALATION_THRESHOLD', '0.5')),
+    coverage_limit=float(_coverage_limit) if _coverage_limit else None,
+    recent_days=int(os.getenv('FRAUD_RECENT_CLAIM_DAYS', '90'))
+)
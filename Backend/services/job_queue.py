@@ -0,0 +1,201 @@
+import json
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from .database import SQLiteDatabase
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS claim_jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    stage TEXT,
+    result TEXT,
+    error TEXT,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_claim_jobs_created_at ON claim_jobs (created_at);
+"""
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue has no room for another pending job"""
+
+
+class Job:
+    """A unit of background work and the progress it reports"""
+
+    def __init__(self, job_id: str, kind: str,
+                 on_update: Optional[Callable[[Dict[str, Any]], None]] = None):
+        self.id = job_id
+        self.kind = kind
+        self.status = QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = datetime.utcnow().isoformat()
+        self.updated_at = self.created_at
+        self._on_update = on_update
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Job':
+        """A read-only snapshot of a stored job"""
+        job = cls(row['id'], row['kind'])
+        job.status = row['status']
+        job.stage = row['stage']
+        job.result = json.loads(row['result']) if row['result'] is not None else None
+        job.error = row['error']
+        job.created_at = row['created_at']
+        job.updated_at = row['updated_at']
+        return job
+
+    def update(self, **fields):
+        """Record progress (e.g. the current stage) for this job"""
+        with self._lock:
+            data = {**self._as_dict(), **fields, 'updated_at': datetime.utcnow().isoformat()}
+            # Stored first, so the job never reports a state its row doesn't have
+            if self._on_update is not None:
+                self._on_update(data)
+            for key, value in fields.items():
+                setattr(self, key, value)
+            self.updated_at = data['updated_at']
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return self._as_dict()
+
+    def _as_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'stage': self.stage,
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
+
+class JobQueue:
+    """Bounded worker pool that runs jobs in the background and keeps their status.
+
+    Jobs run in this process, but their status is written to the SQLite
+    database shared by the workers, so any worker process can answer the
+    status endpoint for a job another one accepted.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_workers: int = 4,
+                 max_pending: int = 100, retention: int = 1000):
+        self.db = SQLiteDatabase(db_path, self._create_schema)
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.retention = retention
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Keep job status in the same DATABASE file as the claims"""
+        db_path = app.config.get('DATABASE') or os.path.join(app.instance_path, 'claims.sqlite')
+        self.db.configure(db_path)
+        app.extensions['claim_jobs'] = self
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix='claim-job'
+            )
+        return self._executor
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args, **kwargs) -> Job:
+        """Queue fn(job, *args, **kwargs) and return the job tracking it"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise QueueFullError("Job queue is full")
+            self._pending += 1
+        job = Job(uuid.uuid4().hex, kind, on_update=self._save)
+        try:
+            self._insert(job)
+            executor = self._get_executor()
+        except BaseException:
+            with self._lock:
+                self._pending -= 1
+            raise
+
+        executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Get a job by ID, whichever worker process runs it"""
+        row = self.db.connection().execute(
+            'SELECT * FROM claim_jobs WHERE id = ?', (job_id,)
+        ).fetchone()
+        return Job.from_row(row) if row else None
+
+    def _insert(self, job: Job):
+        data = job.to_dict()
+        conn = self.db.connection()
+        with conn:
+            conn.execute(
+                'INSERT INTO claim_jobs (id, kind, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?)',
+                (data['id'], data['kind'], data['status'], data['created_at'], data['updated_at'])
+            )
+            self._evict_finished(conn)
+
+    def _save(self, data: Dict[str, Any]):
+        conn = self.db.connection()
+        with conn:
+            conn.execute(
+                'UPDATE claim_jobs SET status = ?, stage = ?, result = ?, error = ?, updated_at = ? WHERE id = ?',
+                (data['status'], data['stage'],
+                 json.dumps(data['result']) if data['result'] is not None else None,
+                 data['error'], data['updated_at'], data['id'])
+            )
+
+    def _run(self, job: Job, fn, args, kwargs):
+        try:
+            job.update(status=RUNNING)
+            result = fn(job, *args, **kwargs)
+            # A result that can't be stored fails the job rather than leaving it running
+            job.update(status=SUCCEEDED, stage='done', result=result)
+        except Exception as e:
+            job.update(status=FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _evict_finished(self, conn: sqlite3.Connection):
+        # Drop finished jobs older than the newest `retention` jobs
+        conn.execute(
+            'DELETE FROM claim_jobs WHERE status IN (?, ?) AND id NOT IN '
+            '(SELECT id FROM claim_jobs ORDER BY created_at DESC LIMIT ?)',
+            (SUCCEEDED, FAILED, self.retention)
+        )
+
+    def shutdown(self, wait: bool = True):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
@@ -0,0 +1,47 @@
+import logging
+import threading
+from typing import Any, Callable
+
+logger = logging.getLogger(__name__)
+
+class PeriodicTask:
+    """Background thread that calls `fn` every `interval` seconds.
+
+    The first call comes one interval after `start`; a call that raises is
+    logged and skipped, and the task keeps its schedule.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval: float):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run_once(self):
+        try:
+            return self.fn()
+        except Exception:
+            logger.exception('Periodic task %s failed', self.name)
+            return None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        """Start the task's thread (idempotent)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        with self._lock:
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join(timeout)
+                self._thread = None
@@ -0,0 +1,148 @@
+import atexit
+import os
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+# Everything the backend exports lives in its own registry, served on /metrics
+registry = CollectorRegistry()
+
+# With several worker processes, set PROMETHEUS_MULTIPROC_DIR to an empty
+# directory shared by the workers (wiped before each start) so /metrics
+# reports the sum over all of them rather than whichever worker answered.
+# prometheus_client reads it on import, so it must be in the environment
+# the workers start with.
+MULTIPROCESS = bool(os.getenv('PROMETHEUS_MULTIPROC_DIR'))
+
+# Agent runs take seconds to minutes, network calls milliseconds to seconds
+AGENT_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+agent_run_seconds = Histogram(
+    'insuralq_agent_run_seconds', 'Wall time of an agent run, cache misses only',
+    ['agent'], buckets=AGENT_BUCKETS, registry=registry
+)
+agent_active_seconds = Histogram(
+    'insuralq_agent_active_seconds', 'Time from an agent starting within a run to it producing output',
+    ['agent'], buckets=AGENT_BUCKETS, registry=registry
+)
+agent_errors = Counter(
+    'insuralq_agent_errors', 'Agent runs that raised', ['agent'], registry=registry
+)
+agent_tokens = Counter(
+    'insuralq_agent_tokens', 'Model tokens used by agent runs', ['agent', 'kind'], registry=registry
+)
+tool_call_seconds = Histogram(
+    'insuralq_tool_call_seconds', 'Duration of tool calls made by agents',
+    ['tool'], buckets=AGENT_BUCKETS, registry=registry
+)
+moderation_request_seconds = Histogram(
+    'insuralq_moderation_request_seconds', 'Duration of moderation API requests',
+    buckets=REQUEST_BUCKETS, registry=registry
+)
+moderation_batch_size = Histogram(
+    'insuralq_moderation_batch_size', 'Texts sent per moderation API request',
+    buckets=(1, 2, 4, 8, 16, 32, 64), registry=registry
+)
+moderation_errors = Counter(
+    'insuralq_moderation_errors', 'Moderation API requests that failed', registry=registry
+)
+curacel_request_seconds = Histogram(
+    'insuralq_curacel_request_seconds', 'Duration of Curacel claim submissions, retries included',
+    ['client', 'outcome'], buckets=REQUEST_BUCKETS, registry=registry
+)
+curacel_errors = Counter(
+    'insuralq_curacel_errors', 'Curacel claim submissions that did not succeed',
+    ['client', 'outcome'], registry=registry
+)
+password_hash_seconds = Histogram(
+    'insuralq_password_hash_seconds', 'Time to hash or verify a password, waiting on the pool included',
+    ['operation'], buckets=REQUEST_BUCKETS, registry=registry
+)
+password_hash_busy = Counter(
+    'insuralq_password_hash_busy', 'Password hashes refused because every hashing slot was taken',
+    registry=registry
+)
+admission_in_flight = Gauge(
+    'insuralq_admission_in_flight', 'Admitted requests currently holding a slot',
+    ['controller'], registry=registry, multiprocess_mode='livesum'
+)
+admission_waiting = Gauge(
+    'insuralq_admission_waiting', 'Requests waiting for a slot', ['controller'],
+    registry=registry, multiprocess_mode='livesum'
+)
+admission_shed = Counter(
+    'insuralq_admission_shed', 'Requests turned away with 429',
+    ['controller', 'reason'], registry=registry
+)
+startup_seconds = Gauge(
+    'insuralq_startup_seconds', 'Time spent in each startup phase of this worker',
+    ['phase'], registry=registry, multiprocess_mode='liveall'
+)
+
+
+class CacheCollector:
+    """Reads hit/miss counters from registered caches at scrape time.
+
+    The caches live in each worker's memory, so these figures are always
+    those of the worker answering the scrape, even in multiprocess mode.
+    """
+
+    def __init__(self):
+        self._caches: Dict[str, Callable[[], Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, name: str, stats: Callable[[], Dict[str, Any]]):
+        """Export a cache whose `stats()` returns hits, misses and size"""
+        with self._lock:
+            self._caches[name] = stats
+
+    def collect(self):
+        hits = CounterMetricFamily('insuralq_cache_hits', 'Lookups answered from the cache', labels=['cache'])
+        misses = CounterMetricFamily('insuralq_cache_misses', 'Lookups the cache could not answer', labels=['cache'])
+        ratio = GaugeMetricFamily('insuralq_cache_hit_ratio', 'Share of lookups answered from the cache', labels=['cache'])
+        size = GaugeMetricFamily('insuralq_cache_entries', 'Entries held in memory', labels=['cache'])
+        with self._lock:
+            caches = list(self._caches.items())
+        for name, stats in caches:
+            values = stats()
+            lookups = values['hits'] + values['misses']
+            hits.add_metric([name], values['hits'])
+            misses.add_metric([name], values['misses'])
+            ratio.add_metric([name], values['hits'] / lookups if lookups else 0.0)
+            size.add_metric([name], values['size'])
+        return [hits, misses, ratio, size]
+
+
+cache_collector = CacheCollector()
+registry.register(cache_collector)
+
+
+def register_cache(name: str, stats: Callable[[], Dict[str, Any]]):
+    cache_collector.register(name, stats)
+
+
+def _mark_process_dead():
+    # Drops this worker's live gauges; its counters and histograms stay in the totals
+    multiprocess.mark_process_dead(os.getpid())
+
+
+if MULTIPROCESS:
+    atexit.register(_mark_process_dead)
+
+
+def render() -> Tuple[bytes, str]:
+    """The registry in Prometheus text format, with its content type.
+
+    In multiprocess mode the metrics are merged from every worker's files.
+    """
+    if not MULTIPROCESS:
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    merged = CollectorRegistry()
+    multiprocess.MultiProcessCollector(merged)
+    merged.register(cache_collector)
+    return generate_latest(merged), CONTENT_TYPE_LATEST
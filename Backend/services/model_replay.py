@@ -0,0 +1,298 @@
+import asyncio
+import dataclasses
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from agents import Model, ModelProvider, ModelResponse, Usage
+from agents.models.multi_provider import MultiProvider
+from agents.models.openai_provider import DEFAULT_MODEL
+from openai.types.responses import (
+    Response, ResponseCompletedEvent, ResponseOutputItem, ResponseOutputMessage, ResponseTextDeltaEvent
+)
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails, ResponseUsage
+from pydantic import TypeAdapter
+
+RECORD = 'record'
+REPLAY = 'replay'
+CASSETTE_FORMAT = 1
+
+_output_item = TypeAdapter(ResponseOutputItem)
+
+
+class CassetteMiss(Exception):
+    """Raised in replay mode for a model or moderation request the cassette never recorded"""
+
+
+def _jsonable(value: Any) -> Any:
+    if hasattr(value, 'model_dump'):
+        return value.model_dump(mode='json', exclude_unset=True)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return {field.name: _jsonable(getattr(value, field.name)) for field in dataclasses.fields(value)}
+    if isinstance(value, dict):
+        return {str(k): _jsonable(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(v) for v in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return repr(value)
+
+
+def prompt_key(model_name: str, system_instructions: Optional[str], input: Any, model_settings: Any,
+               tools: list, output_schema: Any, handoffs: list) -> str:
+    """SHA-256 of everything that shapes a model request"""
+    schema = None
+    if output_schema is not None and not output_schema.is_plain_text():
+        schema = output_schema.json_schema()
+    prompt = {
+        'model': model_name,
+        'instructions': system_instructions,
+        'input': _jsonable(input),
+        'settings': _jsonable(model_settings),
+        'tools': [[tool.name, getattr(tool, 'params_json_schema', None)] for tool in tools],
+        'output_schema': schema,
+        'handoffs': [handoff.tool_name for handoff in handoffs],
+    }
+    canonical = json.dumps(prompt, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def moderation_key(model: str, text: str) -> str:
+    """SHA-256 of a moderation model and one input text"""
+    return hashlib.sha256(f'{model}\n{text}'.encode('utf-8')).hexdigest()
+
+
+class Cassette:
+    """Model responses keyed by prompt hash, and moderation verdicts keyed
+    by text hash, kept in one JSON file.
+
+    Recording rewrites the file atomically after every new response, so a
+    crashed run still leaves a usable cassette.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, Dict[str, Any]] = {}
+        self._moderations: Dict[str, bool] = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self._interactions = data.get('interactions', {})
+            self._moderations = data.get('moderations', {})
+
+    def __len__(self) -> int:
+        return len(self._interactions)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._interactions.get(key)
+
+    def put(self, key: str, interaction: Dict[str, Any]):
+        with self._lock:
+            self._interactions[key] = interaction
+            self._save()
+
+    def get_moderation(self, key: str) -> Optional[bool]:
+        with self._lock:
+            return self._moderations.get(key)
+
+    def put_moderations(self, verdicts: Dict[str, bool]):
+        with self._lock:
+            self._moderations.update(verdicts)
+            self._save()
+
+    def _save(self):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'format': CASSETTE_FORMAT, 'interactions': self._interactions,
+                           'moderations': self._moderations}, f, indent=1, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+
+def _interaction(model_name: str, response: ModelResponse) -> Dict[str, Any]:
+    return {
+        'model': model_name,
+        'output': [item.model_dump(mode='json') for item in response.output],
+        'usage': {
+            'input_tokens': response.usage.input_tokens,
+            'output_tokens': response.usage.output_tokens,
+            'total_tokens': response.usage.total_tokens,
+        },
+        'recorded_at': time.time(),
+    }
+
+
+def _usage(interaction: Dict[str, Any]) -> Usage:
+    return Usage(requests=1, **interaction['usage'])
+
+
+class RecordReplayModel(Model):
+    """Wraps a real model to record its responses, or serves them from a cassette"""
+
+    def __init__(self, provider: 'RecordReplayProvider', model_name: str):
+        self.provider = provider
+        self.model_name = model_name
+
+    def _key(self, system_instructions, input, model_settings, tools, output_schema, handoffs) -> str:
+        return prompt_key(self.model_name, system_instructions, input, model_settings,
+                          tools, output_schema, handoffs)
+
+    def _replayed(self, key: str) -> Dict[str, Any]:
+        interaction = self.provider.cassette.get(key)
+        if interaction is None:
+            raise CassetteMiss(f'No recorded response for prompt {key[:12]} ({self.model_name}) '
+                               f'in {self.provider.cassette.path}')
+        return interaction
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs) -> ModelResponse:
+        key = self._key(system_instructions, input, model_settings, tools, output_schema, handoffs)
+        if self.provider.mode == REPLAY:
+            interaction = self._replayed(key)
+            if self.provider.latency:
+                await asyncio.sleep(self.provider.latency)
+            return ModelResponse(
+                output=[_output_item.validate_python(item) for item in interaction['output']],
+                usage=_usage(interaction),
+                response_id=None,
+            )
+        response = await self.provider.inner.get_model(self.model_name).get_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        )
+        self.provider.cassette.put(key, _interaction(self.model_name, response))
+        return response
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, **kwargs) -> AsyncIterator[Any]:
+        key = self._key(system_instructions, input, model_settings, tools, output_schema, handoffs)
+        if self.provider.mode == REPLAY:
+            async for event in self._replay_stream(self._replayed(key)):
+                yield event
+            return
+        events = self.provider.inner.get_model(self.model_name).stream_response(
+            system_instructions, input, model_settings, tools, output_schema, handoffs, tracing, **kwargs
+        )
+        async for event in events:
+            if isinstance(event, ResponseCompletedEvent):
+                usage = event.response.usage
+                recorded = ModelResponse(
+                    output=event.response.output,
+                    usage=Usage(requests=1, input_tokens=usage.input_tokens, output_tokens=usage.output_tokens,
+                                total_tokens=usage.total_tokens) if usage else Usage(),
+                    response_id=event.response.id,
+                )
+                self.provider.cassette.put(key, _interaction(self.model_name, recorded))
+            yield event
+
+    async def _replay_stream(self, interaction: Dict[str, Any]) -> AsyncIterator[Any]:
+        """Text deltas of every recorded message, then the completed response"""
+        output = [_output_item.validate_python(item) for item in interaction['output']]
+        deltas = [
+            (index, item.id, part_index, part.text)
+            for index, item in enumerate(output) if isinstance(item, ResponseOutputMessage)
+            for part_index, part in enumerate(item.content) if getattr(part, 'text', None)
+        ]
+        # Spread the simulated latency over the streamed parts
+        pause = self.provider.latency / (len(deltas) + 1) if self.provider.latency else 0
+        sequence = 0
+        for output_index, item_id, content_index, text in deltas:
+            if pause:
+                await asyncio.sleep(pause)
+            yield ResponseTextDeltaEvent.model_construct(
+                type='response.output_text.delta', item_id=item_id, output_index=output_index,
+                content_index=content_index, delta=text, sequence_number=sequence
+            )
+            sequence += 1
+        if pause:
+            await asyncio.sleep(pause)
+        usage = interaction['usage']
+        response = Response.model_construct(
+            id=f"replay_{sequence}", object='response', created_at=time.time(), model=self.model_name,
+            output=output, parallel_tool_calls=False, tool_choice='auto', tools=[], status='completed',
+            usage=ResponseUsage(
+                input_tokens=usage['input_tokens'], output_tokens=usage['output_tokens'],
+                total_tokens=usage['total_tokens'],
+                input_tokens_details=InputTokensDetails(cached_tokens=0),
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+            ),
+        )
+        yield ResponseCompletedEvent.model_construct(
+            type='response.completed', response=response, sequence_number=sequence
+        )
+
+
+class RecordReplayModerations:
+    """The `moderations` resource of an OpenAI client, recorded or replayed
+    through the provider's cassette like the model responses"""
+
+    def __init__(self, provider: 'RecordReplayProvider', client_factory: Callable[[], Any]):
+        self.provider = provider
+        self.client_factory = client_factory
+
+    async def create(self, model: str, input: List[str], **kwargs) -> Any:
+        cassette = self.provider.cassette
+        keys = [moderation_key(model, text) for text in input]
+        if self.provider.mode == REPLAY:
+            verdicts = [cassette.get_moderation(key) for key in keys]
+            if None in verdicts:
+                key = keys[verdicts.index(None)]
+                raise CassetteMiss(f'No recorded moderation for text {key[:12]} ({model}) in {cassette.path}')
+            return SimpleNamespace(results=[SimpleNamespace(flagged=flagged) for flagged in verdicts])
+        response = await self.client_factory().moderations.create(model=model, input=input, **kwargs)
+        cassette.put_moderations({key: result.flagged for key, result in zip(keys, response.results)})
+        return response
+
+
+class RecordReplayProvider(ModelProvider):
+    """Model provider that records every model response to a cassette, or
+    replays them without touching the network.
+
+    Responses are keyed by a hash of the whole prompt (model, instructions,
+    input, settings, tools, output schema and handoffs), so a replayed run
+    must send exactly the prompts that were recorded. In replay mode each
+    response waits `latency` seconds to simulate the model.
+
+    Moderation verdicts go through the same cassette via
+    `moderation_client`, so a replayed assessment makes no network calls.
+    """
+
+    def __init__(self, cassette: str, mode: str = REPLAY, latency: float = 0.0,
+                 inner: Optional[ModelProvider] = None):
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"mode must be '{RECORD}' or '{REPLAY}'")
+        self.cassette = Cassette(cassette)
+        self.mode = mode
+        self.latency = latency
+        self.inner = inner or MultiProvider()
+
+    def get_model(self, model_name: Optional[str]) -> Model:
+        return RecordReplayModel(self, model_name or DEFAULT_MODEL)
+
+    def moderation_client(self, client_factory: Callable[[], Any]) -> Any:
+        """A stand-in OpenAI client for moderation; `client_factory` builds
+        the real client and is only called when recording"""
+        return SimpleNamespace(moderations=RecordReplayModerations(self, client_factory))
+
+
+def provider_from_env() -> Optional[RecordReplayProvider]:
+    """The provider configured by AGENT_CASSETTE_MODE and AGENT_CASSETTE, None when unset"""
+    mode = os.getenv('AGENT_CASSETTE_MODE')
+    if not mode:
+        return None
+    return RecordReplayProvider(
+        os.getenv('AGENT_CASSETTE', 'agent_cassette.json'),
+        mode=mode,
+        latency=float(os.getenv('AGENT_REPLAY_LATENCY', '0'))
+    )
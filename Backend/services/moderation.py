@@ -0,0 +1,150 @@
+import asyncio
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from .metrics import moderation_batch_size, moderation_errors, moderation_request_seconds
+
+
+def _default_client():
+    from openai import AsyncOpenAI
+    return AsyncOpenAI()
+
+
+class ModerationService:
+    """Moderation checks over one shared async OpenAI client.
+
+    Calls made within `window` seconds of each other are sent as a single
+    list input to the moderation endpoint (up to `max_batch` texts), and
+    verdicts are cached by content hash so repeated text is never re-sent.
+    """
+
+    def __init__(self, client_factory: Optional[Callable[[], Any]] = None,
+                 model: str = 'omni-moderation-latest', window: float = 0.01,
+                 max_batch: int = 32, cache_size: int = 4096):
+        self.client_factory = client_factory or _default_client
+        self.model = model
+        self.window = window
+        self.max_batch = max_batch
+        self.cache_size = cache_size
+        self._client = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pending: List[Tuple[str, str, asyncio.Future]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._timer = None
+        # The loop only keeps weak references to tasks, so in-flight sends are held here
+        self._sends: Set[asyncio.Task] = set()
+        self.hits = 0
+        self.misses = 0
+        self.requests = 0
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = self.client_factory()
+        return self._client
+
+    def reset(self):
+        """Drop the client and the cached verdicts, e.g. when the client factory's target changes"""
+        with self._lock:
+            self._client = None
+            self._cache.clear()
+
+    @staticmethod
+    def digest(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+    def _cached(self, key: str) -> Optional[bool]:
+        with self._lock:
+            flagged = self._cache.get(key)
+            if flagged is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return flagged
+
+    def _remember(self, key: str, flagged: bool):
+        with self._lock:
+            self._cache[key] = flagged
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    async def is_flagged(self, text: str) -> bool:
+        """Whether the moderation endpoint flags this text"""
+        key = self.digest(text)
+        flagged = self._cached(key)
+        if flagged is not None:
+            return flagged
+
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Batches belong to one event loop; start afresh on a new one
+            self._loop, self._pending, self._inflight, self._timer = loop, [], {}, None
+
+        # Identical text already waiting on a batch shares its answer
+        future = self._inflight.get(key)
+        if future is None:
+            future = loop.create_future()
+            self._inflight[key] = future
+            self._pending.append((key, text, future))
+            if len(self._pending) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._send(batch))
+            self._sends.add(task)
+            task.add_done_callback(self._sends.discard)
+
+    async def _send(self, batch: List[Tuple[str, str, asyncio.Future]]):
+        self.requests += 1
+        moderation_batch_size.observe(len(batch))
+        started = time.perf_counter()
+        try:
+            response = await self.client.moderations.create(
+                model=self.model,
+                input=[text for _, text, _ in batch],
+            )
+            verdicts = [result.flagged for result in response.results]
+            # Results pair up with inputs by position; a short answer would
+            # leave the unmatched callers waiting forever
+            if len(verdicts) != len(batch):
+                raise ValueError(f'Moderation returned {len(verdicts)} results for {len(batch)} inputs')
+        except Exception as e:
+            moderation_errors.inc()
+            for key, _, future in batch:
+                self._inflight.pop(key, None)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            moderation_request_seconds.observe(time.perf_counter() - started)
+        for (key, _, future), flagged in zip(batch, verdicts):
+            self._remember(key, flagged)
+            self._inflight.pop(key, None)
+            if not future.done():
+                future.set_result(flagged)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'requests': self.requests,
+            }
@@ -0,0 +1,153 @@
+import atexit
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+import bcrypt
+
+from .metrics import password_hash_busy, password_hash_seconds
+
+# bcrypt's own default cost, used unless BCRYPT_ROUNDS pins another
+DEFAULT_ROUNDS = 12
+# Calibration never suggests less than MIN_ROUNDS, however slow the machine
+MIN_ROUNDS = 12
+MAX_ROUNDS = 16
+# Cheap cost used to time this machine before extrapolating
+PROBE_ROUNDS = 8
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when every hashing slot stays taken for longer than the hasher waits"""
+
+
+def _hash(password: bytes, rounds: int) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def cost_of(hashed: str) -> Optional[int]:
+    """The cost factor stored in a bcrypt hash (`$2b$<cost>$...`), None if unreadable"""
+    parts = hashed.split('$')
+    if len(parts) < 4:
+        return None
+    try:
+        return int(parts[2])
+    except ValueError:
+        return None
+
+
+def calibrate_rounds(target: float, minimum: int = MIN_ROUNDS, maximum: int = MAX_ROUNDS) -> int:
+    """Highest cost whose hash takes at most `target` seconds on this machine.
+
+    Each extra round doubles the work, so one timing at PROBE_ROUNDS is
+    enough to extrapolate from. Use it to choose BCRYPT_ROUNDS for a
+    deployment, e.g. with `flask auth calibrate-rounds`: the app never
+    calibrates itself, as workers timing themselves would disagree on the
+    cost and keep rehashing each other's hashes.
+    """
+    password = b'calibration password'
+    elapsed = float('inf')
+    for _ in range(3):
+        start = time.perf_counter()
+        _hash(password, PROBE_ROUNDS)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    rounds = PROBE_ROUNDS + math.floor(math.log2(target / max(elapsed, 1e-6)))
+    return max(minimum, min(maximum, rounds))
+
+
+def _mp_context():
+    # Forking a server that runs threads (agent loop, job workers, outbox
+    # dispatcher) can copy their held locks into the child; start workers
+    # from a clean process instead
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class PasswordHasher:
+    """Runs bcrypt in a pool of worker processes so hashing never occupies
+    request threads.
+
+    At most `max_concurrency` hashes are queued or running at once; callers
+    past that wait up to `wait` seconds for a slot and then get
+    PasswordHasherBusy. With `workers=0` hashing runs inline, still capped.
+    """
+
+    def __init__(self, rounds: int = DEFAULT_ROUNDS, workers: int = 2,
+                 max_concurrency: int = 8, wait: float = 5.0):
+        self.rounds = rounds
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.wait = wait
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        """Use the cost pinned by BCRYPT_ROUNDS, DEFAULT_ROUNDS if unset"""
+        rounds = app.config.get('BCRYPT_ROUNDS', os.getenv('BCRYPT_ROUNDS'))
+        self.rounds = int(rounds) if rounds else DEFAULT_ROUNDS
+        app.extensions['password_hasher'] = self
+
+    def _pool(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_mp_context())
+            return self._executor
+
+    def _run(self, operation: str, fn, *args):
+        if not self._slots.acquire(timeout=self.wait):
+            password_hash_busy.inc()
+            raise PasswordHasherBusy(f'{self.max_concurrency} password hashes already in progress')
+        start = time.perf_counter()
+        try:
+            pool = self._pool()
+            if pool is None:
+                return fn(*args)
+            try:
+                return pool.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for the next caller
+                with self._lock:
+                    if self._executor is pool:
+                        self._executor = None
+                pool.shutdown(wait=False)
+                raise
+        finally:
+            password_hash_seconds.labels(operation=operation).observe(time.perf_counter() - start)
+            self._slots.release()
+
+    # Workers are sent bcrypt's own functions, so a fresh worker process
+    # only has to import bcrypt, not the app
+    def hash(self, password: str) -> str:
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run('hash', bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def verify(self, password: str, hashed: str) -> bool:
+        return self._run('verify', bcrypt.checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed: str) -> bool:
+        """Whether a stored hash was made with a lower cost than the current one"""
+        cost = cost_of(hashed)
+        return cost is not None and cost < self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+# Shared hasher for the whole process
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv('BCRYPT_ROUNDS') or DEFAULT_ROUNDS),
+    workers=int(os.getenv('BCRYPT_WORKERS', str(min(4, os.cpu_count() or 1)))),
+    max_concurrency=int(os.getenv('BCRYPT_MAX_CONCURRENCY', '8')),
+    wait=float(os.getenv('BCRYPT_WAIT', '5'))
+)
+atexit.register(password_hasher.shutdown)
@@ -0,0 +1,70 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class TokenCache:
+    """LRU of verified bearer tokens, keyed by the token's SHA-256 digest.
+
+    Each entry holds the decoded payload until the token's `exp`, so repeat
+    requests skip the signature check. Users and revocations are not cached:
+    they are read from the user store, which every worker process shares.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = maxsize
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def digest(token: str) -> str:
+        return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """Payload of a token verified earlier, None if unknown or expired"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, token: str, payload: Dict[str, Any]):
+        """Remember a verified token until its `exp`"""
+        expires_at = payload.get('exp')
+        if expires_at is None or expires_at <= time.time():
+            return
+        key = self.digest(token)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (expires_at, payload)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str):
+        with self._lock:
+            self._entries.pop(self.digest(token), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
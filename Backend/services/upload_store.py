@@ -0,0 +1,205 @@
+import hashlib
+import os
+import sqlite3
+import tempfile
+import time
+from typing import Optional, Dict, Any, List, BinaryIO
+
+from .database import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_blobs (
+    sha256 TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    ref_count INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS claim_uploads (
+    claim_id INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    filename TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_claim_uploads_file ON claim_uploads (claim_id, sha256, IFNULL(filename, ''));
+CREATE INDEX IF NOT EXISTS idx_claim_uploads_sha256 ON claim_uploads (sha256);
+CREATE INDEX IF NOT EXISTS idx_upload_blobs_ref_count ON upload_blobs (ref_count);
+"""
+
+
+class UploadStore:
+    """Content-addressed storage for claim evidence.
+
+    Uploads are streamed to a temporary file in chunks while being hashed,
+    then moved to `<root>/<aa>/<bb>/<sha256>`. Identical bytes are written
+    once; each claim holds one reference to every blob it attached, under
+    every filename it was attached as.
+
+    A blob's file is only placed or deleted while holding the database
+    write lock, together with its row, so saving and garbage collection
+    can't interleave across threads or worker processes.
+    """
+
+    def __init__(self, root: Optional[str] = None, db_path: Optional[str] = None,
+                 chunk_size: int = 64 * 1024):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.db = SQLiteDatabase(db_path, self._create_schema)
+
+    def init_app(self, app):
+        """Store files under UPLOAD_FOLDER and track them in the DATABASE file"""
+        self.root = app.config.get('UPLOAD_FOLDER', 'uploads')
+        db_path = app.config.get('DATABASE') or os.path.join(app.instance_path, 'claims.sqlite')
+        self.db.configure(db_path)
+        app.extensions['upload_store'] = self
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        # Tables keyed (claim_id, sha256) kept one filename per blob and claim
+        old_key = [column[1] for column in conn.execute('PRAGMA table_info(claim_uploads)') if column[5]]
+        if old_key:
+            conn.executescript(
+                'ALTER TABLE claim_uploads RENAME TO claim_uploads_old;'
+                'DROP INDEX IF EXISTS idx_claim_uploads_sha256;'
+            )
+        conn.executescript(SCHEMA)
+        if old_key:
+            conn.executescript(
+                'INSERT INTO claim_uploads (claim_id, sha256, filename) '
+                'SELECT claim_id, sha256, filename FROM claim_uploads_old;'
+                'DROP TABLE claim_uploads_old;'
+            )
+
+    def path_for(self, digest: str) -> str:
+        """Where the blob with this SHA-256 lives on disk"""
+        return os.path.join(self.root, digest[:2], digest[2:4], digest)
+
+    def save(self, stream: BinaryIO, filename: Optional[str] = None) -> Dict[str, Any]:
+        """Stream a file into the store and return its digest, path and size"""
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                while True:
+                    chunk = stream.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    digest.update(chunk)
+                    out.write(chunk)
+                    size += len(chunk)
+
+            sha256 = digest.hexdigest()
+            path = self.path_for(sha256)
+            conn = self.db.connection()
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                # Register (or refresh) the blob so garbage collection leaves
+                # it alone while the claim is being created
+                conn.execute(
+                    'INSERT INTO upload_blobs (sha256, size, created_at) VALUES (?, ?, ?) '
+                    'ON CONFLICT (sha256) DO UPDATE SET created_at = excluded.created_at',
+                    (sha256, size, time.time())
+                )
+                if os.path.exists(path):
+                    # Same bytes are already stored, drop the copy
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return {'sha256': sha256, 'path': path, 'size': size, 'filename': filename}
+
+    def add_references(self, claim_id: int, uploads: List[Dict[str, Any]]):
+        """Record that a claim uses the given saved uploads"""
+        conn = self.db.connection()
+        with conn:
+            for upload in uploads:
+                # The claim's first attachment of a blob takes its reference
+                first = conn.execute(
+                    'SELECT 1 FROM claim_uploads WHERE claim_id = ? AND sha256 = ? LIMIT 1',
+                    (claim_id, upload['sha256'])
+                ).fetchone() is None
+                cursor = conn.execute(
+                    'INSERT OR IGNORE INTO claim_uploads (claim_id, sha256, filename) VALUES (?, ?, ?)',
+                    (claim_id, upload['sha256'], upload.get('filename'))
+                )
+                if cursor.rowcount and first:
+                    conn.execute(
+                        'UPDATE upload_blobs SET ref_count = ref_count + 1 WHERE sha256 = ?',
+                        (upload['sha256'],)
+                    )
+
+    def release_claim(self, claim_id: int) -> List[str]:
+        """Drop a claim's references and delete blobs nothing else uses"""
+        conn = self.db.connection()
+        with conn:
+            digests = [row['sha256'] for row in conn.execute(
+                'SELECT DISTINCT sha256 FROM claim_uploads WHERE claim_id = ?', (claim_id,)
+            )]
+            conn.execute('DELETE FROM claim_uploads WHERE claim_id = ?', (claim_id,))
+            conn.executemany(
+                'UPDATE upload_blobs SET ref_count = ref_count - 1 WHERE sha256 = ?',
+                [(digest,) for digest in digests]
+            )
+        return self.collect_garbage(older_than=0, digests=digests)
+
+    def collect_garbage(self, older_than: float = 3600, digests: Optional[List[str]] = None) -> List[str]:
+        """Delete unreferenced blobs saved more than `older_than` seconds ago.
+
+        The grace period covers uploads whose claim is still being structured.
+        """
+        conn = self.db.connection()
+        cutoff = time.time() - older_than
+        query = 'SELECT sha256 FROM upload_blobs WHERE ref_count <= 0 AND created_at <= ?'
+        params = [cutoff]
+        if digests is not None:
+            if not digests:
+                return []
+            query += f" AND sha256 IN ({', '.join('?' for _ in digests)})"
+            params.extend(digests)
+
+        removed = []
+        for row in conn.execute(query, params).fetchall():
+            with conn:
+                conn.execute('BEGIN IMMEDIATE')
+                # Checked again under the write lock: a save since the scan
+                # refreshes created_at and keeps the file
+                deleted = conn.execute(
+                    'DELETE FROM upload_blobs WHERE sha256 = ? AND ref_count <= 0 AND created_at <= ?',
+                    (row['sha256'], cutoff)
+                ).rowcount
+                if deleted:
+                    try:
+                        os.remove(self.path_for(row['sha256']))
+                    except FileNotFoundError:
+                        pass
+                    removed.append(row['sha256'])
+        return removed
+
+    def get_reference_count(self, digest: str) -> int:
+        """How many claims reference a blob"""
+        row = self.db.connection().execute(
+            'SELECT ref_count FROM upload_blobs WHERE sha256 = ?', (digest,)
+        ).fetchone()
+        return row['ref_count'] if row else 0
+
+    def get_claim_uploads(self, claim_id: int) -> List[Dict[str, Any]]:
+        """List the files attached to a claim"""
+        rows = self.db.connection().execute(
+            'SELECT u.sha256, u.filename, b.size FROM claim_uploads u '
+            'JOIN upload_blobs b ON b.sha256 = u.sha256 WHERE u.claim_id = ? ORDER BY u.rowid',
+            (claim_id,)
+        ).fetchall()
+        return [
+            {'sha256': row['sha256'], 'filename': row['filename'], 'size': row['size'],
+             'path': self.path_for(row['sha256'])}
+            for row in rows
+        ]
+
+
+# Configured from the app when the claims blueprint is registered
+upload_store = UploadStore()
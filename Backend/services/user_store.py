@@ -0,0 +1,150 @@
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from .database import SQLiteDatabase
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    email TEXT NOT NULL,
+    password_hash TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email);
+CREATE TABLE IF NOT EXISTS revoked_tokens (
+    digest TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Fixed statement texts, so each connection's statement cache reuses the
+# compiled statements instead of preparing them on every call
+INSERT_USER = 'INSERT INTO users (email, password_hash, created_at, data) VALUES (?, ?, ?, ?)'
+SELECT_BY_EMAIL = 'SELECT id, email, password_hash, created_at, data FROM users WHERE email = ?'
+SELECT_BY_ID = 'SELECT id, email, password_hash, created_at, data FROM users WHERE id = ?'
+UPDATE_USER = 'UPDATE users SET email = ?, password_hash = ?, data = ? WHERE id = ?'
+REVOKE_TOKEN = 'INSERT OR REPLACE INTO revoked_tokens (digest, expires_at) VALUES (?, ?)'
+PURGE_REVOKED = 'DELETE FROM revoked_tokens WHERE expires_at <= ?'
+SELECT_REVOKED = 'SELECT 1 FROM revoked_tokens WHERE digest = ? AND expires_at > ?'
+# Revocation and user in one statement, so authenticating costs one query
+SELECT_TOKEN_USER = (
+    'SELECT EXISTS (SELECT 1 FROM revoked_tokens WHERE digest = ? AND expires_at > ?) AS revoked, '
+    'users.id, users.email, users.password_hash, users.created_at, users.data '
+    'FROM (SELECT 1) LEFT JOIN users ON users.id = ?'
+)
+
+# Fields kept in their own columns; everything else goes in `data`
+COLUMNS = ('id', 'email', 'password_hash', 'created_at')
+
+
+class SQLiteUserStore:
+    """SQLite-backed user store with the same API as the in-memory UserStore.
+
+    Worker processes share the file: ids come from AUTOINCREMENT and the
+    unique email index rejects concurrent duplicate registrations, and a
+    token revoked by one process is rejected by all. Each thread keeps its
+    own connection.
+    """
+
+    def __init__(self, path: Optional[str] = None, timeout: float = 30.0):
+        self.db = SQLiteDatabase(path, self._create_schema, timeout)
+
+    def init_app(self, app):
+        """Keep users in the app's DATABASE file"""
+        path = app.config.get('DATABASE') or os.path.join(app.instance_path, 'claims.sqlite')
+        self.db.configure(path)
+        app.extensions['user_store'] = self
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection):
+        conn.executescript(SCHEMA)
+
+    @staticmethod
+    def _row_to_user(row: sqlite3.Row) -> Dict[str, Any]:
+        user = json.loads(row['data'])
+        user.update({column: row[column] for column in COLUMNS})
+        return user
+
+    @staticmethod
+    def _data(user: Dict[str, Any]) -> str:
+        return json.dumps({k: v for k, v in user.items() if k not in COLUMNS})
+
+    @staticmethod
+    def _without_hash(user: Dict[str, Any]) -> Dict[str, Any]:
+        user_response = user.copy()
+        del user_response['password_hash']
+        return user_response
+
+    def create_user(self, email: str, password_hash: str, **kwargs) -> Dict[str, Any]:
+        """Create a new user"""
+        user = {**kwargs, 'email': email, 'password_hash': password_hash,
+                'created_at': datetime.utcnow().isoformat()}
+        conn = self.db.connection()
+        try:
+            with conn:
+                cursor = conn.execute(INSERT_USER, (email, password_hash, user['created_at'], self._data(user)))
+        except sqlite3.IntegrityError:
+            raise ValueError("User already exists")
+        user['id'] = cursor.lastrowid
+        return self._without_hash(user)
+
+    def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
+        """Get user by email"""
+        row = self.db.connection().execute(SELECT_BY_EMAIL, (email,)).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def get_user_by_id(self, user_id: int) -> Optional[Dict[str, Any]]:
+        """Get user by ID"""
+        row = self.db.connection().execute(SELECT_BY_ID, (user_id,)).fetchone()
+        return self._row_to_user(row) if row else None
+
+    def update_user(self, user_id: int, **changes) -> Optional[Dict[str, Any]]:
+        """Update a user's fields, returning the user without password hash"""
+        changes = {k: v for k, v in changes.items() if k not in ('id', 'created_at')}
+        conn = self.db.connection()
+        try:
+            with conn:
+                # Take the write lock up front so concurrent updates can't drop fields
+                conn.execute('BEGIN IMMEDIATE')
+                row = conn.execute(SELECT_BY_ID, (user_id,)).fetchone()
+                if row is None:
+                    return None
+                user = self._row_to_user(row)
+                user.update(changes)
+                conn.execute(UPDATE_USER, (user['email'], user['password_hash'], self._data(user), user_id))
+        except sqlite3.IntegrityError:
+            raise ValueError("User already exists")
+        return self._without_hash(user)
+
+    def revoke_token(self, token_digest: str, expires_at: float):
+        """Reject a token from now until `expires_at`, e.g. on logout"""
+        now = time.time()
+        conn = self.db.connection()
+        with conn:
+            # Forget revocations of tokens that have expired anyway
+            conn.execute(PURGE_REVOKED, (now,))
+            if expires_at > now:
+                conn.execute(REVOKE_TOKEN, (token_digest, expires_at))
+
+    def is_token_revoked(self, token_digest: str) -> bool:
+        row = self.db.connection().execute(SELECT_REVOKED, (token_digest, time.time())).fetchone()
+        return row is not None
+
+    def get_token_user(self, user_id: int, token_digest: str) -> Tuple[Optional[Dict[str, Any]], bool]:
+        """The user a token was issued to and whether the token is revoked"""
+        row = self.db.connection().execute(SELECT_TOKEN_USER, (token_digest, time.time(), user_id)).fetchone()
+        user = self._row_to_user(row) if row['id'] is not None else None
+        return user, bool(row['revoked'])
+
+    def close(self):
+        """Close this thread's connection"""
+        self.db.close()
+
+
+# Used instead of the in-memory store once an app with a DATABASE registers the auth routes
+sqlite_user_store = SQLiteUserStore()
@@ -0,0 +1,19 @@
+"""Imports the Backend directory as the `backend` package, for tests of modules that use absolute imports"""
+import importlib.util
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_backend():
+    """Import the Backend directory as the `backend` package, whatever the folder is called"""
+    if 'backend' in sys.modules:
+        return sys.modules['backend']
+    spec = importlib.util.spec_from_file_location(
+        'backend', os.path.join(BACKEND_DIR, '__init__.py'), submodule_search_locations=[BACKEND_DIR]
+    )
+    module = importlib.util.module_from_spec(spec)
+    sys.modules['backend'] = module
+    spec.loader.exec_module(module)
+    return module
@@ -0,0 +1,394 @@
+"""Offline load test for the backend.
+
+Starts create_app on a local port with the OpenAI and Curacel APIs replaced
+by the stand-ins in fake_servers, drives register, login, submit, list and
+assess at a fixed concurrency, and prints a JSON report with throughput and
+latency percentiles per scenario, plus how long a fresh worker takes to
+answer its first /hello:
+
+    python tests/benchmark.py --concurrency 16 --requests 200 --openai-latency 0.3
+    python tests/benchmark.py --output after.json --baseline before.json
+
+Nothing leaves the machine and no API quota is used.
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from backend_package import BACKEND_DIR, load_backend
+from fake_servers import FakeCuracelServer, FakeOpenAIServer
+
+SCENARIOS = ('register', 'login', 'submit', 'list', 'assess')
+
+# Claim texts the rule-based scorer passes straight through, and ones it escalates to the agents
+PLAIN_CLAIMS = [
+    'Rear-ended at a traffic light on Allen Avenue, bumper and tail light damaged. Police report attached.',
+    'Water pipe burst in the kitchen overnight, cabinets and flooring damaged. Photos and plumber invoice attached.',
+    'Phone screen cracked after a fall at work, repair quote of $180 from the authorized center.',
+]
+SUSPICIOUS_CLAIMS = [
+    'I just upgraded my policy last week and now my car was stolen. I lost all the receipts, '
+    'I swear I am honest, please pay the maximum coverage urgently.',
+    'Third claim this year: laptop stolen again, no police report, need the money ASAP, '
+    'honestly the documents were destroyed.',
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples: List[Dict[str, Any]], duration: float) -> Dict[str, Any]:
+    """Throughput, latency percentiles (ms) and status counts of one scenario"""
+    latencies = sorted(sample['seconds'] for sample in samples)
+    statuses: Dict[str, int] = {}
+    for sample in samples:
+        statuses[str(sample['status'])] = statuses.get(str(sample['status']), 0) + 1
+    ok = sum(1 for sample in samples if isinstance(sample['status'], int) and sample['status'] < 400)
+
+    def ms(value):
+        return round(value * 1000, 2) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'ok': ok,
+        'errors': len(samples) - ok,
+        'duration_s': round(duration, 3),
+        'throughput_rps': round(len(samples) / duration, 2) if duration > 0 else None,
+        'latency_ms': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else None,
+        },
+        'statuses': statuses,
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> Dict[str, Any]:
+    """Relative change of throughput and p95/p99 against an earlier report"""
+
+    def change(new, old):
+        if new is None or not old:
+            return None
+        return round((new - old) / old, 4)
+
+    changes = {}
+    for name, stats in report['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        changes[name] = {
+            'throughput_rps': change(stats['throughput_rps'], old['throughput_rps']),
+            'p95_ms': change(stats['latency_ms']['p95'], old['latency_ms']['p95']),
+            'p99_ms': change(stats['latency_ms']['p99'], old['latency_ms']['p99']),
+        }
+    if report.get('startup') and baseline.get('startup'):
+        changes['startup'] = {'ready_s': change(report['startup']['ready_s'], baseline['startup']['ready_s'])}
+    return {'commit': baseline.get('meta', {}).get('commit'), 'changes': changes}
+
+
+# Runs in a fresh interpreter: import the app, build it and serve the first /hello
+STARTUP_PROBE = """
+import importlib.util, json, os, sys, tempfile, time
+started = time.perf_counter()
+spec = importlib.util.spec_from_file_location(
+    'backend', os.path.join(sys.argv[1], '__init__.py'), submodule_search_locations=[sys.argv[1]]
+)
+backend = importlib.util.module_from_spec(spec)
+sys.modules['backend'] = backend
+spec.loader.exec_module(backend)
+imported = time.perf_counter()
+with tempfile.TemporaryDirectory() as tmp:
+    app = backend.create_app({'DATABASE': os.path.join(tmp, 'startup.sqlite'), 'CURACEL_OUTBOX_DISPATCH': False,
+                              'UPLOAD_GC': False})
+    created = time.perf_counter()
+    status = app.test_client().get('/hello').status_code
+print(json.dumps({'import_s': imported - started, 'create_app_s': created - imported,
+                  'first_hello_s': time.perf_counter() - created, 'status': status,
+                  'agents_loaded': 'agents' in sys.modules, 'numpy_loaded': 'numpy' in sys.modules}))
+"""
+
+
+def measure_startup(runs: int) -> Dict[str, Any]:
+    """Median time for a new worker to boot and answer /hello, over `runs` fresh processes"""
+    env = dict(os.environ, OPENAI_API_KEY=os.environ.get('OPENAI_API_KEY', 'benchmark'))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', STARTUP_PROBE, BACKEND_DIR], env=env,
+                                capture_output=True, text=True, check=True).stdout
+        sample = json.loads(output.strip().splitlines()[-1])
+        # Interpreter start up to the first /hello, as a process manager would see it
+        sample['ready_s'] = time.perf_counter() - start
+        samples.append(sample)
+
+    def median(key):
+        values = sorted(sample[key] for sample in samples)
+        return round(values[len(values) // 2], 4)
+
+    return {
+        'runs': runs,
+        'ready_s': median('ready_s'),
+        'import_s': median('import_s'),
+        'create_app_s': median('create_app_s'),
+        'first_hello_s': median('first_hello_s'),
+        'agents_loaded_at_startup': any(sample['agents_loaded'] for sample in samples),
+        'numpy_loaded_at_startup': any(sample['numpy_loaded'] for sample in samples),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Benchmark:
+    """Runs the scenarios against one app instance served over HTTP"""
+
+    def __init__(self, base_url: str, concurrency: int, requests_per_scenario: int,
+                 users: int, suspicious_share: float, seed: int):
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.requests = requests_per_scenario
+        self.users = [
+            {'email': f'bench{i}@example.com', 'password': f'bench-password-{i}'} for i in range(users)
+        ]
+        self.tokens: List[str] = []
+        self.claim_ids: List[int] = []
+        self.suspicious_share = suspicious_share
+        self._random = random.Random(seed)
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _run(self, calls: List[Callable[[requests.Session], requests.Response]]) -> Dict[str, Any]:
+        def timed(call):
+            start = time.perf_counter()
+            try:
+                response = call(self._session())
+                status, body = response.status_code, response
+            except requests.RequestException as e:
+                status, body = type(e).__name__, None
+            return {'status': status, 'seconds': time.perf_counter() - start, 'response': body}
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            samples = list(pool.map(timed, calls))
+        summary = summarize(samples, time.perf_counter() - start)
+        summary['_samples'] = samples
+        return summary
+
+    def _auth(self, i: int) -> Dict[str, str]:
+        return {'Authorization': f'Bearer {self.tokens[i % len(self.tokens)]}'} if self.tokens else {}
+
+    def register(self):
+        calls = [
+            (lambda s, user=user: s.post(f'{self.base_url}/api/auth/register', json=user, timeout=60))
+            for user in self.users
+        ]
+        result = self._run(calls)
+        self.tokens = [sample['response'].json()['token'] for sample in result['_samples']
+                       if sample['status'] == 201]
+        return result
+
+    def login(self):
+        calls = [
+            (lambda s, user=self.users[i % len(self.users)]:
+             s.post(f'{self.base_url}/api/auth/login', json=user, timeout=60))
+            for i in range(self.requests)
+        ]
+        return self._run(calls)
+
+    def _claim_form(self, i: int) -> Dict[str, str]:
+        texts = SUSPICIOUS_CLAIMS if self._random.random() < self.suspicious_share else PLAIN_CLAIMS
+        form = {'claim_text': f'{self._random.choice(texts)} (ref {i})', 'policy_number': f'POL-{100000 + i}'}
+        # Dated claims are structured locally, the rest need the structuring
+        # agent. The date is recent so the pre-scorer doesn't flag plain
+        # claims as late reports and escalate them to the agents
+        if i % 2 == 0:
+            form['incident_date'] = (date.today() - timedelta(days=2)).isoformat()
+        return form
+
+    def submit(self):
+        calls = [
+            (lambda s, i=i, form=self._claim_form(i):
+             s.post(f'{self.base_url}/api/claims', data=form, headers=self._auth(i), timeout=120))
+            for i in range(self.requests)
+        ]
+        result = self._run(calls)
+        self.claim_ids = [sample['response'].json()['claim']['id'] for sample in result['_samples']
+                          if sample['status'] == 201]
+        return result
+
+    def list(self):
+        calls = [
+            (lambda s: s.get(f'{self.base_url}/api/claims', params={'limit': 50}, timeout=60))
+            for _ in range(self.requests)
+        ]
+        return self._run(calls)
+
+    def assess(self):
+        calls = [
+            (lambda s, i=i, claim_id=claim_id:
+             s.post(f'{self.base_url}/api/claims/{claim_id}/assess', headers=self._auth(i), timeout=120))
+            for i, claim_id in enumerate(self.claim_ids)
+        ]
+        return self._run(calls)
+
+
+def run(args) -> Dict[str, Any]:
+    tmp = tempfile.mkdtemp(prefix='insuralq-bench-')
+    try:
+        return _run(args, tmp)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _run(args, tmp: str) -> Dict[str, Any]:
+    openai_server = FakeOpenAIServer(latency=args.openai_latency, error_rate=args.openai_error_rate,
+                                     seed=args.seed).start()
+    curacel_server = FakeCuracelServer(latency=args.curacel_latency, error_rate=args.curacel_error_rate,
+                                       seed=args.seed).start()
+    # Must be in place before the backend's modules read them at import time
+    os.environ.update({
+        'OPENAI_API_KEY': 'benchmark',
+        'OPENAI_BASE_URL': f'{openai_server.url}/v1',
+        'OPENAI_AGENTS_DISABLE_TRACING': '1',
+        'CURACEL_API_URL': curacel_server.url,
+        'CURACEL_API_KEY': 'benchmark',
+    })
+    if not args.rate_limits:
+        # Measure capacity rather than the per-user limiter
+        os.environ.setdefault('CLAIM_USER_RATE_PER_MINUTE', '1000000')
+        os.environ.setdefault('CLAIM_USER_BURST', '1000000')
+
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    backend = load_backend()
+    config = {
+        'DATABASE': os.path.join(tmp, 'bench.sqlite'),
+        'UPLOAD_FOLDER': os.path.join(tmp, 'uploads'),
+        'AGENT_RUN_TIMEOUT': 120,
+    }
+    if args.bcrypt_rounds:
+        config['BCRYPT_ROUNDS'] = args.bcrypt_rounds
+    app = backend.create_app(config)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    bench = Benchmark(f'http://127.0.0.1:{server.server_port}', args.concurrency, args.requests,
+                      args.users, args.suspicious_share, args.seed)
+    scenarios = {}
+    try:
+        for name in args.scenarios:
+            result = getattr(bench, name)()
+            result.pop('_samples')
+            scenarios[name] = result
+            print(f"{name}: {result['requests']} requests, {result['throughput_rps']} req/s, "
+                  f"p95 {result['latency_ms']['p95']} ms", file=sys.stderr)
+    finally:
+        server.shutdown()
+        # Nothing may write to the database once the run's directory is removed
+        backend.routes.claims.outbox_dispatcher.stop()
+        backend.routes.claims.upload_gc.stop()
+        openai_server.stop()
+        curacel_server.stop()
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'started_at': datetime.utcnow().isoformat(),
+            'python': platform.python_version(),
+            'cpu_count': os.cpu_count(),
+            'config': {key: value for key, value in vars(args).items() if key not in ('output', 'baseline')},
+            'bcrypt_rounds': app.extensions['password_hasher'].rounds,
+        },
+        'scenarios': scenarios,
+        'stubs': {
+            'openai_responses': openai_server.count('/responses'),
+            'openai_moderations': openai_server.count('/moderations'),
+            'curacel_claims': len(curacel_server.requests),
+        },
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--concurrency', type=int, default=8, help='requests in flight at once')
+    parser.add_argument('--requests', type=int, default=100, help='requests per scenario')
+    parser.add_argument('--users', type=int, default=20, help='accounts to register')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--suspicious-share', type=float, default=0.3,
+                        help='share of submitted claims worded to be escalated to the agents')
+    parser.add_argument('--openai-latency', type=float, default=0.2, help='seconds per OpenAI request')
+    parser.add_argument('--openai-error-rate', type=float, default=0.0)
+    parser.add_argument('--curacel-latency', type=float, default=0.05, help='seconds per Curacel request')
+    parser.add_argument('--curacel-error-rate', type=float, default=0.0)
+    parser.add_argument('--bcrypt-rounds', type=int, default=None,
+                        help="fixed bcrypt cost, the app's default when omitted")
+    parser.add_argument('--rate-limits', action='store_true',
+                        help="keep the per-user rate limits instead of lifting them")
+    parser.add_argument('--startup-runs', type=int, default=3,
+                        help='fresh processes timed from start to the first /hello, 0 to skip')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='earlier report to compare against')
+    args = parser.parse_args(argv)
+    if 'assess' in args.scenarios and 'submit' not in args.scenarios:
+        parser.error('assess needs the claims created by submit')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # Before run() points the environment at the stand-ins
+    startup = measure_startup(args.startup_runs) if args.startup_runs else None
+    report = run(args)
+    if startup is not None:
+        report['startup'] = startup
+    if args.baseline:
+        with open(args.baseline) as f:
+            report['baseline'] = compare(report, json.load(f))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,137 @@
+"""A claims app wired to a stand-in agent graph, for route-level tests"""
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import types
+import unittest
+from unittest import mock
+
+from backend_package import load_backend
+
+
+class FakeAgent:
+    def __init__(self, name='fake_agent'):
+        self.name = name
+
+
+class FakeAgents(types.ModuleType):
+    """Stands in for backend.services.agents, tracking how many runs overlap.
+
+    Structuring runs answer with a JSON claim, other runs echo their input;
+    `assessment` is what the assessment pipeline returns.
+    """
+
+    def __init__(self, delay=0.0):
+        super().__init__('backend.services.agents')
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+        self.calls = []
+        self.cached_runs = []
+        self.assessment = json.dumps({'risk_score': 0.9, 'summary': 'checked'})
+        self.error = None
+
+    def route_agent(self, endpoint, role=None):
+        return FakeAgent()
+
+    async def _run(self, kind, result):
+        self.calls.append(kind)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.running -= 1
+        return result
+
+    async def run_agent(self, text, bypass_cache=False, agent=None, cache=True):
+        self.cached_runs.append(cache)
+        if text.startswith('Claim:'):
+            return await self._run('structure', json.dumps({'summary': 'structured by agent'}))
+        return await self._run('chat', f'reply to {text}')
+
+    async def run_assessment_pipeline(self, text, bypass_cache=False):
+        return await self._run('assess', self.assessment)
+
+    async def stream_assessment_pipeline(self, text, bypass_cache=False):
+        yield {'event': 'agent_started', 'agent': 'fake_agent'}
+        assessment = await self._run('assess', self.assessment)
+        yield {'event': 'done', 'assessment': assessment}
+
+
+class ClaimsAppTestCase(unittest.TestCase):
+    """Builds the app around FakeAgents with admission limits lifted.
+
+    Agent runs go through a runtime of their own, so no OpenAI client is
+    created. Set `asgi` to build the ASGI app instead of the Flask one.
+    """
+
+    asgi = False
+    agent_delay = 0.0
+
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.backend = load_backend()
+        from backend.routes import claims, claims_async
+        from backend.services import claim_service
+        from backend.services.admission import AdmissionController
+        from backend.services.agent_runtime import AgentRuntime
+
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir, ignore_errors=True)
+        self.agents = FakeAgents(delay=self.agent_delay)
+        # Only swap the one entry: restoring a copy of sys.modules would drop
+        # everything imported while the test ran
+        real_agents = sys.modules.get('backend.services.agents')
+        sys.modules['backend.services.agents'] = self.agents
+        self.addCleanup(self._restore_agents, real_agents)
+        self.admission = AdmissionController('test', max_in_flight=64, rate=1000, burst=1000)
+        self.runtime = AgentRuntime(max_concurrency=16)
+        self.addCleanup(self.runtime.shutdown)
+        self.patch(sys.modules['backend.services'], 'agents', self.agents)
+        for module in (claims, claims_async):
+            self.patch(module, 'claim_admission', self.admission)
+        for module in (claims, claims_async, claim_service):
+            self.patch(module, 'agent_runtime', self.runtime)
+        self.app = self.backend.create_app({
+            'DATABASE': os.path.join(self.temp_dir, 'claims.sqlite'),
+            'UPLOAD_FOLDER': os.path.join(self.temp_dir, 'uploads'),
+            'CURACEL_OUTBOX_DISPATCH': False,
+            'UPLOAD_GC': False,
+            'BCRYPT_ROUNDS': 4,
+        }, asgi=self.asgi)
+        if not self.asgi:
+            self.client = self.app.test_client()
+
+    def patch(self, target, name, value):
+        patcher = mock.patch.object(target, name, value, create=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def _restore_agents(real_agents):
+        if real_agents is None:
+            sys.modules.pop('backend.services.agents', None)
+        else:
+            sys.modules['backend.services.agents'] = real_agents
+
+    def create_claim(self, policy_number='POL-123', **fields):
+        """Store a claim directly, returning it"""
+        from backend.services.claim_store import claim_store
+        claim = {'claim_text': 'Rear-ended on 2024-03-01, repairs cost $1,200', **fields}
+        return claim_store.create_claim(claim, policy_number=policy_number)
+
+    def wait_for(self, predicate, timeout=5.0):
+        """Poll until predicate() returns something truthy, returning it"""
+        deadline = time.monotonic() + timeout
+        while True:
+            result = predicate()
+            if result or time.monotonic() > deadline:
+                return result
+            time.sleep(0.02)
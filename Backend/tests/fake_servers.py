@@ -0,0 +1,240 @@
+"""Local stand-ins for the external HTTP services the backend talks to"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeServer:
+    """Runs a handler class on 127.0.0.1 in a background thread.
+
+    Use as a context manager or call start()/stop(). `url` is the base URL.
+    """
+
+    handler_class = None
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.requests = []
+        self.connections = 0
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        handler = type('BoundHandler', (self.handler_class,), {'fake': self})
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def record(self, handler, body):
+        with self._lock:
+            self.requests.append({
+                'method': handler.command,
+                'path': handler.path,
+                'headers': dict(handler.headers),
+                'body': body,
+            })
+
+
+class FakeHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    fake = None
+
+    def setup(self):
+        super().setup()
+        with self.fake._lock:
+            self.fake.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length', 0))
+        raw = self.rfile.read(length) if length else b''
+        try:
+            return json.loads(raw) if raw else None
+        except ValueError:
+            return raw.decode('utf-8', 'replace')
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CuracelHandler(FakeHandler):
+    def do_POST(self):
+        body = self.read_json()
+        self.fake.record(self, body)
+        status, payload = self.fake.next_response(body, self.headers)
+        if status is None:
+            # Simulate a dropped connection
+            self.close_connection = True
+            self.connection.close()
+            return
+        self.send_json(status, payload)
+
+
+class FakeCuracelServer(FakeServer):
+    """Stand-in for the Curacel Grow `/claims` endpoint.
+
+    Queue scripted failures with `fail_next`, slow it down with `latency`,
+    or set `error_rate` to fail a random share of requests with a 503.
+    Requests carrying a repeated Idempotency-Key get the original response.
+    """
+
+    handler_class = CuracelHandler
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, seed: int = 0):
+        super().__init__(latency)
+        import random
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._scripted = []
+        self._by_key = {}
+        self.next_id = 1
+
+    def fail_next(self, count: int = 1, status: int = 503):
+        """Answer the next `count` requests with `status` (None drops the connection)"""
+        with self._lock:
+            self._scripted.extend([status] * count)
+
+    def next_response(self, body, headers):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self._scripted:
+                status = self._scripted.pop(0)
+                return status, {'message': 'Scripted failure'}
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 503, {'message': 'Injected failure'}
+            key = headers.get('Idempotency-Key')
+            if key and key in self._by_key:
+                return 201, self._by_key[key]
+            response = {'status': 'success', 'data': {'id': self.next_id, 'claim': body}}
+            self.next_id += 1
+            if key:
+                self._by_key[key] = response
+            return 201, response
+
+    @property
+    def claims_created(self) -> int:
+        return self.next_id - 1
+
+
+# Reply of the fake model: one JSON object that satisfies every agent's
+# parser (structured claim fields plus an assessment)
+FAKE_MODEL_OUTPUT = {
+    'claim_text': 'Rear-ended at a traffic light, bumper and tail light damaged',
+    'incident_date': '2026-01-15',
+    'policy_number': 'POL-000001',
+    'attached_files': [],
+    'risk_score': 3,
+    'missing_info': [],
+    'recommendation': 'Approve after verifying the repair estimate',
+    'fraud_indicators': {},
+}
+
+
+class OpenAIHandler(FakeHandler):
+    def do_POST(self):
+        body = self.read_json()
+        self.fake.record(self, body)
+        status, payload = self.fake.next_response(self.path, body)
+        self.send_json(status, payload)
+
+
+class FakeOpenAIServer(FakeServer):
+    """Stand-in for the OpenAI Responses (`/v1/responses`) and Moderation
+    (`/v1/moderations`) APIs, enough for the agents SDK and ModerationService.
+
+    Responses are non-streaming. `latency` delays every request, `error_rate`
+    fails a random share with a 500 and `flag_rate` flags moderation inputs.
+    """
+
+    handler_class = OpenAIHandler
+
+    def __init__(self, latency: float = 0.0, error_rate: float = 0.0, flag_rate: float = 0.0,
+                 output=None, seed: int = 0):
+        super().__init__(latency)
+        import random
+        self.error_rate = error_rate
+        self.flag_rate = flag_rate
+        self.output = output if output is not None else FAKE_MODEL_OUTPUT
+        self._random = random.Random(seed)
+        self._next_id = 0
+
+    def count(self, path: str) -> int:
+        with self._lock:
+            return sum(1 for request in self.requests if request['path'].endswith(path))
+
+    def next_response(self, path, body):
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 500, {'error': {'message': 'Injected failure', 'type': 'server_error'}}
+            self._next_id += 1
+            request_id = self._next_id
+            flags = [self._random.random() < self.flag_rate for _ in range(
+                len(body.get('input')) if isinstance(body, dict) and isinstance(body.get('input'), list) else 1
+            )]
+        if path.endswith('/moderations'):
+            return 200, {
+                'id': f'modr-{request_id}',
+                'model': body.get('model', 'omni-moderation-latest'),
+                'results': [{'flagged': flag, 'categories': {}, 'category_scores': {}} for flag in flags],
+            }
+        if path.endswith('/responses'):
+            return 200, self.response(request_id, body)
+        return 404, {'error': {'message': f'Unknown path {path}', 'type': 'invalid_request_error'}}
+
+    def response(self, request_id, body):
+        text = self.output if isinstance(self.output, str) else json.dumps(self.output)
+        return {
+            'id': f'resp_{request_id}',
+            'object': 'response',
+            'created_at': int(time.time()),
+            'status': 'completed',
+            'model': body.get('model') or 'gpt-4o',
+            'output': [{
+                'type': 'message',
+                'id': f'msg_{request_id}',
+                'status': 'completed',
+                'role': 'assistant',
+                'content': [{'type': 'output_text', 'text': text, 'annotations': []}],
+            }],
+            'parallel_tool_calls': True,
+            'tool_choice': 'auto',
+            'tools': [],
+            'usage': {
+                'input_tokens': 100,
+                'input_tokens_details': {'cached_tokens': 0},
+                'output_tokens': 50,
+                'output_tokens_details': {'reasoning_tokens': 0},
+                'total_tokens': 150,
+            },
+        }
@@ -0,0 +1,104 @@
+import unittest
+import threading
+import time
+from services.admission import (
+    AdmissionController, AdmissionRejected, TokenBucket, RATE_LIMITED, QUEUE_FULL, TIMED_OUT
+)
+
+class TestTokenBucket(unittest.TestCase):
+    def test_burst_then_refill(self):
+        """Test that a bucket allows its burst and then refills at its rate."""
+        bucket = TokenBucket(rate=2, burst=2, now=0)
+
+        self.assertEqual(bucket.take(0), 0)
+        self.assertEqual(bucket.take(0), 0)
+        self.assertAlmostEqual(bucket.take(0), 0.5)
+        self.assertEqual(bucket.take(0.5), 0)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.controller = AdmissionController(
+            'test', max_in_flight=1, max_waiting=1, wait_timeout=0.05, rate=100, burst=100
+        )
+
+    def test_admit_and_release(self):
+        """Test that tickets hold a slot until released once."""
+        ticket = self.controller.admit('user:1')
+        self.assertEqual(self.controller.stats()['in_flight'], 1)
+
+        ticket.release()
+        ticket.release()
+        stats = self.controller.stats()
+        self.assertEqual((stats['in_flight'], stats['admitted']), (0, 1))
+
+    def test_rate_limited_per_key(self):
+        """Test that a key past its burst is shed while other keys are not."""
+        controller = AdmissionController('test', max_in_flight=10, rate=0.5, burst=1)
+        controller.admit('user:1').release()
+
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.admit('user:1')
+        self.assertEqual(context.exception.reason, RATE_LIMITED)
+        self.assertEqual(context.exception.retry_after, 2)
+        controller.admit('user:2').release()
+        self.assertEqual(controller.stats()['shed'][RATE_LIMITED], 1)
+
+    def test_cost_takes_several_tokens(self):
+        """Test that a request costing several tokens drains the bucket by that much."""
+        controller = AdmissionController('test', max_in_flight=10, rate=1, burst=5)
+        controller.admit('user:1', cost=4).release()
+
+        with self.assertRaises(AdmissionRejected) as context:
+            controller.admit('user:1', cost=2)
+        self.assertEqual(context.exception.reason, RATE_LIMITED)
+        controller.admit('user:1').release()
+        with self.assertRaises(ValueError):
+            controller.admit('user:2', cost=6)
+
+    def test_waiter_gets_released_slot(self):
+        """Test that a waiting request is admitted when a slot frees up."""
+        ticket = self.controller.admit('user:1')
+        self.controller.wait_timeout = 5
+        admitted = []
+        waiter = threading.Thread(target=lambda: admitted.append(self.controller.admit('user:2')))
+        waiter.start()
+        while self.controller.stats()['waiting'] == 0:
+            time.sleep(0.001)
+
+        ticket.release()
+        waiter.join(timeout=5)
+
+        self.assertEqual(len(admitted), 1)
+        self.assertEqual(self.controller.stats()['in_flight'], 1)
+        admitted[0].release()
+
+    def test_sheds_when_wait_times_out(self):
+        """Test that a request waiting past the timeout is shed."""
+        with self.controller.admit('user:1'):
+            with self.assertRaises(AdmissionRejected) as context:
+                self.controller.admit('user:2')
+
+        self.assertEqual(context.exception.reason, TIMED_OUT)
+        self.assertGreaterEqual(context.exception.retry_after, 1)
+
+    def test_sheds_when_queue_is_full(self):
+        """Test that requests beyond the wait queue are shed immediately."""
+        self.controller.wait_timeout = 5
+        ticket = self.controller.admit('user:1')
+        waiter = threading.Thread(target=lambda: self.controller.admit('user:2').release())
+        waiter.start()
+        while self.controller.stats()['waiting'] == 0:
+            time.sleep(0.001)
+
+        with self.assertRaises(AdmissionRejected) as context:
+            self.controller.admit('user:3')
+        ticket.release()
+        waiter.join(timeout=5)
+
+        self.assertEqual(context.exception.reason, QUEUE_FULL)
+        self.assertEqual(self.controller.stats()['shed'][QUEUE_FULL], 1)
+
+if __name__ == '__main__':
+    unittest.main()
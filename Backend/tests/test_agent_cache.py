@@ -0,0 +1,86 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from services.agent_cache import AgentResultCache
+
+class TestAgentResultCache(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'agent_cache.sqlite')
+        self.cache = AgentResultCache(maxsize=2, ttl=60)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_key_ignores_whitespace_differences(self):
+        """Test that resubmissions differing only in whitespace share a key."""
+        key1 = self.cache.make_key("Claim: car hit\nPolicy: P-1", "1", "gpt-4o")
+        key2 = self.cache.make_key("  Claim:  car hit \n\n Policy: P-1 ", "1", "gpt-4o")
+
+        self.assertEqual(key1, key2)
+
+    def test_key_depends_on_graph_version_and_model(self):
+        """Test that a new graph version or model misses the cache."""
+        key = self.cache.make_key("Claim: car hit", "1", "gpt-4o")
+
+        self.assertNotEqual(key, self.cache.make_key("Claim: car hit", "2", "gpt-4o"))
+        self.assertNotEqual(key, self.cache.make_key("Claim: car hit", "1", "gpt-4.1"))
+
+    def test_hit_and_miss_counters(self):
+        """Test that lookups are counted."""
+        self.assertEqual(self.cache.get("k"), (False, None))
+        self.cache.set("k", {"verdict": "ok"})
+        self.assertEqual(self.cache.get("k"), (True, {"verdict": "ok"}))
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_ratio"], 0.5)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted first."""
+        self.cache.set("a", 1)
+        self.cache.set("b", 2)
+        self.cache.get("a")
+        self.cache.set("c", 3)
+
+        self.assertEqual(self.cache.get("b"), (False, None))
+        self.assertEqual(self.cache.get("a"), (True, 1))
+
+    def test_ttl_expiry(self):
+        """Test that expired entries are not served."""
+        cache = AgentResultCache(ttl=0.01)
+        cache.set("k", "v")
+        time.sleep(0.02)
+
+        self.assertEqual(cache.get("k"), (False, None))
+
+    def test_disk_tier_shared_between_instances(self):
+        """Test that the SQLite tier serves results to a fresh cache."""
+        AgentResultCache(db_path=self.db_path).set("k", "structured claim")
+
+        other = AgentResultCache(db_path=self.db_path)
+        self.assertEqual(other.get("k"), (True, "structured claim"))
+        self.assertEqual(other.stats()["disk_hits"], 1)
+
+    def test_purge_expired(self):
+        """Test that expired disk rows are purged."""
+        cache = AgentResultCache(ttl=0.01, db_path=self.db_path)
+        cache.set("k", "v")
+        time.sleep(0.02)
+
+        self.assertEqual(cache.purge_expired(), 1)
+
+    def test_writes_purge_expired_rows(self):
+        """Test that a write past the purge interval drops expired disk rows."""
+        cache = AgentResultCache(ttl=0.01, db_path=self.db_path, purge_interval=0.01)
+        cache.set("old", "v")
+        time.sleep(0.02)
+
+        cache.set("new", "v")
+
+        rows = cache.db.connection().execute('SELECT key FROM agent_results').fetchall()
+        self.assertEqual([row['key'] for row in rows], ["new"])
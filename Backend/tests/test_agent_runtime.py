@@ -0,0 +1,215 @@
+import unittest
+import asyncio
+import os
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from unittest import mock
+from services.agent_runtime import AgentRuntime, _default_openai_client
+
+class TestAgentRuntime(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.runtime = AgentRuntime(max_concurrency=2, client_factory=lambda: object())
+
+    def tearDown(self):
+        self.runtime.shutdown()
+
+    def test_run_returns_result(self):
+        """Test running a coroutine from a sync caller."""
+        async def answer():
+            await asyncio.sleep(0)
+            return 42
+
+        self.assertEqual(self.runtime.run(answer()), 42)
+
+    def test_loop_and_client_are_reused(self):
+        """Test that every run shares one loop and one client."""
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        first = self.runtime.run(current_loop())
+        client = self.runtime.client
+        second = self.runtime.run(current_loop())
+
+        self.assertIs(first, second)
+        self.assertIs(self.runtime.client, client)
+
+    def test_replay_builds_no_openai_client(self):
+        """Test that the default client is skipped when agent runs replay a cassette."""
+        with mock.patch.dict(os.environ, {'AGENT_CASSETTE_MODE': 'replay'}):
+            os.environ.pop('OPENAI_API_KEY', None)
+            runtime = AgentRuntime(client_factory=_default_openai_client)
+            runtime.start()
+            runtime.shutdown()
+
+        self.assertIsNone(runtime.client)
+
+    def test_concurrency_is_capped(self):
+        """Test that no more than max_concurrency runs are in flight."""
+        state = {'active': 0, 'peak': 0}
+
+        async def work():
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.02)
+            state['active'] -= 1
+
+        futures = [self.runtime.submit(work()) for _ in range(6)]
+        for future in futures:
+            future.result(5)
+
+        self.assertEqual(state['peak'], 2)
+
+    def test_runs_from_many_threads(self):
+        """Test that sync callers on different threads can share the runtime."""
+        results = []
+
+        async def echo(value):
+            await asyncio.sleep(0.01)
+            return value
+
+        threads = [
+            threading.Thread(target=lambda v=i: results.append(self.runtime.run(echo(v))))
+            for i in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(results), list(range(5)))
+
+    def test_run_timeout(self):
+        """Test that a run exceeding its timeout raises."""
+        async def slow():
+            await asyncio.sleep(5)
+
+        with self.assertRaises(FutureTimeoutError):
+            self.runtime.run(slow(), timeout=0.05)
+
+    def test_exceptions_propagate(self):
+        """Test that errors raised by the coroutine reach the caller."""
+        async def boom():
+            raise ValueError("bad input")
+
+        with self.assertRaises(ValueError):
+            self.runtime.run(boom())
+
+    def test_run_async_awaits_from_another_loop(self):
+        """Test that a caller's event loop can await runs without blocking on them."""
+        async def current_loop():
+            await asyncio.sleep(0.05)
+            return asyncio.get_running_loop()
+
+        async def caller():
+            runs = [self.runtime.run_async(current_loop()) for _ in range(2)]
+            return asyncio.get_running_loop(), await asyncio.gather(*runs)
+
+        caller_loop, run_loops = asyncio.run(caller())
+        self.assertIsNot(run_loops[0], caller_loop)
+        self.assertIs(run_loops[0], run_loops[1])
+
+    def test_run_async_timeout_cancels_run(self):
+        """Test that an awaited run exceeding its timeout raises and is cancelled."""
+        cancelled = threading.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(FutureTimeoutError):
+            asyncio.run(self.runtime.run_async(slow(), timeout=0.05))
+        self.assertTrue(cancelled.wait(1))
+
+    def test_iter_completed_yields_in_completion_order(self):
+        """Test that batch results stream back as each run finishes."""
+        async def sleep_for(delay):
+            await asyncio.sleep(delay)
+            return delay
+
+        coros = {'slow': sleep_for(0.2), 'fast': sleep_for(0.01)}
+        order = [key for key, future in self.runtime.iter_completed(coros, limit=2)]
+
+        self.assertEqual(order, ['fast', 'slow'])
+
+    def test_iter_completed_respects_batch_limit(self):
+        """Test that a batch never runs more than its own limit at once."""
+        state = {'active': 0, 'peak': 0}
+
+        async def work():
+            state['active'] += 1
+            state['peak'] = max(state['peak'], state['active'])
+            await asyncio.sleep(0.01)
+            state['active'] -= 1
+
+        coros = {i: work() for i in range(5)}
+        results = list(self.runtime.iter_completed(coros, limit=1))
+
+        self.assertEqual(len(results), 5)
+        self.assertEqual(state['peak'], 1)
+
+    def test_iter_completed_reports_errors_per_key(self):
+        """Test that one failing run doesn't hide the others."""
+        async def ok():
+            return 'ok'
+
+        async def boom():
+            raise ValueError("bad claim")
+
+        results = dict(self.runtime.iter_completed({'a': ok(), 'b': boom()}, limit=2))
+
+        self.assertEqual(results['a'].result(), 'ok')
+        self.assertIsInstance(results['b'].exception(), ValueError)
+
+    def test_iter_async_yields_items_as_produced(self):
+        """Test that an async iterator's items reach a sync caller in order."""
+        async def numbers():
+            for i in range(3):
+                await asyncio.sleep(0.01)
+                yield i
+
+        self.assertEqual(list(self.runtime.iter_async(numbers())), [0, 1, 2])
+
+    def test_iter_async_propagates_errors(self):
+        """Test that an error raised mid-stream reaches the caller after earlier items."""
+        async def failing():
+            yield 'first'
+            raise ValueError("stream broke")
+
+        stream = self.runtime.iter_async(failing())
+        self.assertEqual(next(stream), 'first')
+        with self.assertRaises(ValueError):
+            next(stream)
+
+    def test_iter_async_timeout(self):
+        """Test that waiting too long for the next item raises."""
+        async def stalled():
+            yield 'first'
+            await asyncio.sleep(5)
+            yield 'second'
+
+        stream = self.runtime.iter_async(stalled(), timeout=0.05)
+        self.assertEqual(next(stream), 'first')
+        with self.assertRaises(FutureTimeoutError):
+            next(stream)
+
+    def test_iter_async_close_cancels_iteration(self):
+        """Test that closing the generator early stops the async iterator."""
+        cleaned_up = threading.Event()
+
+        async def endless():
+            try:
+                while True:
+                    await asyncio.sleep(0.01)
+                    yield 'tick'
+            finally:
+                cleaned_up.set()
+
+        stream = self.runtime.iter_async(endless())
+        self.assertEqual(next(stream), 'tick')
+        stream.close()
+
+        self.assertTrue(cleaned_up.wait(2))
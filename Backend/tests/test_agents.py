@@ -0,0 +1,169 @@
+import unittest
+import asyncio
+from unittest import mock
+from agents import Agent, Model, ModelProvider, ModelResponse, Usage, set_tracing_disabled
+from openai.types.responses import ResponseOutputMessage, ResponseOutputText
+from backend_package import load_backend
+
+set_tracing_disabled(True)
+
+load_backend()
+from backend.services import agents
+from backend.services.agent_cache import AgentResultCache
+
+
+def _message(text):
+    return ResponseOutputMessage(
+        id='msg_1', type='message', role='assistant', status='completed',
+        content=[ResponseOutputText(type='output_text', text=text, annotations=[])]
+    )
+
+
+class StubModel(Model):
+    """Answers every prompt through the provider's `respond(instructions, input)`"""
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs):
+        text = await self.provider.respond(system_instructions, input)
+        return ModelResponse(output=[_message(text)], usage=Usage(requests=1), response_id=None)
+
+    async def stream_response(self, *args, **kwargs):
+        return
+        yield
+
+
+class StubProvider(ModelProvider):
+    """Numbered answers after `delay` seconds, tracking how many calls overlap.
+
+    Agents whose instructions are in `failing` raise instead of answering.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.prompts = []
+        self.running = 0
+        self.peak = 0
+        self.failing = set()
+
+    def get_model(self, model_name):
+        return StubModel(self)
+
+    async def overlap(self):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+
+    async def respond(self, instructions, input):
+        text = input[-1]['content'] if isinstance(input, list) else input
+        self.prompts.append(text)
+        await self.overlap()
+        if instructions in self.failing:
+            raise RuntimeError('model unavailable')
+        return f'answer {len(self.prompts)}'
+
+
+class StubModeration:
+    def __init__(self, provider, error=None):
+        self.provider = provider
+        self.error = error
+
+    async def is_flagged(self, text):
+        await self.provider.overlap()
+        if self.error is not None:
+            raise self.error
+        return False
+
+
+class AgentsTestCase(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.provider = StubProvider()
+        agents.configure_model_provider(self.provider)
+        self.addCleanup(agents.configure_model_provider, None)
+        self.cache = AgentResultCache()
+        patcher = mock.patch.object(agents, 'agent_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.agent = Agent(name='Stub Agent', instructions='Answer briefly')
+
+
+class TestRunAgent(AgentsTestCase):
+    def test_repeated_input_is_served_from_cache(self):
+        """Test that a repeated input is answered from the result cache."""
+        first = asyncio.run(agents.run_agent('my car was hit', agent=self.agent))
+        second = asyncio.run(agents.run_agent('my car  was hit', agent=self.agent))
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(self.provider.prompts), 1)
+
+    def test_uncached_runs_neither_read_nor_store(self):
+        """Test that cache=False always calls the model and leaves the cache empty."""
+        first = asyncio.run(agents.run_agent('hello', agent=self.agent, cache=False))
+        second = asyncio.run(agents.run_agent('hello', agent=self.agent, cache=False))
+
+        self.assertNotEqual(first, second)
+        self.assertEqual(len(self.provider.prompts), 2)
+        self.assertEqual(self.cache.stats()['size'], 0)
+
+class TestAssessmentPipeline(AgentsTestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        self.provider.delay = 0.05
+        self.moderation = StubModeration(self.provider)
+        patcher = mock.patch.object(agents, 'moderation_service', self.moderation)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def assess(self):
+        return asyncio.run(agents.run_assessment_pipeline('Assess this claim: phone stolen'))
+
+    def test_branches_run_concurrently(self):
+        """Test that moderation, extraction and fraud analysis are in flight together before the verdict."""
+        verdict = self.assess()
+
+        self.assertEqual(self.provider.peak, 3)
+        self.assertEqual(len(self.provider.prompts), 3)
+        self.assertEqual(verdict, 'answer 3')
+        self.assertIn('Moderation flagged: False', self.provider.prompts[-1])
+
+    def test_moderation_failure_is_unavailable(self):
+        """Test that a failed moderation check reaches the verdict as unavailable."""
+        self.moderation.error = RuntimeError('moderation down')
+
+        self.assess()
+
+        self.assertIn('Moderation flagged: unavailable', self.provider.prompts[-1])
+
+    def test_required_branch_failure_propagates(self):
+        """Test that a failed fraud analysis fails the pipeline instead of reaching the verdict."""
+        self.provider.failing.add(agents.fraud_analysis_agent.instructions)
+
+        with self.assertRaisesRegex(RuntimeError, 'model unavailable'):
+            self.assess()
+        self.assertEqual(len(self.provider.prompts), 2)
+
+class TestRouteAgent(unittest.TestCase):
+    def test_submission_goes_to_the_claim_agent_whoever_asks(self):
+        """Test that submissions reach user_agent regardless of role."""
+        for role in (None, 'customer', 'investigator'):
+            self.assertIs(agents.route_agent('submit', role), agents.user_agent)
+
+    def test_chat_follows_the_stored_role(self):
+        """Test that chat reaches internal_agent only for investigators."""
+        self.assertIs(agents.route_agent('chat', 'customer'), agents.user_agent)
+        self.assertIs(agents.route_agent('chat', 'investigator'), agents.internal_agent)
+
+    def test_unknown_callers_get_the_orchestration_agent(self):
+        """Test that chat without a known role falls back to the orchestration agent."""
+        self.assertIs(agents.route_agent('chat'), agents.orchestration_agent)
+        self.assertIs(agents.route_agent('chat', 'admin'), agents.orchestration_agent)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import asyncio
+import time
+import httpx
+from claims_app import ClaimsAppTestCase
+
+class TestAsgiApp(ClaimsAppTestCase):
+    asgi = True
+    agent_delay = 0.2
+
+    def request_all(self, *requests):
+        """Send (method, path, kwargs) requests concurrently, returning the responses"""
+        async def send():
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://testserver') as client:
+                return await asyncio.gather(*[
+                    client.request(method, path, **kwargs) for method, path, kwargs in requests
+                ])
+
+        return asyncio.run(send())
+
+    def test_chats_wait_on_agents_concurrently(self):
+        """Test that concurrent chats hold agent runs in flight together, up to the runtime's limit."""
+        started = time.perf_counter()
+        responses = self.request_all(*[
+            ('POST', '/api/claims/chat', {'json': {'message': f'hello {i}'}}) for i in range(32)
+        ])
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual({response.status_code for response in responses}, {200})
+        self.assertEqual(responses[0].json(), {'reply': 'reply to hello 0', 'agent': 'fake_agent'})
+        self.assertEqual(self.agents.peak, 16)
+        self.assertLess(elapsed, 32 * 0.2 / 4)
+
+    def test_chat_requires_message(self):
+        """Test that a chat without a message is rejected before reaching the agent."""
+        response, = self.request_all(('POST', '/api/claims/chat', {'json': {}}))
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.agents.peak, 0)
+
+    def test_invalid_token_is_rejected(self):
+        """Test that a bad bearer token gets 401 like the sync views."""
+        response, = self.request_all(
+            ('POST', '/api/claims/chat', {'json': {'message': 'hi'}, 'headers': {'Authorization': 'Bearer nope'}})
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_submit_then_assess(self):
+        """Test that a claim submitted to the async view can be assessed by the async view."""
+        submitted, = self.request_all(('POST', '/api/claims', {
+            'data': {'claim_text': 'Rear-ended on 2024-03-01, repairs cost $1,200', 'policy_number': 'POL-123'},
+            'files': {'files': ('photo.jpg', b'evidence')},
+        }))
+        self.assertEqual(submitted.status_code, 201)
+        claim_id = submitted.json()['claim']['id']
+        self.assertEqual(submitted.json()['curacel']['status'], 'pending')
+
+        first, = self.request_all(('POST', f'/api/claims/{claim_id}/assess?force=1', {}))
+        second, = self.request_all(('POST', f'/api/claims/{claim_id}/assess', {}))
+
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.json()['cached'])
+        self.assertTrue(second.json()['cached'])
+        self.assertEqual(first.json()['assessment'], second.json()['assessment'])
+
+    def test_assess_unknown_claim(self):
+        """Test that assessing a missing claim returns 404."""
+        response, = self.request_all(('POST', '/api/claims/9999/assess', {}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_shed_requests_get_retry_after(self):
+        """Test that requests past the admission limits get 429 with Retry-After."""
+        self.admission.max_in_flight = 1
+        self.admission.max_waiting = 0
+
+        responses = self.request_all(*[('POST', '/api/claims/chat', {'json': {'message': 'hi'}})] * 3)
+
+        self.assertEqual(sorted(response.status_code for response in responses), [200, 429, 429])
+        for response in responses:
+            if response.status_code == 429:
+                self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_other_routes_are_served_by_flask(self):
+        """Test that routes without an async view fall through to the Flask app."""
+        hello, listing = self.request_all(('GET', '/hello', {}), ('GET', '/api/claims', {}))
+
+        self.assertEqual(hello.text, 'Hello, World!')
+        self.assertEqual(listing.status_code, 200)
+        self.assertEqual(listing.json()['claims'], [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,13 @@
 import unittest
 import json
+import bcrypt
+import time
 from unittest.mock import patch, MagicMock
 from flask import Flask
-from routes.auth import auth_bp, auth_service, user_store
+from backend_package import load_backend
+
+load_backend()
+from backend.routes.auth import auth_bp, auth_service, user_store, token_cache
 
 class TestAuthRoutes(unittest.TestCase):
     def setUp(self):
@@ -16,6 +21,8 @@ class TestAuthRoutes(unittest.TestCase):
         user_store.users.clear()
         user_store.users_by_email.clear()
         user_store.next_id = 1
+        user_store.revoked_tokens.clear()
+        token_cache.clear()
         
         self.test_user_data = {
             "email": "test@example.com",
@@ -90,6 +97,69 @@ class TestAuthRoutes(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('Password must be at least 6 characters', data['message'])
 
+    def test_register_defaults_to_customer_role(self):
+        """Test that users registered without a role are customers."""
+        response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps(self.test_user_data),
+            content_type='application/json'
+        )
+        
+        data = json.loads(response.data)
+        self.assertEqual(data['user']['role'], 'customer')
+        self.assertEqual(auth_service.verify_token(data['token'])['role'], 'customer')
+
+    def test_register_investigator_is_refused(self):
+        """Test that users can't give themselves the investigator role."""
+        response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps({**self.test_user_data, 'role': 'investigator'}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 403)
+        self.assertIsNone(user_store.get_user_by_email(self.test_user_data['email']))
+
+    def test_set_role_command(self):
+        """Test that the set-role command grants a registered user the investigator role."""
+        self.client.post(
+            '/api/auth/register',
+            data=json.dumps(self.test_user_data),
+            content_type='application/json'
+        )
+        runner = self.app.test_cli_runner()
+        
+        result = runner.invoke(args=['auth', 'set-role', 'test@example.com', 'investigator'])
+        missing = runner.invoke(args=['auth', 'set-role', 'nobody@example.com', 'investigator'])
+        
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(user_store.get_user_by_email('test@example.com')['role'], 'investigator')
+        self.assertNotEqual(missing.exit_code, 0)
+        self.assertIn('No user with email', missing.output)
+
+    def test_calibrate_rounds_command(self):
+        """Test that calibrate-rounds prints the cost calibrated for the target time."""
+        runner = self.app.test_cli_runner()
+        
+        with patch('backend.routes.auth.calibrate_rounds', return_value=13) as calibrate:
+            result = runner.invoke(args=['auth', 'calibrate-rounds', '--target', '0.5'])
+        
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output.strip(), 'BCRYPT_ROUNDS=13')
+        calibrate.assert_called_once_with(0.5)
+
+    def test_register_invalid_role(self):
+        """Test registration with an unknown role."""
+        response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps({**self.test_user_data, 'role': 'admin'}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.data)
+        self.assertIn('Role must be one of', data['message'])
+
     def test_register_duplicate_user(self):
         """Test registration with duplicate email."""
         # Register first user
@@ -139,6 +209,23 @@ class TestAuthRoutes(unittest.TestCase):
         self.assertIn('token', data)
         self.assertEqual(data['user']['email'], self.test_user_data['email'])
 
+    def test_login_rehashes_password_at_old_cost(self):
+        """Test that login upgrades a hash made at a different cost."""
+        old_hash = bcrypt.hashpw(b"testpassword123", bcrypt.gensalt(4)).decode('utf-8')
+        user = user_store.create_user(email="test@example.com", password_hash=old_hash)
+        
+        response = self.client.post(
+            '/api/auth/login',
+            data=json.dumps({"email": "test@example.com", "password": "testpassword123"}),
+            content_type='application/json'
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        new_hash = user_store.get_user_by_id(user['id'])['password_hash']
+        self.assertNotEqual(new_hash, old_hash)
+        self.assertFalse(auth_service.needs_rehash(new_hash))
+        self.assertTrue(auth_service.verify_password("testpassword123", new_hash))
+
     def test_login_invalid_email(self):
         """Test login with non-existent email."""
         login_data = {
@@ -234,6 +321,78 @@ class TestAuthRoutes(unittest.TestCase):
         data = json.loads(response.data)
         self.assertIn('Token is invalid or expired', data['message'])
 
+    def test_repeat_requests_use_token_cache(self):
+        """Test that a token is verified once and then served from the cache."""
+        register_response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps(self.test_user_data),
+            content_type='application/json'
+        )
+        token = json.loads(register_response.data)['token']
+        before = token_cache.stats()
+        
+        for _ in range(3):
+            response = self.client.get('/api/auth/me', headers={'Authorization': f'Bearer {token}'})
+            self.assertEqual(response.status_code, 200)
+        
+        stats = token_cache.stats()
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['hits'] - before['hits'], 2)
+
+    def test_logout_revokes_token(self):
+        """Test that a token can't be used after logging out."""
+        register_response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps(self.test_user_data),
+            content_type='application/json'
+        )
+        token = json.loads(register_response.data)['token']
+        headers = {'Authorization': f'Bearer {token}'}
+        self.client.get('/api/auth/me', headers=headers)
+        
+        response = self.client.post('/api/auth/logout', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        
+        response = self.client.get('/api/auth/me', headers=headers)
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post('/api/auth/verify', headers=headers)
+        self.assertEqual(response.status_code, 401)
+
+    def test_revocations_reach_other_processes(self):
+        """Test that a token revoked in the store is refused even while this process has it cached."""
+        register_response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps(self.test_user_data),
+            content_type='application/json'
+        )
+        token = json.loads(register_response.data)['token']
+        headers = {'Authorization': f'Bearer {token}'}
+        self.client.get('/api/auth/me', headers=headers)
+        
+        # As if another worker handled the logout
+        user_store.revoke_token(token_cache.digest(token), time.time() + 60)
+        
+        response = self.client.get('/api/auth/me', headers=headers)
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_changes_reach_cached_tokens(self):
+        """Test that a cached token still gets the user as currently stored."""
+        register_response = self.client.post(
+            '/api/auth/register',
+            data=json.dumps(self.test_user_data),
+            content_type='application/json'
+        )
+        register_data = json.loads(register_response.data)
+        headers = {'Authorization': f"Bearer {register_data['token']}"}
+        self.client.get('/api/auth/me', headers=headers)
+        misses = token_cache.stats()['misses']
+        
+        user_store.update_user(register_data['user']['id'], name='Renamed')
+        
+        response = self.client.get('/api/auth/me', headers=headers)
+        self.assertEqual(json.loads(response.data)['user']['name'], 'Renamed')
+        self.assertEqual(token_cache.stats()['misses'], misses)
+
     def test_verify_token_valid(self):
         """Test token verification with valid token."""
         # Register and get token
@@ -10,7 +10,8 @@ class TestAuthService(unittest.TestCase):
         self.test_password = "test_password123"
         self.test_user_data = {
             "id": 1,
-            "email": "test@example.com"
+            "email": "test@example.com",
+            "role": "customer"
         }
 
     def test_hash_password(self):
@@ -47,6 +48,7 @@ class TestAuthService(unittest.TestCase):
         payload = jwt.decode(token, self.auth_service.secret_key, algorithms=[self.auth_service.algorithm])
         self.assertEqual(payload["user_id"], self.test_user_data["id"])
         self.assertEqual(payload["email"], self.test_user_data["email"])
+        self.assertEqual(payload["role"], self.test_user_data["role"])
         self.assertIn("exp", payload)
         self.assertIn("iat", payload)
 
@@ -190,4 +192,31 @@ class TestUserStore(unittest.TestCase):
         )
         
         self.assertNotEqual(user1["id"], user2["id"])
-        self.assertEqual(user2["id"], user1["id"] + 1)
\ No newline at end of file
+        self.assertEqual(user2["id"], user1["id"] + 1)
+    def test_update_user(self):
+        """Test that updating a user changes its fields and email index."""
+        created_user = self.user_store.create_user(
+            email=self.test_email,
+            password_hash=self.test_password_hash
+        )
+        
+        user = self.user_store.update_user(created_user["id"], name="New Name", email="new@example.com")
+        
+        self.assertEqual(user["name"], "New Name")
+        self.assertNotIn("password_hash", user)
+        self.assertIsNone(self.user_store.get_user_by_email(self.test_email))
+        self.assertEqual(self.user_store.get_user_by_email("new@example.com")["id"], created_user["id"])
+
+    def test_update_user_not_exists(self):
+        """Test updating a user that doesn't exist."""
+        self.assertIsNone(self.user_store.update_user(999, name="Nobody"))
+
+    def test_revoke_token(self):
+        """Test that a revoked token stays rejected until it would have expired."""
+        now = datetime.utcnow().timestamp()
+        self.user_store.revoke_token("digest-a", now + 60)
+        self.user_store.revoke_token("digest-b", now - 1)
+
+        self.assertTrue(self.user_store.is_token_revoked("digest-a"))
+        self.assertFalse(self.user_store.is_token_revoked("digest-b"))
+        self.assertNotIn("digest-b", self.user_store.revoked_tokens)
@@ -0,0 +1,81 @@
+import unittest
+import asyncio
+from openai import AsyncOpenAI
+from benchmark import compare, percentile, summarize
+from fake_servers import FakeOpenAIServer, FAKE_MODEL_OUTPUT
+
+class TestBenchmarkReport(unittest.TestCase):
+    def test_percentile_nearest_rank(self):
+        """Test that percentiles use the nearest rank."""
+        values = [float(i) for i in range(1, 101)]
+
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([3.0], 95), 3.0)
+        self.assertIsNone(percentile([], 50))
+
+    def test_summarize_counts_errors_and_throughput(self):
+        """Test that a summary reports throughput, percentiles and statuses."""
+        samples = [{'status': 200, 'seconds': 0.1}] * 3 + [{'status': 429, 'seconds': 0.01},
+                                                          {'status': 'ConnectionError', 'seconds': 1.0}]
+
+        summary = summarize(samples, duration=2.0)
+
+        self.assertEqual((summary['requests'], summary['ok'], summary['errors']), (5, 3, 2))
+        self.assertEqual(summary['throughput_rps'], 2.5)
+        self.assertEqual(summary['latency_ms']['p50'], 100.0)
+        self.assertEqual(summary['latency_ms']['max'], 1000.0)
+        self.assertEqual(summary['statuses'], {'200': 3, '429': 1, 'ConnectionError': 1})
+
+    def test_compare_reports_relative_change(self):
+        """Test that comparing against a baseline gives relative changes."""
+        def report(rps, p95):
+            return {'meta': {'commit': 'abc123'},
+                    'scenarios': {'list': {'throughput_rps': rps, 'latency_ms': {'p95': p95, 'p99': p95}}}}
+
+        result = compare(report(150, 50), report(100, 100))
+
+        self.assertEqual(result['commit'], 'abc123')
+        self.assertEqual(result['changes']['list'], {'throughput_rps': 0.5, 'p95_ms': -0.5, 'p99_ms': -0.5})
+
+    def test_compare_reports_startup_change(self):
+        """Test that startup readiness is compared when both reports measured it."""
+        result = compare({'scenarios': {}, 'startup': {'ready_s': 0.5}},
+                         {'scenarios': {}, 'startup': {'ready_s': 2.0}})
+
+        self.assertEqual(result['changes']['startup'], {'ready_s': -0.75})
+
+
+class TestFakeOpenAIServer(unittest.TestCase):
+    def test_serves_responses_and_moderations_to_the_sdk(self):
+        """Test that the OpenAI client parses the stand-in's replies."""
+        with FakeOpenAIServer(flag_rate=1.0) as fake:
+            async def call():
+                client = AsyncOpenAI(base_url=f'{fake.url}/v1', api_key='test', max_retries=0)
+                response = await client.responses.create(model='gpt-4o', input='hello')
+                moderation = await client.moderations.create(model='omni-moderation-latest', input=['a', 'b'])
+                await client.close()
+                return response, moderation
+
+            response, moderation = asyncio.run(call())
+
+        self.assertIn(FAKE_MODEL_OUTPUT['recommendation'], response.output_text)
+        self.assertEqual(response.usage.total_tokens, 150)
+        self.assertEqual([result.flagged for result in moderation.results], [True, True])
+        self.assertEqual((fake.count('/responses'), fake.count('/moderations')), (1, 1))
+
+    def test_injected_errors(self):
+        """Test that error_rate fails requests with a 500."""
+        with FakeOpenAIServer(error_rate=1.0) as fake:
+            async def call():
+                client = AsyncOpenAI(base_url=f'{fake.url}/v1', api_key='test', max_retries=0)
+                try:
+                    await client.responses.create(model='gpt-4o', input='hello')
+                finally:
+                    await client.close()
+
+            with self.assertRaises(Exception):
+                asyncio.run(call())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+from services.claim_features import (
+    extract_amounts, extract_claim_features, extract_dates, extract_evidence,
+    extract_policy_numbers, is_fully_structured, normalize_date
+)
+
+class TestClaimFeatures(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.claim_text = (
+            "On March 3rd, 2024 my car was rear-ended. Policy no. POL-2023-0042. "
+            "The repair estimate is $4,500.50 plus NGN 250,000 for towing. "
+            "I have photos and a police report, and there was a witness."
+        )
+
+    def test_extract_dates(self):
+        """Test that dates in common formats are found as ISO dates."""
+        text = "Happened 2024-03-03, reported 05/03/2024 and again on 7 March 2024."
+        self.assertEqual(extract_dates(text), ['2024-03-03', '2024-03-05', '2024-03-07'])
+
+    def test_invalid_dates_are_ignored(self):
+        """Test that impossible dates are not reported."""
+        self.assertEqual(extract_dates("On 31/02/2024 nothing happened"), [])
+
+    def test_extract_amounts(self):
+        """Test that amounts are parsed with their currency."""
+        amounts = extract_amounts("Costs were $1,200.75, £300 and ₦5 million")
+        self.assertEqual(
+            [(amount['amount'], amount['currency']) for amount in amounts],
+            [(1200.75, 'USD'), (300.0, 'GBP'), (5000000.0, 'NGN')]
+        )
+
+    def test_extract_policy_numbers(self):
+        """Test that labelled and prefixed policy numbers are found."""
+        text = "Policy number: AB123456. See also POL-99-1 and my policy covers both."
+        self.assertEqual(extract_policy_numbers(text), ['AB123456', 'POL-99-1'])
+
+    def test_extract_evidence(self):
+        """Test that evidence keywords are reported by kind."""
+        self.assertEqual(
+            extract_evidence(self.claim_text), ['photo', 'police_report', 'witness', 'estimate']
+        )
+
+    def test_normalize_date(self):
+        """Test that submitted dates are normalized to ISO format."""
+        self.assertEqual(normalize_date('2024-03-03T10:15:00'), '2024-03-03')
+        self.assertEqual(normalize_date('3 March 2024'), '2024-03-03')
+        self.assertIsNone(normalize_date('last week'))
+        self.assertIsNone(normalize_date(''))
+
+    def test_fields_are_filled_from_text(self):
+        """Test that missing form fields are filled from the claim text."""
+        claim = extract_claim_features(self.claim_text, attached_files=['photo.jpg'])
+
+        self.assertEqual(claim['incident_date'], '2024-03-03')
+        self.assertEqual(claim['policy_number'], 'POL-2023-0042')
+        self.assertEqual(claim['attached_files'], ['photo.jpg'])
+        self.assertEqual(len(claim['features']['amounts']), 2)
+        self.assertTrue(is_fully_structured(claim))
+
+    def test_form_fields_take_precedence(self):
+        """Test that submitted form values win over values found in the text."""
+        claim = extract_claim_features(self.claim_text, '2024-03-04', 'XYZ-1')
+
+        self.assertEqual(claim['incident_date'], '2024-03-04')
+        self.assertEqual(claim['policy_number'], 'XYZ-1')
+
+    def test_incomplete_claim_is_not_fully_structured(self):
+        """Test that a claim missing schema fields still needs the agent."""
+        claim = extract_claim_features("Someone broke my window yesterday.")
+
+        self.assertIsNone(claim['incident_date'])
+        self.assertIsNone(claim['policy_number'])
+        self.assertFalse(is_fully_structured(claim))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,310 @@
+import unittest
+import json
+from claims_app import ClaimsAppTestCase
+
+class TestClaimJobRoutes(ClaimsAppTestCase):
+    agent_delay = 0.05
+
+    def test_async_submission_is_polled_until_done(self):
+        """Test that an async submission answers 202 and its job reports the stored claim."""
+        response = self.client.post('/api/claims?async=1', data={'claim_text': 'Something happened to my car'})
+
+        self.assertEqual(response.status_code, 202)
+        body = response.get_json()
+        self.assertEqual(body['status_url'], f"/api/claims/jobs/{body['job_id']}")
+
+        def finished_job():
+            job = self.client.get(body['status_url']).get_json()['job']
+            return job if job['status'] in ('succeeded', 'failed') else None
+
+        job = self.wait_for(finished_job)
+        self.assertEqual(job['status'], 'succeeded', job)
+        self.assertEqual(job['stage'], 'done')
+        self.assertEqual(job['result']['claim']['summary'], 'structured by agent')
+        self.assertEqual(job['result']['curacel']['status'], 'pending')
+        self.assertEqual(self.agents.calls, ['structure'])
+        stored = self.client.get(f"/api/claims/{job['result']['claim']['id']}/curacel")
+        self.assertEqual(stored.status_code, 200)
+
+    def test_unknown_job(self):
+        """Test that polling an unknown job returns 404."""
+        response = self.client.get('/api/claims/jobs/missing')
+
+        self.assertEqual(response.status_code, 404)
+
+class TestChatRoute(ClaimsAppTestCase):
+    def test_chat_skips_the_result_cache(self):
+        """Test that chat replies are never read from or written to the shared result cache."""
+        response = self.client.post('/api/claims/chat', json={'message': 'What does my policy cover?'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['reply'], 'reply to What does my policy cover?')
+        self.assertEqual(self.agents.cached_runs, [False])
+
+class TestAssessBatchRoute(ClaimsAppTestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        from backend.services.fraud_scoring import fraud_prescorer
+        self.prescorer = fraud_prescorer
+
+    def assess_batch(self, claim_ids):
+        """Post a batch, returning its NDJSON lines keyed by claim id"""
+        response = self.client.post('/api/claims/assess-batch', json={'claim_ids': claim_ids})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        return {line['claim_id']: line for line in lines}
+
+    def test_every_claim_gets_one_line(self):
+        """Test that agent-assessed and unknown claims each get one NDJSON line with a dict assessment."""
+        self.patch(self.prescorer, 'threshold', 0.0)
+        ids = [self.create_claim()['id'] for _ in range(2)]
+
+        lines = self.assess_batch(ids + [9999])
+
+        self.assertEqual(set(lines), {*ids, 9999})
+        self.assertEqual(lines[9999]['error'], 'Claim not found')
+        for claim_id in ids:
+            self.assertEqual(lines[claim_id]['assessment'], {'risk_score': 0.9, 'summary': 'checked'})
+            self.assertFalse(lines[claim_id]['cached'])
+        self.assertEqual(self.agents.calls, ['assess', 'assess'])
+
+    def test_assessments_share_one_shape(self):
+        """Test that prescored, agent and stored assessments all come back as dicts."""
+        self.patch(self.prescorer, 'threshold', 2.0)
+        local = self.create_claim()['id']
+        prescored = self.assess_batch([local])[local]
+        self.prescorer.threshold = 0.0
+        agent = self.create_claim()['id']
+        assessed = self.assess_batch([agent])[agent]
+        stored = self.assess_batch([agent])[agent]
+
+        self.assertFalse(prescored['assessment']['escalated'])
+        self.assertEqual(assessed['assessment'], {'risk_score': 0.9, 'summary': 'checked'})
+        self.assertEqual(stored['assessment'], assessed['assessment'])
+        self.assertTrue(stored['cached'])
+
+    def test_failed_batch_still_answers_every_claim(self):
+        """Test that when the batch run fails, each unfinished claim gets an error line."""
+        self.patch(self.prescorer, 'threshold', 0.0)
+        ids = [self.create_claim()['id'] for _ in range(3)]
+
+        def failing_batch(coros, limit, timeout=None):
+            for coro in coros.values():
+                coro.close()
+            raise RuntimeError('agent loop stopped')
+            yield
+
+        self.patch(self.runtime, 'iter_completed', failing_batch)
+        lines = self.assess_batch(ids)
+
+        self.assertEqual(set(lines), set(ids))
+        for line in lines.values():
+            self.assertEqual(line['error'], 'Failed to assess claim')
+            self.assertEqual(line['details'], 'agent loop stopped')
+
+    def test_batch_is_charged_per_claim(self):
+        """Test that each claim in a batch takes a rate limit token, and batches past the burst get 413."""
+        from backend.services.admission import AdmissionController
+        self.admission = AdmissionController('test', max_in_flight=64, rate=0.001, burst=3)
+        self.patch(self.backend.routes.claims, 'claim_admission', self.admission)
+        ids = [self.create_claim()['id'] for _ in range(4)]
+
+        too_large = self.client.post('/api/claims/assess-batch', json={'claim_ids': ids})
+        first = self.client.post('/api/claims/assess-batch', json={'claim_ids': ids[:2] + ids[:2]})
+        second = self.client.post('/api/claims/assess-batch', json={'claim_ids': ids[2:]})
+
+        self.assertEqual(too_large.status_code, 413)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertIn('Retry-After', second.headers)
+
+class TestStreamAssessmentRoute(ClaimsAppTestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        from backend.services.fraud_scoring import fraud_prescorer
+        self.patch(fraud_prescorer, 'threshold', 0.0)
+        self.claim = self.create_claim()
+
+    def stream(self):
+        """GET the claim's assessment stream, returning the response and its (event, data) pairs"""
+        response = self.client.get(f"/api/claims/{self.claim['id']}/assess/stream")
+        events = []
+        for block in response.get_data(as_text=True).split('\n\n'):
+            if not block:
+                continue
+            event, data = block.split('\n')
+            self.assertTrue(event.startswith('event: ') and data.startswith('data: '), block)
+            events.append((event[len('event: '):], json.loads(data[len('data: '):])))
+        return response, events
+
+    def test_events_end_with_the_assessment(self):
+        """Test that the stream frames each event and ends with the recorded assessment."""
+        response, events = self.stream()
+
+        self.assertEqual(response.mimetype, 'text/event-stream')
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertEqual([name for name, _ in events], ['started', 'prescore', 'agent_started', 'done'])
+        self.assertEqual(events[0][1], {'claim_id': self.claim['id'], 'version': self.claim['version']})
+        done = events[-1][1]
+        self.assertEqual(done['assessment'], {'risk_score': 0.9, 'summary': 'checked'})
+        self.assertFalse(done['cached'])
+
+        _, repeat = self.stream()
+        self.assertEqual([name for name, _ in repeat], ['started', 'done'])
+        self.assertTrue(repeat[-1][1]['cached'])
+
+    def test_failure_ends_with_an_error_event(self):
+        """Test that a failed pipeline ends the stream with an error event and stores nothing."""
+        self.agents.error = RuntimeError('model unavailable')
+
+        _, events = self.stream()
+
+        self.assertEqual(events[-1], ('error', {'error': 'Failed to assess claim', 'details': 'model unavailable'}))
+        self.assertNotIn('done', [name for name, _ in events])
+        _, retry = self.stream()
+        self.assertEqual(retry[-1][0], 'error')
+
+    def test_unknown_claim(self):
+        """Test that streaming a missing claim's assessment returns 404."""
+        response = self.client.get('/api/claims/9999/assess/stream')
+
+        self.assertEqual(response.status_code, 404)
+
+class TestUpdateClaimRoute(ClaimsAppTestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        super().setUp()
+        from backend.services.fraud_scoring import fraud_prescorer
+        self.patch(fraud_prescorer, 'threshold', 0.0)
+        self.claim = self.create_claim()
+        self.headers = {'Authorization': f"Bearer {self.register('investigator@example.com')}"}
+        result = self.app.test_cli_runner().invoke(
+            args=['auth', 'set-role', 'investigator@example.com', 'investigator']
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+
+    def register(self, email):
+        """Register a customer account, returning its token"""
+        response = self.client.post('/api/auth/register', json={'email': email, 'password': 'password123'})
+        self.assertEqual(response.status_code, 201)
+        return response.get_json()['token']
+
+    def test_edit_starts_a_new_version(self):
+        """Test that an edit bumps the version and the next assessment runs afresh."""
+        url = f"/api/claims/{self.claim['id']}"
+        first = self.client.post(f'{url}/assess')
+
+        response = self.client.patch(url, json={'claim_text': 'Rear-ended, repairs cost $2,400'},
+                                     headers=self.headers)
+        second = self.client.post(f'{url}/assess')
+
+        self.assertEqual(response.status_code, 200)
+        claim = response.get_json()['claim']
+        self.assertEqual(claim['version'], self.claim['version'] + 1)
+        self.assertEqual(claim['claim_text'], 'Rear-ended, repairs cost $2,400')
+        self.assertEqual(first.get_json()['version'], 1)
+        self.assertEqual(second.get_json()['version'], 2)
+        self.assertFalse(second.get_json()['cached'])
+        self.assertEqual(self.agents.calls, ['assess', 'assess'])
+
+    def test_only_investigators_edit_claims(self):
+        """Test that edits need an investigator's token."""
+        url = f"/api/claims/{self.claim['id']}"
+        customer = {'Authorization': f"Bearer {self.register('customer@example.com')}"}
+
+        self.assertEqual(self.client.patch(url, json={'claim_text': 'changed'}).status_code, 401)
+        self.assertEqual(self.client.patch(url, json={'claim_text': 'changed'}, headers=customer).status_code, 403)
+
+    def test_invalid_edits(self):
+        """Test that empty edits and unknown claims are rejected."""
+        url = f"/api/claims/{self.claim['id']}"
+
+        self.assertEqual(self.client.patch(url, json={}, headers=self.headers).status_code, 400)
+        self.assertEqual(self.client.patch(url, json=['claim_text'], headers=self.headers).status_code, 400)
+        self.assertEqual(
+            self.client.patch('/api/claims/9999', json={'claim_text': 'changed'}, headers=self.headers).status_code,
+            404
+        )
+
+class TestClaimListingRoutes(ClaimsAppTestCase):
+    def test_pages_follow_the_cursor(self):
+        """Test that listing pages by id and hands out the next cursor."""
+        ids = [self.create_claim()['id'] for _ in range(5)]
+
+        first = self.client.get('/api/claims?limit=2').get_json()
+        second = self.client.get(f"/api/claims?limit=2&after={first['next_cursor']}").get_json()
+        last = self.client.get(f"/api/claims?limit=2&after={second['next_cursor']}").get_json()
+
+        self.assertEqual([claim['id'] for claim in first['claims']], ids[:2])
+        self.assertEqual([claim['id'] for claim in second['claims']], ids[2:4])
+        self.assertEqual([claim['id'] for claim in last['claims']], ids[4:])
+        self.assertIsNone(last['next_cursor'])
+
+    def test_default_page_size(self):
+        """Test that a listing without a limit uses the default page size."""
+        for _ in range(3):
+            self.create_claim()
+
+        body = self.client.get('/api/claims').get_json()
+
+        self.assertEqual(len(body['claims']), 3)
+        self.assertIsNone(body['next_cursor'])
+
+    def test_invalid_limits_are_rejected(self):
+        """Test that zero, negative, oversized and non-numeric limits get 400."""
+        for limit in ('0', '-1', '201', 'ten'):
+            response = self.client.get(f'/api/claims?limit={limit}')
+            self.assertEqual(response.status_code, 400, limit)
+
+    def test_filters(self):
+        """Test that policy, date and risk filters narrow the listing."""
+        early = self.create_claim('POL-1', created_at='2024-01-10T09:00:00', risk_score=0.2)
+        late = self.create_claim('POL-1', created_at='2024-02-20T12:00:00', risk_score=0.8)
+        other = self.create_claim('POL-2', created_at='2024-02-20T15:00:00', risk_score=0.9)
+
+        def ids(query):
+            return [claim['id'] for claim in self.client.get(f'/api/claims?{query}').get_json()['claims']]
+
+        self.assertEqual(ids('policy_number=POL-1'), [early['id'], late['id']])
+        self.assertEqual(ids('created_from=2024-02-01'), [late['id'], other['id']])
+        self.assertEqual(ids('created_to=2024-02-20'), [early['id'], late['id'], other['id']])
+        self.assertEqual(ids('created_to=2024-01-31'), [early['id']])
+        self.assertEqual(ids('min_risk=0.5&max_risk=0.85'), [late['id']])
+        self.assertEqual(self.client.get('/api/claims?created_from=yesterday').status_code, 400)
+
+    def test_etag_and_not_modified(self):
+        """Test that a page carries an ETag and an unchanged page answers If-None-Match with 304."""
+        self.create_claim()
+
+        first = self.client.get('/api/claims')
+        etag = first.headers['ETag']
+        repeat = self.client.get('/api/claims', headers={'If-None-Match': etag})
+        self.create_claim()
+        changed = self.client.get('/api/claims', headers={'If-None-Match': etag})
+
+        self.assertEqual(first.headers['Cache-Control'], 'no-cache')
+        self.assertEqual(repeat.status_code, 304)
+        self.assertEqual(repeat.data, b'')
+        self.assertEqual(repeat.headers['ETag'], etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed.headers['ETag'], etag)
+        self.assertEqual(len(changed.get_json()['claims']), 2)
+
+    def test_full_last_page_changes_when_a_claim_follows(self):
+        """Test that a full last page stops matching its ETag once a newer claim gives it a cursor."""
+        ids = [self.create_claim()['id'] for _ in range(2)]
+
+        first = self.client.get('/api/claims?limit=2')
+        self.create_claim()
+        after = self.client.get('/api/claims?limit=2', headers={'If-None-Match': first.headers['ETag']})
+
+        self.assertIsNone(first.get_json()['next_cursor'])
+        self.assertEqual(after.status_code, 200)
+        self.assertEqual([claim['id'] for claim in after.get_json()['claims']], ids)
+        self.assertEqual(after.get_json()['next_cursor'], ids[-1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+from services.claim_store import ClaimStore
+
+class TestClaimStore(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'claims.sqlite')
+        self.claim_store = ClaimStore(self.path)
+        self.test_claim = {
+            "claim_text": "My car was hit while parked",
+            "incident_date": "2024-03-01",
+            "policy_number": "POL-123456"
+        }
+
+    def tearDown(self):
+        self.claim_store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_create_claim_assigns_id(self):
+        """Test that created claims get increasing ids."""
+        claim1 = self.claim_store.create_claim(self.test_claim)
+        claim2 = self.claim_store.create_claim(self.test_claim)
+
+        self.assertEqual(claim1["id"], 1)
+        self.assertEqual(claim2["id"], 2)
+        self.assertIn("created_at", claim1)
+        self.assertEqual(claim1["claim_text"], self.test_claim["claim_text"])
+
+    def test_get_claim_exists(self):
+        """Test getting claim by ID when it exists."""
+        created = self.claim_store.create_claim(self.test_claim, user_id=7)
+
+        claim = self.claim_store.get_claim(created["id"])
+        self.assertEqual(claim, created)
+
+    def test_get_claim_not_exists(self):
+        """Test getting claim by ID when it doesn't exist."""
+        self.assertIsNone(self.claim_store.get_claim(999))
+
+    def test_lookup_by_policy_number_and_user(self):
+        """Test the secondary lookups."""
+        self.claim_store.create_claim(self.test_claim, user_id=1)
+        self.claim_store.create_claim(self.test_claim, policy_number="POL-999999", user_id=2)
+
+        by_policy = self.claim_store.get_claims_by_policy_number("POL-123456")
+        by_user = self.claim_store.get_claims_by_user(2)
+
+        self.assertEqual([c["id"] for c in by_policy], [1])
+        self.assertEqual([c["id"] for c in by_user], [2])
+
+    def test_count_claims_in_window(self):
+        """Test counting a policy's claims within a creation window."""
+        self.claim_store.create_claim(self.test_claim)
+        second = self.claim_store.create_claim(self.test_claim)
+        self.claim_store.create_claim(self.test_claim, policy_number="POL-999999")
+
+        self.assertEqual(self.claim_store.count_claims("POL-123456"), 2)
+        self.assertEqual(
+            self.claim_store.count_claims("POL-123456", created_before=second["created_at"]), 1
+        )
+        self.assertEqual(
+            self.claim_store.count_claims("POL-123456", created_from=second["created_at"]), 1
+        )
+
+    def test_claims_persist_across_instances(self):
+        """Test that another store on the same file sees the claims."""
+        created = self.claim_store.create_claim(self.test_claim)
+
+        other = ClaimStore(self.path)
+        self.assertEqual(other.get_claim(created["id"]), created)
+        other.close()
+
+    def test_uses_wal_and_indexes(self):
+        """Test that the database runs in WAL mode with the lookup indexes."""
+        self.claim_store.create_claim(self.test_claim)
+        conn = self.claim_store._connect()
+
+        mode = conn.execute('PRAGMA journal_mode').fetchone()[0]
+        indexes = {row[1] for row in conn.execute('PRAGMA index_list(claims)')}
+
+        self.assertEqual(mode, 'wal')
+        self.assertTrue({'idx_claims_policy_number', 'idx_claims_user_id', 'idx_claims_created_at'} <= indexes)
+
+    def test_concurrent_creates_get_unique_ids(self):
+        """Test that concurrent writers never collide on ids."""
+        ids = []
+
+        def create_many():
+            for _ in range(20):
+                ids.append(self.claim_store.create_claim(self.test_claim)["id"])
+
+        threads = [threading.Thread(target=create_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(ids)), 80)
+        self.assertEqual(len(self.claim_store.list_claims()), 80)
+
+    def test_list_claims_page_cursor(self):
+        """Test walking the claims with a cursor."""
+        for _ in range(5):
+            self.claim_store.create_claim(self.test_claim)
+
+        first = self.claim_store.list_claims_page(limit=2)
+        second = self.claim_store.list_claims_page(after=first.next_cursor, limit=2)
+        last = self.claim_store.list_claims_page(after=second.next_cursor, limit=2)
+
+        self.assertEqual([c["id"] for c in first.claims], [1, 2])
+        self.assertEqual([c["id"] for c in second.claims], [3, 4])
+        self.assertEqual([c["id"] for c in last.claims], [5])
+        self.assertIsNone(last.next_cursor)
+
+    def test_list_claims_page_filters(self):
+        """Test filtering by policy number, creation time and risk score."""
+        self.claim_store.create_claim(dict(self.test_claim, created_at="2024-01-01T10:00:00", risk_score=1))
+        self.claim_store.create_claim(dict(self.test_claim, created_at="2024-02-01T10:00:00", risk_score=4))
+        self.claim_store.create_claim(dict(self.test_claim, policy_number="POL-999999"))
+
+        by_policy = self.claim_store.list_claims_page(policy_number="POL-999999")
+        by_date = self.claim_store.list_claims_page(created_from="2024-01-15", created_before="2024-03-01")
+        by_risk = self.claim_store.list_claims_page(min_risk=3)
+
+        self.assertEqual([c["id"] for c in by_policy.claims], [3])
+        self.assertEqual([c["id"] for c in by_date.claims], [2])
+        self.assertEqual([c["id"] for c in by_risk.claims], [2])
+
+    def test_set_risk_score(self):
+        """Test that a new risk score is filterable and visible on the claim."""
+        created = self.claim_store.create_claim(self.test_claim)
+
+        self.assertTrue(self.claim_store.set_risk_score(created["id"], 5))
+        self.assertFalse(self.claim_store.set_risk_score(999, 5))
+
+        page = self.claim_store.list_claims_page(min_risk=5)
+        self.assertEqual(page.claims[0]["risk_score"], 5)
+
+    def test_page_etag_tracks_changes(self):
+        """Test that the ETag is stable until a claim on the page changes."""
+        created = self.claim_store.create_claim(self.test_claim)
+
+        etag1 = self.claim_store.list_claims_page().etag
+        etag2 = self.claim_store.list_claims_page().etag
+        self.claim_store.set_risk_score(created["id"], 2)
+        etag3 = self.claim_store.list_claims_page().etag
+        other_query = self.claim_store.list_claims_page(limit=10).etag
+
+        self.assertEqual(etag1, etag2)
+        self.assertNotEqual(etag2, etag3)
+        self.assertNotEqual(etag3, other_query)
+
+    def test_update_claim_bumps_version(self):
+        """Test that changing a claim moves it to a new version."""
+        created = self.claim_store.create_claim(self.test_claim)
+
+        updated = self.claim_store.update_claim(created["id"], {"claim_text": "Also the mirror broke"})
+
+        self.assertEqual(created["version"], 1)
+        self.assertEqual(updated["version"], 2)
+        self.assertEqual(self.claim_store.get_claim(created["id"]), updated)
+        self.assertIsNone(self.claim_store.update_claim(999, {"claim_text": "x"}))
+
+    def test_update_claim_keeps_policy_number(self):
+        """Test that an update keeps the policy number a claim was filed under."""
+        created = self.claim_store.create_claim({"claim_text": "Phone stolen"}, policy_number="POL-9")
+
+        self.claim_store.update_claim(created["id"], {"claim_text": "Phone and laptop stolen"})
+
+        self.assertEqual([claim["id"] for claim in self.claim_store.get_claims_by_policy_number("POL-9")],
+                         [created["id"]])
+
+    def test_assessment_is_stored_per_version(self):
+        """Test that a stored assessment only matches its claim version."""
+        created = self.claim_store.create_claim(self.test_claim)
+        self.claim_store.save_assessment(created["id"], 1, {"risk_score": 2})
+
+        stored = self.claim_store.get_assessment(created["id"], 1)
+        self.assertEqual(stored["assessment"], {"risk_score": 2})
+        self.assertIsNone(self.claim_store.get_assessment(created["id"], 2))
+
+        self.claim_store.update_claim(created["id"], {"claim_text": "changed"})
+        self.claim_store.save_assessment(created["id"], 2, {"risk_score": 4})
+        self.assertIsNone(self.claim_store.get_assessment(created["id"], 1))
+        self.assertEqual(self.claim_store.get_assessment(created["id"], 2)["assessment"], {"risk_score": 4})
+
+    def test_risk_score_does_not_change_version(self):
+        """Test that recording a risk score keeps the stored assessment valid."""
+        created = self.claim_store.create_claim(self.test_claim)
+        self.claim_store.set_risk_score(created["id"], 3)
+
+        self.assertEqual(self.claim_store.get_claim(created["id"])["version"], 1)
@@ -0,0 +1,158 @@
+import unittest
+import asyncio
+from services.curacel_client import CuracelClient, AsyncCuracelClient
+from services.metrics import registry
+from fake_servers import FakeCuracelServer
+
+class TestCuracelClient(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.server = FakeCuracelServer().start()
+        self.client = CuracelClient(
+            base_url=self.server.url, api_key='test_key',
+            read_timeout=1.0, max_retries=2, backoff_factor=0
+        )
+        self.test_claim = {"claim_text": "Windscreen cracked", "policy_number": "POL-123456"}
+
+    def tearDown(self):
+        self.client.close()
+        self.server.stop()
+
+    def test_submit_claim_success(self):
+        """Test a successful submission."""
+        body, status = self.client.submit_claim(self.test_claim)
+
+        self.assertEqual(status, 201)
+        self.assertEqual(body['data']['claim'], self.test_claim)
+        request = self.server.requests[0]
+        self.assertEqual(request['path'], '/claims')
+        self.assertEqual(request['headers']['Authorization'], 'Bearer test_key')
+
+    def test_connections_are_reused(self):
+        """Test that consecutive submissions share one keep-alive connection."""
+        for _ in range(5):
+            self.client.submit_claim(self.test_claim)
+
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(self.server.connections, 1)
+
+    def test_retries_server_errors(self):
+        """Test that 5xx responses are retried until one succeeds."""
+        self.server.fail_next(2, status=503)
+
+        body, status = self.client.submit_claim(self.test_claim)
+
+        self.assertEqual(status, 201)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_gives_up_after_max_retries(self):
+        """Test that persistent failures are reported, not raised."""
+        self.server.fail_next(5, status=502)
+
+        body, status = self.client.submit_claim(self.test_claim)
+
+        self.assertEqual(status, 502)
+        self.assertIn('error', body)
+        self.assertEqual(len(self.server.requests), 3)
+
+    def test_client_errors_are_not_retried(self):
+        """Test that 4xx responses are returned immediately."""
+        self.server.fail_next(1, status=422)
+
+        body, status = self.client.submit_claim(self.test_claim)
+
+        self.assertEqual(status, 422)
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_records_latency_and_errors(self):
+        """Test that submissions are timed and failures counted by outcome."""
+        def sample(name, outcome):
+            return registry.get_sample_value(name, {'client': 'sync', 'outcome': outcome}) or 0
+
+        successes = sample('insuralq_curacel_request_seconds_count', 'success')
+        rejected = sample('insuralq_curacel_errors_total', '4xx')
+        self.client.submit_claim(self.test_claim)
+        self.server.fail_next(1, status=422)
+        self.client.submit_claim(self.test_claim)
+
+        self.assertEqual(sample('insuralq_curacel_request_seconds_count', 'success'), successes + 1)
+        self.assertEqual(sample('insuralq_curacel_errors_total', '4xx'), rejected + 1)
+
+    def test_stalled_server_times_out(self):
+        """Test that a stalled endpoint can't hang the caller."""
+        self.server.latency = 0.5
+        client = CuracelClient(base_url=self.server.url, read_timeout=0.1, max_retries=0)
+
+        body, status = client.submit_claim(self.test_claim)
+        client.close()
+
+        self.assertEqual(status, 504)
+
+    def test_idempotency_key_header(self):
+        """Test that the idempotency key is forwarded."""
+        self.client.submit_claim(self.test_claim, idempotency_key='claim-1')
+        self.client.submit_claim(self.test_claim, idempotency_key='claim-1')
+
+        self.assertEqual(self.server.requests[0]['headers']['Idempotency-Key'], 'claim-1')
+        self.assertEqual(self.server.claims_created, 1)
+
+
+    def test_retries_share_a_generated_idempotency_key(self):
+        """Test that a submission without a key gets one, sent unchanged on every retry."""
+        self.server.fail_next(1, status=503)
+
+        self.client.submit_claim(self.test_claim)
+
+        keys = [request['headers'].get('Idempotency-Key') for request in self.server.requests]
+        self.assertEqual(len(keys), 2)
+        self.assertIsNotNone(keys[0])
+        self.assertEqual(keys[0], keys[1])
+
+
+class TestAsyncCuracelClient(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.server = FakeCuracelServer().start()
+        self.test_claim = {"claim_text": "Windscreen cracked"}
+
+    def tearDown(self):
+        self.server.stop()
+
+    def submit(self, client, count=1):
+        async def go():
+            try:
+                return [await client.submit_claim(self.test_claim) for _ in range(count)]
+            finally:
+                await client.aclose()
+        return asyncio.run(go())
+
+    def test_submit_and_retry(self):
+        """Test that the async client retries 5xx responses."""
+        self.server.fail_next(1, status=500)
+        client = AsyncCuracelClient(base_url=self.server.url, max_retries=2, backoff_factor=0)
+
+        [(body, status)] = self.submit(client)
+
+        self.assertEqual(status, 201)
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertIsNotNone(self.server.requests[0]['headers'].get('Idempotency-Key'))
+        self.assertEqual(self.server.requests[0]['headers']['Idempotency-Key'],
+                         self.server.requests[1]['headers']['Idempotency-Key'])
+
+    def test_connections_are_reused(self):
+        """Test that the async client keeps its connection alive."""
+        client = AsyncCuracelClient(base_url=self.server.url, backoff_factor=0)
+
+        results = self.submit(client, count=3)
+
+        self.assertEqual([status for _, status in results], [201, 201, 201])
+        self.assertEqual(self.server.connections, 1)
+
+    def test_stalled_server_times_out(self):
+        """Test that the async client gives up on a stalled endpoint."""
+        self.server.latency = 0.5
+        client = AsyncCuracelClient(base_url=self.server.url, read_timeout=0.1, max_retries=0)
+
+        [(body, status)] = self.submit(client)
+
+        self.assertEqual(status, 504)
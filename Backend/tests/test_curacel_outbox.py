@@ -0,0 +1,182 @@
+import unittest
+import os
+import shutil
+import tempfile
+import time
+from services.curacel_client import CuracelClient
+from services.curacel_outbox import CuracelOutbox, OutboxDispatcher, PENDING, IN_FLIGHT, DELIVERED, DEAD
+from services.claim_store import ClaimStore
+from fake_servers import FakeCuracelServer
+
+class TestCuracelOutbox(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.tmpdir, 'claims.sqlite')
+        self.outbox = CuracelOutbox(self.db_path, max_attempts=3, base_delay=0)
+        self.server = FakeCuracelServer().start()
+        self.client = CuracelClient(base_url=self.server.url, max_retries=0, read_timeout=1.0)
+        self.dispatcher = OutboxDispatcher(self.outbox, self.client, batch_size=10)
+        self.test_claim = {"id": 1, "claim_text": "Phone stolen"}
+
+    def tearDown(self):
+        self.dispatcher.stop()
+        self.client.close()
+        self.server.stop()
+        shutil.rmtree(self.tmpdir)
+
+    def test_enqueue_creates_pending_entry(self):
+        """Test that enqueued claims wait in the outbox."""
+        entry = self.outbox.enqueue(1, self.test_claim)
+
+        self.assertEqual(entry['status'], PENDING)
+        self.assertEqual(self.outbox.get_entry(entry['id'])['payload'], self.test_claim)
+        self.assertEqual(self.outbox.stats()[PENDING], 1)
+
+    def test_dispatch_delivers_batch_with_idempotency_keys(self):
+        """Test that a dispatch pass delivers every due entry."""
+        entries = [self.outbox.enqueue(i, dict(self.test_claim, id=i)) for i in range(3)]
+
+        self.assertEqual(self.dispatcher.dispatch_once(), 3)
+
+        self.assertEqual(self.outbox.stats()[DELIVERED], 3)
+        keys = {request['headers']['Idempotency-Key'] for request in self.server.requests}
+        self.assertEqual(keys, {entry['idempotency_key'] for entry in entries})
+        self.assertIsNotNone(self.outbox.get_entry(entries[0]['id'])['response'])
+
+    def test_failed_delivery_is_retried(self):
+        """Test that a 5xx puts the entry back for a later attempt."""
+        entry = self.outbox.enqueue(1, self.test_claim)
+        self.server.fail_next(1, status=503)
+
+        self.dispatcher.dispatch_once()
+        self.assertEqual(self.outbox.get_entry(entry['id'])['status'], PENDING)
+
+        self.dispatcher.dispatch_once()
+        delivered = self.outbox.get_entry(entry['id'])
+        self.assertEqual(delivered['status'], DELIVERED)
+        self.assertEqual(delivered['attempts'], 2)
+
+    def test_dead_letter_after_max_attempts(self):
+        """Test that repeated failures end in the dead-letter state."""
+        entry = self.outbox.enqueue(1, self.test_claim)
+        self.server.fail_next(3, status=500)
+
+        for _ in range(3):
+            self.dispatcher.dispatch_once()
+
+        dead = self.outbox.get_entry(entry['id'])
+        self.assertEqual(dead['status'], DEAD)
+        self.assertIn('500', dead['last_error'])
+        self.assertTrue(self.outbox.requeue(entry['id']))
+        self.dispatcher.dispatch_once()
+        self.assertEqual(self.outbox.get_entry(entry['id'])['status'], DELIVERED)
+
+    def test_delivery_exceptions_are_logged_and_retried(self):
+        """Test that a client that raises is logged and the entry put back for a later attempt."""
+        def broken(payload, idempotency_key=None):
+            raise ConnectionError("connection reset")
+
+        entry = self.outbox.enqueue(1, self.test_claim)
+        self.client.submit_claim = broken
+        with self.assertLogs('services.curacel_outbox', 'ERROR') as logs:
+            self.dispatcher.dispatch_once()
+
+        self.assertIn('connection reset', logs.output[0])
+        failed = self.outbox.get_entry(entry['id'])
+        self.assertEqual(failed['status'], PENDING)
+        self.assertEqual(failed['attempts'], 1)
+
+    def test_client_errors_are_dead_lettered_immediately(self):
+        """Test that a rejected claim isn't retried."""
+        entry = self.outbox.enqueue(1, self.test_claim)
+        self.server.fail_next(1, status=422)
+
+        self.dispatcher.dispatch_once()
+
+        self.assertEqual(self.outbox.get_entry(entry['id'])['status'], DEAD)
+
+    def test_leased_entries_are_not_handed_out_twice(self):
+        """Test that a leased entry isn't due until its lease expires."""
+        self.outbox.enqueue(1, self.test_claim)
+
+        self.assertEqual(len(self.outbox.lease_batch(10)), 1)
+        self.assertEqual(self.outbox.lease_batch(10), [])
+
+    def test_expired_lease_holder_cannot_record_outcome(self):
+        """Test that once a lease is taken over, only the new holder can mark the entry."""
+        entry = self.outbox.enqueue(1, self.test_claim)
+        stale, = self.outbox.lease_batch(10, lease=0)
+        current, = self.outbox.lease_batch(10)
+
+        self.assertNotEqual(stale['lease_token'], current['lease_token'])
+        self.assertFalse(self.outbox.mark_delivered(entry['id'], stale['lease_token'], {'ok': True}))
+        self.assertIsNone(self.outbox.mark_failed(entry['id'], stale['lease_token'], 'timed out'))
+        self.assertEqual(self.outbox.get_entry(entry['id'])['status'], IN_FLIGHT)
+        self.assertEqual(self.outbox.get_entry(entry['id'])['attempts'], 1)
+
+        self.assertTrue(self.outbox.mark_delivered(entry['id'], current['lease_token'], {'ok': True}))
+        self.assertEqual(self.outbox.get_entry(entry['id'])['status'], DELIVERED)
+
+    def test_expired_leases_count_as_attempts(self):
+        """Test that an entry whose leases keep expiring is dead-lettered after max attempts."""
+        entry = self.outbox.enqueue(1, self.test_claim)
+
+        self.assertEqual(self.outbox.lease_batch(10, lease=0)[0]['attempts'], 0)
+        self.assertEqual(self.outbox.lease_batch(10, lease=0)[0]['attempts'], 1)
+        self.assertEqual(self.outbox.lease_batch(10, lease=0)[0]['attempts'], 2)
+        self.assertEqual(self.outbox.lease_batch(10, lease=0), [])
+
+        dead = self.outbox.get_entry(entry['id'])
+        self.assertEqual(dead['status'], DEAD)
+        self.assertEqual(dead['attempts'], 3)
+        self.assertIn('Lease expired', dead['last_error'])
+        self.assertEqual(self.outbox.lease_batch(10), [])
+
+    def test_lease_covers_the_slowest_batch(self):
+        """Test that the dispatcher leases a batch for every round of worst-case client calls."""
+        client = CuracelClient(base_url=self.server.url, connect_timeout=3.05, read_timeout=30.0,
+                               max_retries=3, backoff_factor=0.5)
+        self.assertAlmostEqual(client.max_call_seconds(), 4 * 33.05 + 3.5)
+
+        dispatcher = OutboxDispatcher(self.outbox, client, batch_size=10, concurrency=4, lease_margin=30)
+        self.assertAlmostEqual(dispatcher.lease, 3 * client.max_call_seconds() + 30)
+
+        entry = self.outbox.enqueue(1, self.test_claim)
+        started = time.time()
+        self.outbox.lease_batch(10, dispatcher.lease)
+        expires = self.outbox.get_entry(entry['id'])['next_attempt_at']
+        self.assertGreaterEqual(expires - started, dispatcher.lease - 1)
+
+    def test_enqueue_inside_claim_transaction(self):
+        """Test that the outbox row commits or rolls back with its claim."""
+        claim_store = ClaimStore(self.db_path)
+        self.outbox.db.connection()
+
+        claim = claim_store.create_claim(
+            {"claim_text": "Phone stolen"},
+            after_insert=lambda conn, c: self.outbox.enqueue(c['id'], c, conn=conn)
+        )
+        self.assertEqual(len(self.outbox.get_entries_for_claim(claim['id'])), 1)
+
+        def fail(conn, c):
+            self.outbox.enqueue(c['id'], c, conn=conn)
+            raise RuntimeError("crash before commit")
+
+        with self.assertRaises(RuntimeError):
+            claim_store.create_claim({"claim_text": "Laptop stolen"}, after_insert=fail)
+        self.assertEqual(self.outbox.stats()[PENDING], 1)
+        self.assertEqual(len(claim_store.list_claims()), 1)
+        claim_store.close()
+
+    def test_background_dispatcher(self):
+        """Test that the dispatcher thread drains the outbox on its own."""
+        self.outbox.enqueue(1, self.test_claim)
+
+        self.dispatcher.start()
+        self.dispatcher.wake()
+        deadline = time.time() + 5
+        while self.outbox.stats()[DELIVERED] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(self.outbox.stats()[DELIVERED], 1)
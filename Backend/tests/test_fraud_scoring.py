@@ -0,0 +1,97 @@
+import unittest
+from services.fraud_scoring import CATEGORIES, SIGNALS, FraudPreScorer
+
+class TestFraudPreScorer(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.scorer = FraudPreScorer(threshold=0.5, coverage_limit=10000)
+        self.clean_claim = {
+            "claim_text": (
+                "On 2024-03-03 my car was rear-ended at a junction on Main Street. The other "
+                "driver admitted fault and a witness gave a statement. I attached photos of the "
+                "bumper and the repair estimate of $1,234.56 from the garage."
+            ),
+            "incident_date": "2024-03-03",
+            "created_at": "2024-03-05T10:00:00",
+            "attached_files": ["bumper.jpg"],
+        }
+        self.suspicious_claim = {
+            "claim_text": (
+                "Honestly, I swear the laptop was stolen. I just renewed my policy and lost the "
+                "receipts. I need the money ASAP, $10,000 please."
+            ),
+            "incident_date": "2024-03-01",
+            "created_at": "2024-03-02T09:00:00",
+        }
+
+    def test_output_matches_agent_schema(self):
+        """Test that every category reports detected, confidence, evidence and explanation."""
+        result = self.scorer.score([self.suspicious_claim])[0]
+
+        self.assertEqual(tuple(result["indicators"]), CATEGORIES)
+        for indicator in result["indicators"].values():
+            self.assertEqual(set(indicator), {"detected", "confidence", "evidence", "explanation"})
+            self.assertTrue(0.0 <= indicator["confidence"] <= 1.0)
+
+    def test_clean_claim_is_not_escalated(self):
+        """Test that a detailed, documented claim stays below the threshold."""
+        result = self.scorer.score([self.clean_claim])[0]
+
+        self.assertFalse(result["escalate"])
+        self.assertFalse(any(i["detected"] for i in result["indicators"].values()))
+
+    def test_suspicious_claim_is_escalated(self):
+        """Test that several fraud indicators push a claim to the agent."""
+        result = self.scorer.score([self.suspicious_claim])[0]
+        indicators = result["indicators"]
+
+        self.assertTrue(result["escalate"])
+        self.assertTrue(indicators["supporting_evidence"]["detected"])
+        self.assertIn("lost the receipts", indicators["supporting_evidence"]["evidence"])
+        self.assertTrue(indicators["timing_patterns"]["detected"])
+        self.assertTrue(indicators["language_patterns"]["detected"])
+        self.assertTrue(indicators["claim_characteristics"]["detected"])
+        self.assertTrue(indicators["behavioral_flags"]["detected"])
+
+    def test_batch_scores_match_single_scores(self):
+        """Test that scoring a batch gives the same result as scoring claims one by one."""
+        batch = self.scorer.score([self.clean_claim, self.suspicious_claim], [0, 0])
+        singles = [self.scorer.score([claim])[0] for claim in (self.clean_claim, self.suspicious_claim)]
+
+        self.assertEqual(batch, singles)
+
+    def test_signals_matrix_shape(self):
+        """Test that signals come back as one row per claim."""
+        signals = self.scorer.signals([self.clean_claim, self.suspicious_claim, {}])
+
+        self.assertEqual(signals.shape, (3, len(SIGNALS)))
+        self.assertTrue(((signals >= 0) & (signals <= 1)).all())
+
+    def test_recent_claims_and_future_dates(self):
+        """Test the numeric timing and claim-history checks."""
+        claim = dict(self.clean_claim, incident_date="2024-04-01")
+        result = self.scorer.score([claim], recent_claims=[3])[0]
+
+        self.assertTrue(result["indicators"]["narrative_consistency"]["detected"])
+        self.assertTrue(result["indicators"]["claim_characteristics"]["detected"])
+        self.assertTrue(result["escalate"])
+
+    def test_threshold_is_configurable(self):
+        """Test that raising the threshold lets more claims skip the agent."""
+        lenient = FraudPreScorer(threshold=1.01, coverage_limit=10000)
+
+        self.assertFalse(lenient.score([self.suspicious_claim])[0]["escalate"])
+
+    def test_assessment_for_clean_claim(self):
+        """Test the assessment produced for claims that aren't escalated."""
+        claim = dict(self.clean_claim, policy_number=None)
+        result = self.scorer.score([claim])[0]
+        assessment = self.scorer.assessment(claim, result)
+
+        self.assertEqual(assessment["risk_score"], 1)
+        self.assertEqual(assessment["missing_info"], ["policy_number"])
+        self.assertFalse(assessment["escalated"])
+        self.assertEqual(assessment["fraud_indicators"], result["indicators"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,10 @@
 import unittest
 import json
 from flask import Flask
-from routes.auth import auth_bp, user_store
+from backend_package import load_backend
+
+load_backend()
+from backend.routes.auth import auth_bp, user_store
 
 class TestAuthIntegration(unittest.TestCase):
     """Integration tests for the complete authentication flow."""
@@ -0,0 +1,104 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from services.job_queue import JobQueue, QueueFullError, SUCCEEDED, FAILED
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'claims.sqlite')
+        self.queue = JobQueue(self.db_path, max_workers=2, max_pending=2, retention=10)
+
+    def tearDown(self):
+        self.queue.shutdown()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def wait_for(self, job, timeout=5):
+        deadline = time.time() + timeout
+        while not job.finished and time.time() < deadline:
+            time.sleep(0.01)
+        return job
+
+    def test_job_succeeds_with_result(self):
+        """Test that a finished job reports its result."""
+        def work(job, value):
+            job.update(stage='working')
+            return value * 2
+
+        job = self.wait_for(self.queue.submit('double', work, 21))
+        data = job.to_dict()
+
+        self.assertEqual(data['status'], SUCCEEDED)
+        self.assertEqual(data['result'], 42)
+        self.assertEqual(data['stage'], 'done')
+        self.assertEqual(self.queue.get(job.id).to_dict(), data)
+
+    def test_job_failure_is_recorded(self):
+        """Test that exceptions mark the job as failed."""
+        def work(job):
+            raise RuntimeError("agent unavailable")
+
+        job = self.wait_for(self.queue.submit('boom', work))
+
+        self.assertEqual(job.status, FAILED)
+        self.assertIn("agent unavailable", job.error)
+
+    def test_queue_is_bounded(self):
+        """Test that submissions beyond max_pending are rejected."""
+        release = threading.Event()
+
+        def work(job):
+            release.wait(5)
+
+        jobs = [self.queue.submit('wait', work) for _ in range(2)]
+        with self.assertRaises(QueueFullError):
+            self.queue.submit('wait', work)
+
+        release.set()
+        for job in jobs:
+            self.wait_for(job)
+        self.assertIsNotNone(self.queue.submit('wait', work))
+
+    def test_unknown_job(self):
+        """Test getting a job that doesn't exist."""
+        self.assertIsNone(self.queue.get('missing'))
+
+    def test_status_is_shared_between_processes(self):
+        """Test that a queue on the same database reports a job another queue ran."""
+        other = JobQueue(self.db_path)
+        release = threading.Event()
+
+        def work(job):
+            job.update(stage='structuring')
+            release.wait(5)
+            return {'claim': {'id': 1}}
+
+        job = self.queue.submit('submit_claim', work)
+        while other.get(job.id).stage != 'structuring':
+            time.sleep(0.01)
+        release.set()
+        self.wait_for(job)
+
+        self.assertEqual(other.get(job.id).status, SUCCEEDED)
+        self.assertEqual(other.get(job.id).result, {'claim': {'id': 1}})
+
+    def test_unstorable_result_fails_the_job(self):
+        """Test that a result that can't be stored marks the job failed instead of leaving it running."""
+        job = self.wait_for(self.queue.submit('odd', lambda job: object()))
+
+        self.assertEqual(self.queue.get(job.id).status, FAILED)
+
+    def test_old_finished_jobs_are_evicted(self):
+        """Test that finished jobs beyond the retention limit are dropped."""
+        self.queue.retention = 2
+        jobs = [self.wait_for(self.queue.submit('quick', lambda job: None)) for _ in range(4)]
+
+        self.assertIsNone(self.queue.get(jobs[0].id))
+        self.assertIsNotNone(self.queue.get(jobs[-1].id))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import threading
+import time
+from services.maintenance import PeriodicTask
+
+class TestPeriodicTask(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.calls = 0
+        self.ran_twice = threading.Event()
+
+    def count(self):
+        self.calls += 1
+        if self.calls >= 2:
+            self.ran_twice.set()
+
+    def test_runs_on_schedule(self):
+        """Test that the task keeps calling its function every interval."""
+        task = PeriodicTask('test-task', self.count, interval=0.01)
+        task.start()
+        task.start()
+
+        self.assertTrue(self.ran_twice.wait(1))
+        task.stop()
+        calls = self.calls
+        time.sleep(0.05)
+        self.assertEqual(self.calls, calls)
+
+    def test_errors_do_not_stop_the_schedule(self):
+        """Test that a call that raises is skipped and the next one still runs."""
+        def flaky():
+            self.count()
+            raise RuntimeError("disk full")
+
+        task = PeriodicTask('test-task', flaky, interval=0.01)
+        task.start()
+
+        self.assertTrue(self.ran_twice.wait(1))
+        task.stop()
+
+    def test_errors_are_logged(self):
+        """Test that a call that raises is logged with its traceback."""
+        def broken():
+            raise RuntimeError("disk full")
+
+        task = PeriodicTask('test-task', broken, interval=0.01)
+        with self.assertLogs('services.maintenance', 'ERROR') as logs:
+            self.assertIsNone(task.run_once())
+
+        self.assertIn('test-task', logs.output[0])
+        self.assertIn('RuntimeError: disk full', logs.output[0])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import unittest
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from prometheus_client import CollectorRegistry
+from services.metrics import CacheCollector, render
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.stats = {'hits': 3, 'misses': 1, 'size': 2}
+        self.collector = CacheCollector()
+        self.registry = CollectorRegistry()
+        self.registry.register(self.collector)
+        self.collector.register('results', lambda: self.stats)
+
+    def test_cache_stats_are_read_at_scrape_time(self):
+        """Test that cache counters reflect the cache's current stats."""
+        self.assertEqual(self.registry.get_sample_value('insuralq_cache_hits_total', {'cache': 'results'}), 3)
+        self.assertEqual(self.registry.get_sample_value('insuralq_cache_hit_ratio', {'cache': 'results'}), 0.75)
+
+        self.stats = {'hits': 4, 'misses': 4, 'size': 5}
+
+        self.assertEqual(self.registry.get_sample_value('insuralq_cache_misses_total', {'cache': 'results'}), 4)
+        self.assertEqual(self.registry.get_sample_value('insuralq_cache_hit_ratio', {'cache': 'results'}), 0.5)
+        self.assertEqual(self.registry.get_sample_value('insuralq_cache_entries', {'cache': 'results'}), 5)
+
+    def test_empty_cache_has_zero_ratio(self):
+        """Test that a cache without lookups reports a ratio of zero."""
+        self.stats = {'hits': 0, 'misses': 0, 'size': 0}
+
+        self.assertEqual(self.registry.get_sample_value('insuralq_cache_hit_ratio', {'cache': 'results'}), 0.0)
+
+    def test_render_prometheus_text(self):
+        """Test that the registry renders in the Prometheus text format."""
+        body, content_type = render()
+
+        self.assertTrue(content_type.startswith('text/plain'))
+        self.assertIn(b'# TYPE insuralq_agent_run_seconds histogram', body)
+        self.assertIn(b'# TYPE insuralq_curacel_request_seconds histogram', body)
+
+    def test_multiprocess_render_sums_workers(self):
+        """Test that with PROMETHEUS_MULTIPROC_DIR set, every worker's samples are rendered together."""
+        multiproc_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, multiproc_dir)
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {**os.environ, 'PROMETHEUS_MULTIPROC_DIR': multiproc_dir, 'PYTHONPATH': backend_dir}
+
+        def python(code):
+            return subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, check=True).stdout
+
+        for _ in range(2):
+            python("from services.metrics import moderation_errors; moderation_errors.inc()")
+        body = python("import sys; from services.metrics import render; sys.stdout.buffer.write(render()[0])")
+
+        self.assertIn(b'insuralq_moderation_errors_total 2.0', body)
+
+if __name__ == '__main__':
+    unittest.main()
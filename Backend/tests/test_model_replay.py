@@ -0,0 +1,172 @@
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import tempfile
+from types import SimpleNamespace
+from agents import Agent, Model, ModelProvider, ModelResponse, RunConfig, Runner, Usage, set_tracing_disabled
+from openai.types.responses import Response, ResponseCompletedEvent, ResponseOutputMessage, ResponseOutputText
+from openai.types.responses.response_usage import InputTokensDetails, OutputTokensDetails, ResponseUsage
+from services.model_replay import CassetteMiss, RecordReplayProvider, RECORD, REPLAY
+from services.moderation import ModerationService
+
+set_tracing_disabled(True)
+
+
+class EchoModel(Model):
+    """Answers with the prompt it was given, counting calls"""
+
+    def __init__(self, provider):
+        self.provider = provider
+
+    def _echo(self, input):
+        self.provider.calls += 1
+        text = input[-1]['content'] if isinstance(input, list) else input
+        return ResponseOutputMessage(
+            id='msg_1', type='message', role='assistant', status='completed',
+            content=[ResponseOutputText(type='output_text', text=f'echo: {text}', annotations=[])]
+        )
+
+    async def get_response(self, system_instructions, input, model_settings, tools, output_schema,
+                           handoffs, tracing, **kwargs):
+        usage = Usage(requests=1, input_tokens=7, output_tokens=3, total_tokens=10)
+        return ModelResponse(output=[self._echo(input)], usage=usage, response_id='resp_1')
+
+    async def stream_response(self, system_instructions, input, model_settings, tools, output_schema,
+                              handoffs, tracing, **kwargs):
+        """The whole echo as a single completed event"""
+        response = Response.model_construct(
+            id='resp_1', object='response', created_at=0, model='echo', output=[self._echo(input)],
+            parallel_tool_calls=False, tool_choice='auto', tools=[], status='completed',
+            usage=ResponseUsage(
+                input_tokens=7, output_tokens=3, total_tokens=10,
+                input_tokens_details=InputTokensDetails(cached_tokens=0),
+                output_tokens_details=OutputTokensDetails(reasoning_tokens=0),
+            ),
+        )
+        yield ResponseCompletedEvent.model_construct(type='response.completed', response=response, sequence_number=0)
+
+
+class EchoProvider(ModelProvider):
+    def __init__(self):
+        self.calls = 0
+
+    def get_model(self, model_name):
+        return EchoModel(self)
+
+
+class TestRecordReplayProvider(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.cassette = os.path.join(self.tmpdir, 'cassette.json')
+        self.agent = Agent(name='Echo Agent', instructions='Repeat the claim')
+        self.inner = EchoProvider()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def run_agent(self, provider, text):
+        return asyncio.run(Runner.run(self.agent, text, run_config=RunConfig(model_provider=provider)))
+
+    def test_record_then_replay_without_the_model(self):
+        """Test that replay serves recorded responses and never calls the model."""
+        recorded = self.run_agent(RecordReplayProvider(self.cassette, RECORD, inner=self.inner), 'claim 1')
+        replay = RecordReplayProvider(self.cassette, REPLAY, inner=self.inner)
+        replayed = self.run_agent(replay, 'claim 1')
+
+        self.assertEqual(self.inner.calls, 1)
+        self.assertEqual(replayed.final_output, recorded.final_output)
+        self.assertEqual(replayed.final_output, 'echo: claim 1')
+        self.assertEqual(replayed.context_wrapper.usage.total_tokens, 10)
+        with open(self.cassette) as f:
+            self.assertEqual(len(json.load(f)['interactions']), 1)
+
+    def test_replay_of_unrecorded_prompt(self):
+        """Test that replaying a prompt that was never recorded raises CassetteMiss."""
+        self.run_agent(RecordReplayProvider(self.cassette, RECORD, inner=self.inner), 'claim 1')
+
+        with self.assertRaises(CassetteMiss):
+            self.run_agent(RecordReplayProvider(self.cassette, REPLAY), 'claim 2')
+
+    def test_replay_streams_recorded_text(self):
+        """Test that streamed replay emits the recorded text and final output."""
+        self.run_agent(RecordReplayProvider(self.cassette, RECORD, inner=self.inner), 'claim 1')
+        replay = RecordReplayProvider(self.cassette, REPLAY, latency=0.01)
+
+        async def stream():
+            result = Runner.run_streamed(self.agent, 'claim 1', run_config=RunConfig(model_provider=replay))
+            deltas = [event.data.delta async for event in result.stream_events()
+                      if getattr(getattr(event, 'data', None), 'type', None) == 'response.output_text.delta']
+            return deltas, result.final_output
+
+        deltas, final_output = asyncio.run(stream())
+
+        self.assertEqual(''.join(deltas), 'echo: claim 1')
+        self.assertEqual(final_output, 'echo: claim 1')
+
+    def test_streamed_runs_are_recorded(self):
+        """Test that a streamed run is recorded and can be replayed without the model."""
+        recorder = RecordReplayProvider(self.cassette, RECORD, inner=self.inner)
+
+        async def stream():
+            result = Runner.run_streamed(self.agent, 'claim 1', run_config=RunConfig(model_provider=recorder))
+            async for _ in result.stream_events():
+                pass
+            return result.final_output
+
+        recorded = asyncio.run(stream())
+        replayed = self.run_agent(RecordReplayProvider(self.cassette, REPLAY), 'claim 1')
+
+        self.assertEqual(recorded, 'echo: claim 1')
+        self.assertEqual(replayed.final_output, recorded)
+        self.assertEqual(self.inner.calls, 1)
+
+    def moderate(self, provider, *texts):
+        """Check texts through a moderation service backed by the provider's cassette"""
+        calls = []
+
+        async def create(model, input):
+            calls.append(list(input))
+            return SimpleNamespace(results=[SimpleNamespace(flagged='stolen' in text) for text in input])
+
+        client = SimpleNamespace(moderations=SimpleNamespace(create=create))
+        service = ModerationService(client_factory=lambda: provider.moderation_client(lambda: client))
+
+        async def go():
+            return await asyncio.gather(*(service.is_flagged(text) for text in texts))
+        return asyncio.run(go()), calls
+
+    def test_moderation_is_recorded_and_replayed(self):
+        """Test that replayed moderation serves recorded verdicts without building a client."""
+        recorded, calls = self.moderate(RecordReplayProvider(self.cassette, RECORD), 'fine', 'stolen car')
+        replay = RecordReplayProvider(self.cassette, REPLAY)
+        service = ModerationService(client_factory=lambda: replay.moderation_client(self.fail))
+
+        async def go():
+            return await asyncio.gather(service.is_flagged('stolen car'), service.is_flagged('fine'))
+        replayed = asyncio.run(go())
+
+        self.assertEqual(recorded, [False, True])
+        self.assertEqual(calls, [['fine', 'stolen car']])
+        self.assertEqual(replayed, [True, False])
+
+    def test_replay_of_unrecorded_moderation(self):
+        """Test that replaying moderation of text never recorded raises CassetteMiss."""
+        self.moderate(RecordReplayProvider(self.cassette, RECORD), 'fine')
+
+        with self.assertRaises(CassetteMiss):
+            self.moderate(RecordReplayProvider(self.cassette, REPLAY), 'something else')
+
+    @staticmethod
+    def fail():
+        raise AssertionError('replay must not build an OpenAI client')
+
+    def test_invalid_mode(self):
+        """Test that an unknown mode is rejected."""
+        with self.assertRaises(ValueError):
+            RecordReplayProvider(self.cassette, 'rewind')
+
+if __name__ == '__main__':
+    unittest.main()
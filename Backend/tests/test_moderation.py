@@ -0,0 +1,100 @@
+import unittest
+import asyncio
+from types import SimpleNamespace
+from services.moderation import ModerationService
+
+class FakeModerations:
+    def __init__(self, flagged_words=("stolen",), fail=False):
+        self.calls = []
+        self.flagged_words = flagged_words
+        self.fail = fail
+        self.dropped = 0
+
+    async def create(self, model, input):
+        self.calls.append(list(input))
+        await asyncio.sleep(0)
+        if self.fail:
+            raise RuntimeError("moderation unavailable")
+        results = [
+            SimpleNamespace(flagged=any(word in text for word in self.flagged_words))
+            for text in input
+        ]
+        return SimpleNamespace(results=results[:len(results) - self.dropped])
+
+class TestModerationService(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.moderations = FakeModerations()
+        client = SimpleNamespace(moderations=self.moderations)
+        self.service = ModerationService(client_factory=lambda: client, window=0.01, max_batch=3)
+
+    def run_all(self, *texts):
+        async def go():
+            return await asyncio.gather(*(self.service.is_flagged(text) for text in texts))
+        return asyncio.run(go())
+
+    def test_concurrent_calls_share_one_request(self):
+        """Test that calls within the window are batched together."""
+        results = self.run_all("hello", "my stolen car")
+
+        self.assertEqual(results, [False, True])
+        self.assertEqual(self.moderations.calls, [["hello", "my stolen car"]])
+
+    def test_batches_are_capped(self):
+        """Test that a full batch is sent without waiting for the window."""
+        self.run_all("a", "b", "c", "d")
+
+        self.assertEqual([len(call) for call in self.moderations.calls], [3, 1])
+
+    def test_verdicts_are_cached(self):
+        """Test that repeated text doesn't cost another request."""
+        self.run_all("same text")
+        self.run_all("same text")
+
+        self.assertEqual(len(self.moderations.calls), 1)
+        self.assertEqual(self.service.stats()["hits"], 1)
+
+    def test_duplicate_text_in_one_batch_is_sent_once(self):
+        """Test that identical concurrent inputs share an in-flight check."""
+        results = self.run_all("dup", "dup", "dup")
+
+        self.assertEqual(results, [False, False, False])
+        self.assertEqual(self.moderations.calls, [["dup"]])
+
+    def test_sends_are_held_until_done(self):
+        """Test that the service keeps a reference to each batch's task while it runs."""
+        async def go():
+            check = asyncio.ensure_future(self.service.is_flagged("held"))
+            while not self.moderations.calls:
+                await asyncio.sleep(0)
+            in_flight = len(self.service._sends)
+            await check
+            return in_flight
+
+        self.assertEqual(asyncio.run(go()), 1)
+        self.assertEqual(self.service._sends, set())
+
+    def test_errors_reach_every_caller(self):
+        """Test that a failed batch fails each waiting call."""
+        self.moderations.fail = True
+
+        with self.assertRaises(RuntimeError):
+            self.run_all("x", "y")
+        self.assertEqual(self.service.stats()["size"], 0)
+
+    def test_short_response_fails_every_caller(self):
+        """Test that fewer results than inputs fails the whole batch instead of leaving callers waiting."""
+        self.moderations.dropped = 1
+
+        async def go():
+            return await asyncio.wait_for(
+                asyncio.gather(*(self.service.is_flagged(text) for text in ("a", "b", "c")),
+                               return_exceptions=True),
+                timeout=1
+            )
+        results = asyncio.run(go())
+
+        self.assertEqual(len(results), 3)
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+        self.assertEqual(self.service.stats()["size"], 0)
@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+from flask import Flask
+from services.password_hasher import (
+    PasswordHasher, PasswordHasherBusy, calibrate_rounds, cost_of, DEFAULT_ROUNDS, MIN_ROUNDS, MAX_ROUNDS
+)
+
+class TestPasswordHasher(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.hasher = PasswordHasher(rounds=4, workers=0, max_concurrency=1, wait=0)
+
+    def test_hash_uses_configured_rounds(self):
+        """Test that hashes carry the configured cost and verify."""
+        hashed = self.hasher.hash("secret123")
+
+        self.assertEqual(cost_of(hashed), 4)
+        self.assertTrue(self.hasher.verify("secret123", hashed))
+        self.assertFalse(self.hasher.verify("wrong", hashed))
+
+    def test_process_pool_hashes_and_verifies(self):
+        """Test that hashing works in worker processes."""
+        hasher = PasswordHasher(rounds=4, workers=1)
+        self.addCleanup(hasher.shutdown)
+
+        hashed = hasher.hash("secret123")
+        self.assertTrue(hasher.verify("secret123", hashed))
+        self.assertFalse(hasher.verify("wrong", hashed))
+
+    def test_needs_rehash_only_when_cost_is_lower(self):
+        """Test that only hashes below the current cost need rehashing."""
+        hashed = self.hasher.hash("secret123")
+        self.assertFalse(self.hasher.needs_rehash(hashed))
+
+        self.hasher.rounds = 5
+        self.assertTrue(self.hasher.needs_rehash(hashed))
+        self.hasher.rounds = 3
+        self.assertFalse(self.hasher.needs_rehash(hashed))
+        self.assertFalse(self.hasher.needs_rehash("not-a-bcrypt-hash"))
+
+    def test_busy_when_no_slot_frees_up(self):
+        """Test that callers past the concurrency cap are refused."""
+        self.hasher._slots.acquire()
+        try:
+            with self.assertRaises(PasswordHasherBusy):
+                self.hasher.hash("secret123")
+        finally:
+            self.hasher._slots.release()
+
+    def test_calibrate_rounds_stays_within_bounds(self):
+        """Test that calibration picks a cost between the bounds."""
+        self.assertEqual(MIN_ROUNDS, 12)
+        self.assertEqual(calibrate_rounds(1e-9), MIN_ROUNDS)
+        self.assertEqual(calibrate_rounds(1e9), MAX_ROUNDS)
+        self.assertLessEqual(calibrate_rounds(0.01, minimum=4), calibrate_rounds(0.5, minimum=4))
+
+    def test_init_app_prefers_configured_rounds(self):
+        """Test that BCRYPT_ROUNDS overrides calibration."""
+        app = Flask(__name__)
+        app.config['BCRYPT_ROUNDS'] = 6
+
+        self.hasher.init_app(app)
+
+        self.assertEqual(self.hasher.rounds, 6)
+        self.assertIs(app.extensions['password_hasher'], self.hasher)
+
+    def test_init_app_defaults_to_fixed_rounds(self):
+        """Test that without BCRYPT_ROUNDS every app uses the same default cost."""
+        app = Flask(__name__)
+
+        with mock.patch.dict('os.environ', {'BCRYPT_ROUNDS': ''}):
+            self.hasher.init_app(app)
+
+        self.assertEqual(self.hasher.rounds, DEFAULT_ROUNDS)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import time
+from services.token_cache import TokenCache
+
+class TestTokenCache(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.cache = TokenCache(maxsize=2)
+        self.payload = {"user_id": 1, "exp": time.time() + 60}
+
+    def test_get_returns_cached_payload(self):
+        """Test that a stored token is served with its payload."""
+        self.assertIsNone(self.cache.get("token-a"))
+        self.cache.set("token-a", self.payload)
+
+        self.assertEqual(self.cache.get("token-a"), self.payload)
+        stats = self.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_entries_expire_with_the_token(self):
+        """Test that entries are dropped once the token's exp has passed."""
+        self.cache.set("token-a", {"user_id": 1, "exp": time.time() + 0.05})
+        time.sleep(0.1)
+
+        self.assertIsNone(self.cache.get("token-a"))
+        self.assertEqual(self.cache.stats()["size"], 0)
+
+    def test_expired_tokens_are_not_stored(self):
+        """Test that an already expired token is never cached."""
+        self.cache.set("token-a", {"user_id": 1, "exp": time.time() - 1})
+
+        self.assertIsNone(self.cache.get("token-a"))
+
+    def test_least_recently_used_is_evicted(self):
+        """Test that the cache stays within maxsize."""
+        self.cache.set("token-a", self.payload)
+        self.cache.set("token-b", self.payload)
+        self.cache.get("token-a")
+        self.cache.set("token-c", self.payload)
+
+        self.assertIsNotNone(self.cache.get("token-a"))
+        self.assertIsNone(self.cache.get("token-b"))
+
+    def test_discard(self):
+        """Test that a discarded token has to be verified again."""
+        self.cache.set("token-a", self.payload)
+        self.cache.set("token-b", self.payload)
+
+        self.cache.discard("token-a")
+
+        self.assertIsNone(self.cache.get("token-a"))
+        self.assertIsNotNone(self.cache.get("token-b"))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import io
+import os
+import shutil
+import sqlite3
+import tempfile
+from services.upload_store import UploadStore
+
+class TestUploadStore(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.upload_store = UploadStore(
+            root=os.path.join(self.tmpdir, 'uploads'),
+            db_path=os.path.join(self.tmpdir, 'claims.sqlite'),
+            chunk_size=4
+        )
+        self.report = b"police report #42, signed"
+
+    def tearDown(self):
+        self.upload_store.db.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_save_stores_by_content_hash(self):
+        """Test that uploads land in a sharded path named by their digest."""
+        upload = self.upload_store.save(io.BytesIO(self.report), 'report.pdf')
+
+        digest = upload['sha256']
+        self.assertEqual(upload['size'], len(self.report))
+        self.assertEqual(upload['filename'], 'report.pdf')
+        self.assertTrue(upload['path'].endswith(os.path.join(digest[:2], digest[2:4], digest)))
+        with open(upload['path'], 'rb') as f:
+            self.assertEqual(f.read(), self.report)
+
+    def test_duplicate_uploads_are_stored_once(self):
+        """Test that identical bytes share one blob."""
+        first = self.upload_store.save(io.BytesIO(self.report), 'a.pdf')
+        second = self.upload_store.save(io.BytesIO(self.report), 'b.pdf')
+
+        self.assertEqual(first['path'], second['path'])
+        self.assertEqual(os.listdir(os.path.join(self.upload_store.root, 'tmp')), [])
+
+    def test_same_name_different_content(self):
+        """Test that two files called photo.jpg don't overwrite each other."""
+        first = self.upload_store.save(io.BytesIO(b"first photo"), 'photo.jpg')
+        second = self.upload_store.save(io.BytesIO(b"second photo"), 'photo.jpg')
+
+        self.assertNotEqual(first['path'], second['path'])
+        self.assertTrue(os.path.exists(first['path']))
+        self.assertTrue(os.path.exists(second['path']))
+
+    def test_reference_counts_per_claim(self):
+        """Test that each claim holds one reference per blob."""
+        upload = self.upload_store.save(io.BytesIO(self.report), 'report.pdf')
+
+        self.upload_store.add_references(1, [upload])
+        self.upload_store.add_references(1, [upload])
+        self.upload_store.add_references(2, [upload])
+
+        self.assertEqual(self.upload_store.get_reference_count(upload['sha256']), 2)
+        self.assertEqual(len(self.upload_store.get_claim_uploads(1)), 1)
+
+    def test_same_file_under_two_names(self):
+        """Test that a claim attaching the same bytes twice keeps both filenames and one reference."""
+        front = self.upload_store.save(io.BytesIO(self.report), 'front.jpg')
+        back = self.upload_store.save(io.BytesIO(self.report), 'back.jpg')
+
+        self.upload_store.add_references(1, [front, back])
+
+        uploads = self.upload_store.get_claim_uploads(1)
+        self.assertEqual([upload['filename'] for upload in uploads], ['front.jpg', 'back.jpg'])
+        self.assertEqual(self.upload_store.get_reference_count(front['sha256']), 1)
+        self.assertEqual(self.upload_store.release_claim(1), [front['sha256']])
+        self.assertFalse(os.path.exists(front['path']))
+
+    def test_release_claim_deletes_unused_blobs(self):
+        """Test that a blob is removed only after its last claim lets go."""
+        upload = self.upload_store.save(io.BytesIO(self.report), 'report.pdf')
+        self.upload_store.add_references(1, [upload])
+        self.upload_store.add_references(2, [upload])
+
+        self.assertEqual(self.upload_store.release_claim(1), [])
+        self.assertTrue(os.path.exists(upload['path']))
+
+        self.assertEqual(self.upload_store.release_claim(2), [upload['sha256']])
+        self.assertFalse(os.path.exists(upload['path']))
+
+    def test_collect_garbage_respects_grace_period(self):
+        """Test that fresh unreferenced uploads survive garbage collection."""
+        upload = self.upload_store.save(io.BytesIO(self.report), 'report.pdf')
+
+        self.assertEqual(self.upload_store.collect_garbage(older_than=3600), [])
+        self.assertEqual(self.upload_store.collect_garbage(older_than=-1), [upload['sha256']])
+        self.assertFalse(os.path.exists(upload['path']))
+
+    def test_collect_garbage_spares_blobs_saved_again(self):
+        """Test that re-saving old unreferenced bytes restarts their grace period."""
+        upload = self.upload_store.save(io.BytesIO(self.report), 'report.pdf')
+        conn = self.upload_store.db.connection()
+        with conn:
+            conn.execute('UPDATE upload_blobs SET created_at = created_at - 7200')
+
+        self.upload_store.save(io.BytesIO(self.report), 'report.pdf')
+
+        self.assertEqual(self.upload_store.collect_garbage(older_than=3600), [])
+        self.assertTrue(os.path.exists(upload['path']))
+
+    def test_old_reference_table_is_migrated(self):
+        """Test that references kept under the old (claim_id, sha256) key survive the schema change."""
+        db_path = os.path.join(self.tmpdir, 'old.sqlite')
+        conn = sqlite3.connect(db_path)
+        conn.executescript(
+            'CREATE TABLE claim_uploads (claim_id INTEGER NOT NULL, sha256 TEXT NOT NULL, filename TEXT, '
+            'PRIMARY KEY (claim_id, sha256));'
+            'CREATE INDEX idx_claim_uploads_sha256 ON claim_uploads (sha256);'
+            "INSERT INTO claim_uploads VALUES (1, 'abc', 'report.pdf');"
+        )
+        conn.close()
+        store = UploadStore(root=os.path.join(self.tmpdir, 'uploads'), db_path=db_path)
+        upload = {'sha256': 'abc', 'filename': 'copy.pdf'}
+
+        store.add_references(1, [upload])
+
+        rows = store.db.connection().execute(
+            'SELECT filename FROM claim_uploads WHERE claim_id = 1 ORDER BY rowid'
+        ).fetchall()
+        self.assertEqual([row['filename'] for row in rows], ['report.pdf', 'copy.pdf'])
+        store.db.close()
@@ -0,0 +1,153 @@
+import unittest
+import os
+import shutil
+import tempfile
+import threading
+import time
+from flask import Flask
+from services.user_store import SQLiteUserStore
+
+class TestSQLiteUserStore(unittest.TestCase):
+    def setUp(self):
+        """Set up test fixtures before each test method."""
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'users.sqlite')
+        self.user_store = SQLiteUserStore(self.path)
+        self.test_email = "test@example.com"
+        self.test_password_hash = "hashed_password_123"
+
+    def tearDown(self):
+        self.user_store.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_create_user_success(self):
+        """Test that created users get ids and are returned without hash."""
+        user = self.user_store.create_user(
+            email=self.test_email,
+            password_hash=self.test_password_hash,
+            name="Test User",
+            role="investigator"
+        )
+
+        self.assertEqual(user["id"], 1)
+        self.assertEqual(user["name"], "Test User")
+        self.assertEqual(user["role"], "investigator")
+        self.assertNotIn("password_hash", user)
+        self.assertIn("created_at", user)
+
+    def test_create_user_duplicate_email(self):
+        """Test that the unique email index rejects a second registration."""
+        self.user_store.create_user(email=self.test_email, password_hash=self.test_password_hash)
+
+        with self.assertRaises(ValueError) as context:
+            self.user_store.create_user(email=self.test_email, password_hash="another_hash")
+
+        self.assertIn("User already exists", str(context.exception))
+
+    def test_get_user_by_email_and_id(self):
+        """Test that lookups return the stored user with its hash."""
+        created_user = self.user_store.create_user(
+            email=self.test_email, password_hash=self.test_password_hash, name="Test User"
+        )
+
+        by_email = self.user_store.get_user_by_email(self.test_email)
+        by_id = self.user_store.get_user_by_id(created_user["id"])
+
+        self.assertEqual(by_email, by_id)
+        self.assertEqual(by_email["password_hash"], self.test_password_hash)
+        self.assertEqual(by_email["name"], "Test User")
+        self.assertIsNone(self.user_store.get_user_by_email("nonexistent@example.com"))
+        self.assertIsNone(self.user_store.get_user_by_id(999))
+
+    def test_users_are_shared_between_stores(self):
+        """Test that another store on the same file sees the users."""
+        created_user = self.user_store.create_user(email=self.test_email, password_hash=self.test_password_hash)
+        other = SQLiteUserStore(self.path)
+
+        self.assertEqual(other.get_user_by_email(self.test_email)["id"], created_user["id"])
+        with self.assertRaises(ValueError):
+            other.create_user(email=self.test_email, password_hash="another_hash")
+        other.close()
+
+    def test_revoked_tokens_are_shared_between_stores(self):
+        """Test that a token revoked through one store is rejected by another on the same file."""
+        other = SQLiteUserStore(self.path)
+        self.addCleanup(other.close)
+
+        self.user_store.revoke_token("digest-a", time.time() + 60)
+        self.user_store.revoke_token("digest-b", time.time() - 1)
+
+        self.assertTrue(other.is_token_revoked("digest-a"))
+        self.assertFalse(other.is_token_revoked("digest-b"))
+        self.assertFalse(other.is_token_revoked("digest-c"))
+
+    def test_get_token_user(self):
+        """Test that one lookup returns the token's user and whether the token is revoked."""
+        created_user = self.user_store.create_user(email=self.test_email, password_hash=self.test_password_hash)
+        self.user_store.revoke_token("digest-a", time.time() + 60)
+
+        user, revoked = self.user_store.get_token_user(created_user["id"], "digest-b")
+        self.assertEqual(user["email"], self.test_email)
+        self.assertFalse(revoked)
+        self.assertEqual(self.user_store.get_token_user(created_user["id"], "digest-a")[1], True)
+        self.assertEqual(self.user_store.get_token_user(999, "digest-a"), (None, True))
+        self.assertEqual(self.user_store.get_token_user(999, "digest-b"), (None, False))
+
+    def test_concurrent_registrations_get_unique_ids(self):
+        """Test that registrations from many threads never collide."""
+        ids = []
+        errors = []
+
+        def register(i):
+            try:
+                ids.append(self.user_store.create_user(email=f"user{i}@example.com", password_hash="hash")["id"])
+                self.user_store.create_user(email="same@example.com", password_hash="hash")
+            except ValueError as e:
+                errors.append(e)
+            finally:
+                self.user_store.close()
+
+        threads = [threading.Thread(target=register, args=(i,)) for i in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(ids)), 10)
+        self.assertEqual(len(errors), 9)
+
+    def test_update_user(self):
+        """Test that updating a user changes its fields and email index."""
+        created_user = self.user_store.create_user(email=self.test_email, password_hash=self.test_password_hash)
+
+        user = self.user_store.update_user(created_user["id"], name="New Name", email="new@example.com")
+
+        self.assertEqual(user["name"], "New Name")
+        self.assertNotIn("password_hash", user)
+        self.assertIsNone(self.user_store.get_user_by_email(self.test_email))
+        self.assertEqual(self.user_store.get_user_by_email("new@example.com")["name"], "New Name")
+        self.assertIsNone(self.user_store.update_user(999, name="Nobody"))
+
+    def test_update_user_duplicate_email(self):
+        """Test that moving a user onto a taken email is rejected."""
+        self.user_store.create_user(email=self.test_email, password_hash=self.test_password_hash)
+        other = self.user_store.create_user(email="other@example.com", password_hash=self.test_password_hash)
+
+        with self.assertRaises(ValueError):
+            self.user_store.update_user(other["id"], email=self.test_email)
+
+    def test_init_app_uses_database(self):
+        """Test that init_app points the store at the app's DATABASE."""
+        app = Flask(__name__)
+        app.config['DATABASE'] = os.path.join(self.tmpdir, 'app.sqlite')
+        store = SQLiteUserStore()
+
+        store.init_app(app)
+        store.create_user(email=self.test_email, password_hash=self.test_password_hash)
+
+        self.assertIs(app.extensions['user_store'], store)
+        self.assertIsNotNone(SQLiteUserStore(app.config['DATABASE']).get_user_by_email(self.test_email))
+        store.close()
+
+if __name__ == '__main__':
+    unittest.main()